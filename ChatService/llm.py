@@ -0,0 +1,160 @@
+# Groq chat completions for the service, one async client shared by every session
+import asyncio
+import os
+import sys
+from collections import defaultdict
+
+import groq
+
+from rate_limiter import RateLimiter, RateLimitExceeded
+from singleflight import SingleFlight, request_key
+
+# The shared helpers live in the repository root (next to the service in the Docker image)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.resilience import CircuitBreaker, CircuitOpen, Hedger  # noqa: E402
+
+MODELS = [
+    "gemma2-9b-it",
+    "llama-3.1-8b-instant",
+    "llama-3.1-70b-versatile",
+    "llama3-groq-70b-8192-tool-use-preview",
+    "llama3-groq-8b-8192-tool-use-preview",
+    "llama3-8b-8192",
+    "mixtral-8x7b-32768",
+    "gemma-7b-it",
+]
+DEFAULT_MODEL = "gemma2-9b-it"
+# Per-request options a client may set, with their allowed range
+OPTIONS = {"temperature": (0.0, 2.0), "max_tokens": (1, 32768), "top_p": (0.0, 1.0)}
+RETRIES = 2  # extra tries after a 429, a 5xx or a dropped connection
+
+
+class UpstreamError(Exception):
+    # A failed Groq call, status is what the service answers with
+    def __init__(self, message, status=502, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class GroqBackend():
+    def __init__(self, api_key=None, base_url=None, timeout=60, limiter=None):
+        # base_url (or GROQ_BASE_URL) lets the service talk to a local stand-in instead of Groq.
+        # The SDK's own retries would sleep out a 429 for up to a minute per call, so they are off and
+        # failed calls go back through the rate limiter's queue instead.
+        self.client = groq.AsyncGroq(
+            api_key=api_key or os.getenv("GROQ_API_KEY"),
+            base_url=base_url or os.getenv("GROQ_BASE_URL") or None,
+            timeout=timeout,
+            max_retries=0,
+        )
+        self.limiter = limiter or RateLimiter()
+        self.flights = SingleFlight()
+        self.hedger = Hedger(min_delay=0.2)  # Groq usually answers within a few hundred ms
+        self.breakers = defaultdict(CircuitBreaker)  # model -> its breaker
+
+    async def close(self):
+        await self.client.close()
+
+    async def _create(self, model, messages, options, on_queue=None, stream=False):
+        # Waits for the model's turn in the rate limiter and sends the call, returns (tokens reserved, response).
+        # A call slower than the model's p95 is hedged (for a stream: until its headers arrive), a model whose
+        # breaker is open fails at once, so "auto" moves on to the next model straight away.
+        tokens = self.limiter.estimate(messages, options.get("max_tokens"))
+        breaker = self.breakers[model]
+        for attempt in range(RETRIES + 1):
+            try:
+                breaker.check(model)
+            except CircuitOpen as e:
+                raise UpstreamError(str(e), 503, f"{e.retry_after:.0f}") from e
+            health = None
+            try:
+                try:
+                    await self.limiter.acquire(model, tokens, on_queue, retry=attempt > 0)
+                except RateLimitExceeded as e:
+                    raise UpstreamError(f"Groq quota exhausted: {e}", 429, f"{e.retry_after:.0f}") from e
+                # A hedge takes its own quota; when it loses, its reservation is kept, Groq may have counted it
+                raw, hedged = await self.hedger.run(
+                    model,
+                    lambda: self.client.chat.completions.with_raw_response.create(
+                        model=model, messages=messages, stream=stream, **options),
+                    lambda: self.limiter.try_acquire(model, tokens),
+                    discard=lambda loser: loser.close(),
+                )
+                health = True
+            except groq.APIError as e:
+                health = _healthy(e)
+                await self.limiter.settle(model, tokens, 0)  # nothing was generated
+                if isinstance(e, groq.APIStatusError):
+                    await self.limiter.learn(model, e.response.headers)  # a 429 blocks the model for its retry-after
+                if attempt == RETRIES or not _retryable(e):
+                    raise _upstream_error(e) from e
+                if not isinstance(e, groq.RateLimitError):
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            finally:
+                breaker.record(health)
+            await self.limiter.learn(model, raw.headers)
+            return tokens, await raw.parse()
+
+    async def complete(self, model, messages, on_queue=None, **options):
+        # Returns (reply text, usage dict), identical calls already in flight share theirs
+        key = request_key("complete", model, messages, options)
+        return await self.flights.do(key, lambda: self._complete(model, messages, on_queue, **options))
+
+    async def stream(self, model, messages, on_queue=None, **options):
+        # Yields the reply as it is generated, on_queue(position, eta) is awaited while the call waits for quota.
+        # Identical calls already in flight are followed instead of sent again.
+        key = request_key("stream", model, messages, options)
+        start = lambda shared_on_queue: self._stream(model, messages, shared_on_queue, **options)  # noqa: E731
+        async for delta in self.flights.stream(key, start, on_queue):
+            yield delta
+
+    async def _complete(self, model, messages, on_queue=None, **options):
+        tokens, response = await self._create(model, messages, options, on_queue)
+        usage = response.usage.model_dump() if response.usage else {}
+        await self.limiter.settle(model, tokens, usage.get("total_tokens", tokens))
+        return response.choices[0].message.content, usage
+
+    async def _stream(self, model, messages, on_queue=None, **options):
+        tokens, chunks = await self._create(model, messages, options, on_queue, stream=True)
+        used = tokens
+        try:
+            async for chunk in chunks:
+                if chunk.x_groq and chunk.x_groq.usage:
+                    used = chunk.x_groq.usage.total_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except groq.APIError as e:
+            raise _upstream_error(e) from e
+        finally:
+            await self.limiter.settle(model, tokens, used)
+
+
+def _healthy(error):
+    # What a failed call says about the model for its circuit breaker: False when Groq is failing,
+    # None when the call itself was the problem (bad request) or quota ran out
+    if isinstance(error, (groq.APITimeoutError, groq.APIConnectionError)):
+        return False
+    if isinstance(error, groq.APIStatusError) and error.status_code >= 500:
+        return False
+    return None
+
+
+def _retryable(error):
+    if isinstance(error, groq.APITimeoutError):
+        return False  # another full timeout would only double the wait
+    if isinstance(error, (groq.RateLimitError, groq.APIConnectionError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+def _upstream_error(error):
+    if isinstance(error, groq.RateLimitError):
+        return UpstreamError(str(error), 429, error.response.headers.get("retry-after"))
+    if isinstance(error, groq.APITimeoutError):
+        return UpstreamError("Groq did not answer in time", 504)
+    if isinstance(error, groq.APIStatusError):
+        status = 400 if error.status_code in (400, 404, 422) else 502
+        return UpstreamError(str(error), status)
+    return UpstreamError(str(error), 502)
@@ -0,0 +1,67 @@
+# Memory policies: which earlier messages of a session go into the next prompt
+# The session keeps its history, a policy only picks the part the model gets to see.
+
+
+def estimate_tokens(text):
+    # Rough count, about 4 characters per token for English text
+    return max(1, len(text) // 4)
+
+
+class WindowMemory():
+    # Last k exchanges (user + assistant), same as ConversationBufferWindowMemory(k)
+    def __init__(self, k=10):
+        self.k = int(k)
+
+    def select(self, messages):
+        return messages[-2 * self.k:] if self.k > 0 else []
+
+    def to_dict(self):
+        return {"policy": "window", "k": self.k}
+
+
+class FullMemory():
+    # Everything said so far
+    def select(self, messages):
+        return list(messages)
+
+    def to_dict(self):
+        return {"policy": "full"}
+
+
+class TokenMemory():
+    # As many of the newest messages as fit in a token budget
+    def __init__(self, max_tokens=2000):
+        self.max_tokens = int(max_tokens)
+
+    def select(self, messages):
+        total = 0
+        start = len(messages)
+        while start > 0:
+            total += estimate_tokens(messages[start - 1]["content"])
+            if total > self.max_tokens:
+                break
+            start -= 1
+        return messages[start:]
+
+    def to_dict(self):
+        return {"policy": "tokens", "max_tokens": self.max_tokens}
+
+
+POLICIES = {
+    "window": WindowMemory,
+    "full": FullMemory,
+    "tokens": TokenMemory,
+}
+
+
+def make_memory(spec=None):
+    # spec is a policy name or a dict like {"policy": "window", "k": 5}
+    if spec is None:
+        spec = {}
+    elif isinstance(spec, str):
+        spec = {"policy": spec}
+    options = dict(spec)
+    policy = options.pop("policy", "window")
+    if policy not in POLICIES:
+        raise ValueError(f"unknown memory policy {policy!r}, choose from {', '.join(POLICIES)}")
+    return POLICIES[policy](**options)
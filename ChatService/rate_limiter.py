@@ -0,0 +1,343 @@
+# Token-bucket rate limiting for the Groq key all sessions share
+# Every model has buckets for requests per minute, tokens per minute and requests per day. A call waits in a
+# first-in-first-out queue per model until the buckets hold its estimated tokens, and waiting callers hear their
+# position. Limits start from Groq's published numbers and are corrected from the x-ratelimit-* response headers;
+# requests per minute, which has no header, is lowered on 429s and climbs back once they stop.
+# With CHAT_RATE_DB set, the buckets live in sqlite so several service processes share one budget.
+import asyncio
+import os
+import re
+import sqlite3
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from memory import estimate_tokens
+
+RATE_DB = os.getenv("CHAT_RATE_DB")  # unset: buckets are kept in this process only
+MAX_QUEUE = int(os.getenv("CHAT_QUEUE_MAX", "200"))  # waiting calls per model before new ones are turned away
+MAX_WAIT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "120"))  # seconds a call may wait for its turn
+COMPLETION_ESTIMATE = 300  # tokens reserved for a reply when max_tokens is not set
+MESSAGE_TOKENS = 4  # per-message framing the API adds
+RPM_RECOVERY = float(os.getenv("CHAT_RPM_RECOVERY", "600"))  # seconds without a 429 before a lowered rpm rises
+
+# Groq free tier: requests/minute, tokens/minute, requests/day
+DEFAULT_LIMITS = {"rpm": 30, "tpm": 6000, "rpd": 14400}
+MODEL_LIMITS = {
+    "gemma2-9b-it": {"tpm": 15000},
+    "gemma-7b-it": {"tpm": 15000},
+    "llama-3.1-8b-instant": {"tpm": 20000},
+    "llama3-8b-8192": {"tpm": 30000},
+    "llama-3.1-70b-versatile": {"tpm": 6000},
+    "llama3-groq-70b-8192-tool-use-preview": {"tpm": 15000},
+    "llama3-groq-8b-8192-tool-use-preview": {"tpm": 15000},
+    "mixtral-8x7b-32768": {"tpm": 5000},
+}
+# Bucket name -> (limit it comes from, seconds the limit is counted over)
+BUCKETS = {"requests_minute": ("rpm", 60), "tokens_minute": ("tpm", 60), "requests_day": ("rpd", 86400)}
+
+
+def parse_duration(text):
+    # Groq writes resets like "7.66s", "2m59.56s" or "120ms"
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", text)
+    return sum(float(value) * units[unit] for value, unit in parts) if parts else None
+
+
+class Buckets():
+    # Levels of every (model, bucket), in a dict or in sqlite when the budget is shared between processes
+    def __init__(self, db_path=None):
+        self.state = {}  # (model, bucket) -> [level, updated]
+        self.blocked = {}  # model -> time until which Groq said to back off
+        self.db = None
+        if db_path:
+            # Used from RateLimiter's single database thread only, never from the event loop
+            self.db = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS buckets (model TEXT, bucket TEXT, level REAL, updated REAL, "
+                            "PRIMARY KEY (model, bucket))")
+            self.db.execute("CREATE TABLE IF NOT EXISTS blocked (model TEXT PRIMARY KEY, until REAL)")
+
+    def _load(self, model):
+        if self.db is None:
+            return
+        for bucket, level, updated in self.db.execute("SELECT bucket, level, updated FROM buckets WHERE model = ?",
+                                                      (model,)):
+            self.state[model, bucket] = [level, updated]
+        row = self.db.execute("SELECT until FROM blocked WHERE model = ?", (model,)).fetchone()
+        self.blocked[model] = row[0] if row else 0.0
+
+    def _save(self, model):
+        if self.db is None:
+            return
+        self.db.executemany("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                            [(model, bucket, *self.state[model, bucket]) for bucket in BUCKETS
+                             if (model, bucket) in self.state])
+        self.db.execute("INSERT OR REPLACE INTO blocked VALUES (?, ?)", (model, self.blocked.get(model, 0.0)))
+
+    def _transaction(self, model, change):
+        # Read, change and write back in one step, BEGIN IMMEDIATE locks out the other processes meanwhile
+        if self.db is None:
+            return change()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self._load(model)
+            result = change()
+            self._save(model)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return result
+
+    def _refill(self, model, bucket, capacity, now):
+        level, updated = self.state.get((model, bucket), (capacity, now))
+        level = min(capacity, level + (now - updated) * capacity / BUCKETS[bucket][1])
+        self.state[model, bucket] = [level, now]
+        return level
+
+    def take(self, model, needs, limits, now=None):
+        # Takes every amount in `needs` if all are there and returns 0, otherwise takes nothing and returns the wait
+        now = now or time.time()
+
+        def change():
+            wait = max(0.0, self.blocked.get(model, 0.0) - now)
+            levels = {}
+            for bucket, amount in needs.items():
+                capacity = limits[BUCKETS[bucket][0]]
+                levels[bucket] = self._refill(model, bucket, capacity, now)
+                amount = min(amount, capacity)  # a call bigger than the whole bucket waits for a full one
+                if levels[bucket] < amount:
+                    wait = max(wait, (amount - levels[bucket]) * BUCKETS[bucket][1] / capacity)
+            if wait > 0:
+                return wait
+            for bucket, amount in needs.items():
+                self.state[model, bucket][0] = levels[bucket] - min(amount, limits[BUCKETS[bucket][0]])
+            return 0.0
+
+        return self._transaction(model, change)
+
+    def adjust(self, model, bucket, delta, capacity):
+        # Give back (delta > 0) or charge extra (delta < 0) once the real usage is known
+        def change():
+            level = self._refill(model, bucket, capacity, time.time())
+            self.state[model, bucket][0] = min(capacity, level + delta)
+        self._transaction(model, change)
+
+    def sync(self, model, bucket, remaining, capacity):
+        # Groq's own count wins when it has less left than we think, e.g. other clients use the same key
+        def change():
+            level = self._refill(model, bucket, capacity, time.time())
+            self.state[model, bucket][0] = min(level, remaining)
+        self._transaction(model, change)
+
+    def block(self, model, until):
+        def change():
+            self.blocked[model] = max(self.blocked.get(model, 0.0), until)
+        self._transaction(model, change)
+
+    def level(self, model, bucket, capacity):
+        # Estimate from the last state this process saw, without a transaction. With sqlite other processes may
+        # have taken some since; good enough for queue ETAs and stats, take() has the final say.
+        level, updated = self.state.get((model, bucket), (capacity, time.time()))
+        return min(capacity, level + (time.time() - updated) * capacity / BUCKETS[bucket][1])
+
+
+class Ticket():
+    # A call waiting in a model's queue, compared by identity so equal-sized calls stay apart
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimiter():
+    def __init__(self, db_path=RATE_DB, max_queue=MAX_QUEUE, max_wait=MAX_WAIT):
+        self.buckets = Buckets(db_path)
+        # sqlite blocks while another process holds the lock (up to its 10s busy timeout), so shared buckets are
+        # read and written on one thread of their own and the event loop keeps serving the other sessions
+        self.db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-db") if db_path else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.limits = {}
+        self.learned = set()  # models whose limits came from response headers
+        self.queues = defaultdict(deque)  # model -> Tickets of waiting calls, first in first out
+        self.turns = defaultdict(asyncio.Condition)
+        self.counters = defaultdict(Counter)
+        self.waits = defaultdict(lambda: deque(maxlen=500))
+        self.answered = defaultdict(deque)  # model -> times Groq answered a call in the last minute
+        self.rpm_lowered = {}  # model -> when its rpm was last lowered or raised back, while below the default
+
+    def model_limits(self, model):
+        if model not in self.limits:
+            self.limits[model] = {**DEFAULT_LIMITS, **MODEL_LIMITS.get(model, {})}
+        return self.limits[model]
+
+    async def _buckets(self, method, *args):
+        if self.db_thread is None:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.db_thread, method, *args)
+
+    def estimate(self, messages, max_tokens=None):
+        # Tokens a call will use: its prompt plus the reply, which is only known afterwards
+        prompt = sum(estimate_tokens(m["content"] or "") + MESSAGE_TOKENS for m in messages)
+        reply = min(max_tokens, COMPLETION_ESTIMATE) if max_tokens else COMPLETION_ESTIMATE
+        return prompt + reply
+
+    def eta(self, model, position):
+        # Rough seconds until the call at `position` gets its turn
+        limits = self.model_limits(model)
+        ahead = list(self.queues[model])[:position + 1]
+        tokens_level = self.buckets.level(model, "tokens_minute", limits["tpm"])
+        requests_level = self.buckets.level(model, "requests_minute", limits["rpm"])
+        return max(0.0, (sum(t.tokens for t in ahead) - tokens_level) * 60 / limits["tpm"],
+                   (len(ahead) - requests_level) * 60 / limits["rpm"])
+
+    async def acquire(self, model, tokens, on_queue=None, retry=False):
+        # Waits for this call's turn, returns the seconds it waited. on_queue(position, eta) hears about the wait.
+        # A retry goes to the front, it already waited its turn once.
+        queue = self.queues[model]
+        if len(queue) >= self.max_queue:
+            self.counters[model]["rejected"] += 1
+            raise RateLimitExceeded(f"{len(queue)} requests are already waiting for {model}",
+                                    retry_after=self.eta(model, len(queue) - 1))
+        ticket = Ticket(tokens)
+        if retry:
+            queue.appendleft(ticket)
+        else:
+            queue.append(ticket)
+        turn = self.turns[model]
+        start = time.monotonic()
+        try:
+            while True:
+                async with turn:
+                    if queue[0] is not ticket:
+                        # Not first in line: report the position and sleep until someone ahead leaves
+                        position = queue.index(ticket)
+                        if on_queue:
+                            await on_queue(position, self.eta(model, position))
+                        remaining = self.max_wait - (time.monotonic() - start)
+                        try:
+                            await asyncio.wait_for(turn.wait(), max(0.0, remaining))
+                        except asyncio.TimeoutError:
+                            raise RateLimitExceeded(f"waited {self.max_wait:.0f}s for {model}",
+                                                    retry_after=self.eta(model, position))
+                        continue
+                limits = self.model_limits(model)
+                wait = await self._buckets(self.buckets.take, model,
+                                           {"requests_minute": 1, "requests_day": 1, "tokens_minute": tokens}, limits)
+                if wait == 0:
+                    waited = time.monotonic() - start
+                    self.counters[model]["admitted"] += 1
+                    self.waits[model].append(waited)
+                    return waited
+                if time.monotonic() - start + wait > self.max_wait:
+                    raise RateLimitExceeded(f"{model} is out of quota for {wait:.0f}s", retry_after=wait)
+                if on_queue:
+                    await on_queue(0, wait)
+                self.counters[model]["waited"] += 1
+                await asyncio.sleep(wait)
+        finally:
+            queue.remove(ticket)
+            async with turn:
+                turn.notify_all()
+
+    async def try_acquire(self, model, tokens):
+        # Takes quota only if it is there right now and nobody is waiting for it, for optional calls like hedges
+        if self.queues[model]:
+            return False
+        limits = self.model_limits(model)
+        if await self._buckets(self.buckets.take, model,
+                               {"requests_minute": 1, "requests_day": 1, "tokens_minute": tokens}, limits):
+            return False
+        self.counters[model]["admitted"] += 1
+        return True
+
+    async def settle(self, model, reserved, used):
+        # Correct the token bucket once the real usage is known (used=0 refunds a call that never ran)
+        limits = self.model_limits(model)
+        if used != reserved:
+            await self._buckets(self.buckets.adjust, model, "tokens_minute", reserved - used, limits["tpm"])
+
+    async def learn(self, model, headers):
+        # Groq: x-ratelimit-*-requests count requests per day, x-ratelimit-*-tokens tokens per minute
+        limits = self.model_limits(model)
+        for kind, limit_name, bucket in (("requests", "rpd", "requests_day"), ("tokens", "tpm", "tokens_minute")):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if limit and limit.isdigit() and int(limit) > 0:
+                if limits[limit_name] != int(limit):
+                    limits[limit_name] = int(limit)
+                self.learned.add(model)
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining and remaining.isdigit():
+                await self._buckets(self.buckets.sync, model, bucket, int(remaining), limits[limit_name])
+        retry_after = parse_duration(headers.get("retry-after"))
+        if not retry_after:
+            self.answered[model].append(time.time())
+            self._raise_rpm(model)
+        else:
+            self.counters[model]["throttled"] += 1
+            await self._buckets(self.buckets.block, model, time.time() + retry_after)
+            left = [headers.get(f"x-ratelimit-remaining-{kind}") for kind in ("tokens", "requests")]
+            if all(value and value.isdigit() and int(value) > 0 for value in left):
+                self._lower_rpm(model)
+
+    def _lower_rpm(self, model):
+        # A 429 with tokens and daily requests left means requests per minute ran out, which has no header:
+        # the calls Groq answered in the last minute are the real limit
+        now = time.time()
+        answered = self.answered[model]
+        while answered and now - answered[0] > 60:
+            answered.popleft()
+        limits = self.model_limits(model)
+        if 0 < len(answered) < limits["rpm"]:
+            limits["rpm"] = len(answered)
+            self.learned.add(model)
+        if limits["rpm"] < self.default_rpm(model):
+            self.rpm_lowered[model] = now
+
+    def default_rpm(self, model):
+        return {**DEFAULT_LIMITS, **MODEL_LIMITS.get(model, {})}["rpm"]
+
+    def _raise_rpm(self, model):
+        # A lowered rpm may have come from a burst on another key or a passing Groq hiccup, so after RPM_RECOVERY
+        # seconds without a 429 it moves halfway back to the default, and again after every quiet window
+        lowered = self.rpm_lowered.get(model)
+        now = time.time()
+        if lowered is None or now - lowered < RPM_RECOVERY:
+            return
+        limits = self.model_limits(model)
+        default = self.default_rpm(model)
+        limits["rpm"] += max(1, (default - limits["rpm"] + 1) // 2)
+        if limits["rpm"] >= default:
+            limits["rpm"] = default
+            del self.rpm_lowered[model]
+        else:
+            self.rpm_lowered[model] = now
+
+    def stats(self):
+        data = {}
+        for model in set(self.limits) | set(self.counters):
+            limits = self.model_limits(model)
+            waits = sorted(self.waits[model])
+            data[model] = {
+                "limits": limits,
+                "learned": model in self.learned,
+                "queue": len(self.queues[model]),
+                "tokens_left": round(self.buckets.level(model, "tokens_minute", limits["tpm"])),
+                "requests_left": round(self.buckets.level(model, "requests_minute", limits["rpm"]), 1),
+                "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                **self.counters[model],
+            }
+        return data
@@ -0,0 +1,163 @@
+# Model choice for sessions on "auto"
+# Each question is scored for length and complexity: short chit-chat goes to the fast tier, long or involved
+# questions to the strong one. Within a tier the model with the lowest expected latency wins, from an EWMA of its
+# recent replies, its error rate and its rate-limit queue. A model that keeps failing is skipped for a while and
+# a failed call moves on to the next candidate. Every decision and how it turned out goes to a JSONL log.
+import json
+import math
+import os
+import re
+import time
+
+from memory import estimate_tokens
+
+AUTO = "auto"
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOG_PATH = os.getenv("CHAT_ROUTER_LOG", os.path.join(HERE, "router_log.jsonl"))  # empty: no log
+
+TIERS = {
+    "fast": ["gemma2-9b-it", "llama-3.1-8b-instant", "llama3-8b-8192"],
+    "strong": ["llama-3.1-70b-versatile", "llama3-groq-70b-8192-tool-use-preview", "mixtral-8x7b-32768"],
+}
+# Seconds until a reply starts, before anything was measured
+PRIOR_LATENCY = {
+    "gemma2-9b-it": 0.3, "llama-3.1-8b-instant": 0.25, "llama3-8b-8192": 0.25, "gemma-7b-it": 0.3,
+    "llama3-groq-8b-8192-tool-use-preview": 0.3, "llama-3.1-70b-versatile": 0.6,
+    "llama3-groq-70b-8192-tool-use-preview": 0.6, "mixtral-8x7b-32768": 0.5,
+}
+CONTEXT = {"llama-3.1-8b-instant": 131072, "llama-3.1-70b-versatile": 131072, "mixtral-8x7b-32768": 32768}
+DEFAULT_CONTEXT = 8192
+
+ALPHA = 0.2  # weight of the newest sample in the EWMAs
+RECOVERY = 300  # seconds for an unused model's stats to drift halfway back to the prior
+SLACK = 1.5  # a later model in the tier must be this much faster to go first
+FAILOVERS = 2  # other models tried after a failed call
+DEGRADED_ERRORS = 0.5  # error EWMA above which a model goes to the back
+DEGRADED_STREAK = 3  # failures in a row that bench a model for COOLDOWN seconds
+COOLDOWN = 60
+
+STRONG_SCORE = 2
+LONG_QUESTION = 60  # tokens
+LONG_CONTEXT = 3000  # tokens
+COMPLEX_WORDS = ("explain", "why", "how does", "how do", "compare", "difference", "analy", "prove", "derive",
+                 "step by step", "design", "implement", "debug", "optimi", "algorithm", "essay", "summar",
+                 "translate", "write a", "write me")
+CODE = re.compile(r"```|\bdef \w+\(|\bclass \w+|\bfunction\b|#include|\bSELECT\b.*\bFROM\b|[{};]\s*$", re.M)
+MATH = re.compile(r"\d\s*[-+*/^=]\s*\d|\b(integral|derivative|equation|matrix|probability)\b", re.I)
+
+
+def features(messages):
+    # Complexity score of the newest question, with the reasons behind it
+    question = messages[-1]["content"]
+    lower = question.lower()
+    reasons = {}
+    if estimate_tokens(question) > LONG_QUESTION:
+        reasons["long question"] = 1
+    if CODE.search(question):
+        reasons["code"] = 2
+    for word in [w for w in COMPLEX_WORDS if w in lower][:2]:
+        reasons[f"'{word}'"] = 1
+    if question.count("?") >= 2:
+        reasons["several questions"] = 1
+    if MATH.search(question):
+        reasons["maths"] = 1
+    context = sum(estimate_tokens(m["content"] or "") for m in messages)
+    if context > LONG_CONTEXT:
+        reasons["long conversation"] = 1
+    return {"score": sum(reasons.values()), "reasons": list(reasons), "context_tokens": context}
+
+
+class ModelHealth():
+    # Rolling latency and error rate of one model, drifting back to the prior while it is not used
+    def __init__(self, prior):
+        self.prior = prior
+        self.latency = prior
+        self.errors = 0.0
+        self.streak = 0
+        self.calls = 0
+        self.last_sample = 0.0
+        self.last_error = 0.0
+
+    def record(self, latency, ok, now=None):
+        now = now or time.time()
+        self.latency, self.errors = self.expected_latency(now), self.error_rate(now)
+        if ok:
+            self.latency += ALPHA * (latency - self.latency)
+        self.errors += ALPHA * ((0.0 if ok else 1.0) - self.errors)
+        self.streak = 0 if ok else self.streak + 1
+        self.calls += 1
+        self.last_sample = now
+        if not ok:
+            self.last_error = now
+
+    def _decay(self, now):
+        return math.pow(0.5, (now - self.last_sample) / RECOVERY) if self.last_sample else 0.0
+
+    def expected_latency(self, now=None):
+        return self.prior + (self.latency - self.prior) * self._decay(now or time.time())
+
+    def error_rate(self, now=None):
+        return self.errors * self._decay(now or time.time())
+
+    def degraded(self, now=None):
+        now = now or time.time()
+        benched = self.streak >= DEGRADED_STREAK and now - self.last_error < COOLDOWN
+        return benched or self.error_rate(now) > DEGRADED_ERRORS
+
+    def to_dict(self, now=None):
+        now = now or time.time()
+        return {"latency_ewma": round(self.expected_latency(now), 3), "error_ewma": round(self.error_rate(now), 3),
+                "failures_in_a_row": self.streak, "calls": self.calls, "degraded": self.degraded(now)}
+
+
+class ModelRouter():
+    def __init__(self, models, limiter=None, log_path=LOG_PATH):
+        self.models = list(models)
+        self.limiter = limiter  # the rate limiter's queues add to a model's expected wait
+        self.log_path = log_path
+        self.health = {model: ModelHealth(PRIOR_LATENCY.get(model, 0.5)) for model in self.models}
+
+    def expected_wait(self, model, now=None):
+        # What a new question would wait for this model: a reply start, slowed by errors, plus the quota queue
+        health = self.health[model]
+        wait = health.expected_latency(now) * (1 + 4 * health.error_rate(now))
+        if self.limiter is not None and self.limiter.queues[model]:
+            wait += self.limiter.eta(model, len(self.limiter.queues[model]))
+        return wait
+
+    def route(self, messages):
+        # Returns the decision: tier, features, and the models to try in order
+        now = time.time()
+        found = features(messages)
+        tier = "strong" if found["score"] >= STRONG_SCORE else "fast"
+        fits = [m for m in self.models if CONTEXT.get(m, DEFAULT_CONTEXT) > found["context_tokens"] + 1024]
+        waits = {m: self.expected_wait(m, now) for m in fits}
+
+        first = [m for m in TIERS[tier] if m in waits and not self.health[m].degraded(now)]
+        if first:
+            # Keep the tier's order unless a later model is clearly quicker right now
+            head = first[0]
+            first.sort(key=lambda m: waits[m] * (1 if m == head else SLACK))
+        rest = sorted((m for m in waits if m not in first and not self.health[m].degraded(now)), key=waits.get)
+        benched = sorted((m for m in waits if self.health[m].degraded(now)), key=waits.get)
+        candidates = (first + rest + benched)[:1 + FAILOVERS]
+        return {"tier": tier, **found, "candidates": candidates,
+                "expected": {m: round(waits[m], 3) for m in candidates}}
+
+    def record(self, model, latency, ok):
+        if model in self.health:
+            self.health[model].record(latency, ok)
+
+    def log(self, session_id, decision, attempts):
+        # One line per routed question: what was decided and how each try went, for tuning the thresholds
+        if not self.log_path:
+            return
+        entry = {"time": round(time.time(), 3), "session": session_id, **decision, "attempts": attempts,
+                 "model": attempts[-1]["model"] if attempts and attempts[-1]["ok"] else None}
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def stats(self):
+        now = time.time()
+        return {model: {**health.to_dict(now), "expected_wait": round(self.expected_wait(model, now), 3)}
+                for model, health in self.health.items()}
@@ -0,0 +1,179 @@
+# Answers to questions that were already asked in other words ("who made you" / "who created you")
+# Questions are embedded locally as hashed word, word-pair and character-trigram vectors, one row of a NumPy matrix
+# per cached question, so a lookup is one matrix-vector product. The nearest question above the similarity
+# threshold answers, with the same model, system prompt and generation options, and only when numbers and
+# negations match too.
+# Least recently used entries make room for new ones.
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "20000"))  # entries, 0 turns the cache off
+THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.9"))  # cosine similarity needed for a hit
+DIM = 128  # embedding size, 512 bytes per entry; a lookup over 100k entries reads 51 MB, about 2 ms
+MIN_WORDS = 2  # shorter questions ("why?", "ok") mean nothing without the conversation
+
+CONTRACTIONS = [("what's", "what is"), ("who's", "who is"), ("it's", "it is"), ("n't", " not"), ("'re", " are"),
+                ("'m", " am"), ("'ll", " will"), ("'ve", " have")]
+SYNONYMS = {
+    "created": "made", "create": "make", "built": "made", "build": "make", "developed": "made", "develop": "make",
+    "designed": "made", "programmed": "made", "trained": "made", "creator": "maker", "developer": "maker",
+    "u": "you", "ur": "your", "r": "are", "whats": "what is", "pls": "please", "plz": "please",
+}
+FILLER = {"please", "the", "a", "an", "hey", "hi", "hello", "so", "just", "kindly", "tell", "me", "can", "could",
+          "would", "do", "does", "did", "is", "are", "i", "of"}
+NEGATIONS = {"not", "no", "never", "without"}
+# Words that point back into the conversation, the answer then depends on more than the question
+REFERS = re.compile(r"\b(it|its|that|this|these|those|they|them|he|she|him|her|above|previous|again|more|else|"
+                    r"same|instead|also|continue|another)\b")
+
+
+def normalise(text):
+    text = text.lower()
+    for short, long in CONTRACTIONS:
+        text = text.replace(short, long)
+    words = re.findall(r"\w+", text)
+    words = " ".join(SYNONYMS.get(w, w) for w in words).split()
+    return [w for w in words if w not in FILLER]
+
+
+def _bucket(feature):
+    # Stable across processes, unlike hash()
+    h = zlib.crc32(feature.encode())
+    return h % DIM, (1.0 if h & 0x80000000 else -1.0)
+
+
+def embed(words):
+    vector = np.zeros(DIM, dtype=np.float32)
+    features = [(w, 1.0) for w in words] + [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [(padded[i:i + 3], 0.3) for i in range(len(padded) - 2)]
+    for feature, weight in features:
+        index, sign = _bucket(feature)
+        vector[index] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def guard(words):
+    # Tokens that must match exactly, "2+2" vs "3+3" or "is it safe" vs "is it not safe" embed almost the same
+    return frozenset(w for w in words if w.isdigit() or w in NEGATIONS)
+
+
+def standalone(question, history):
+    # Only questions that make sense without the conversation are answered from, or added to, the cache
+    return not history or not REFERS.search(question.lower())
+
+
+class SemanticCache():
+    def __init__(self, size=CACHE_SIZE, threshold=THRESHOLD):
+        self.size = size
+        self.threshold = threshold
+        self.vectors = np.zeros((size, DIM), dtype=np.float32)
+        self.namespaces = np.full(size, -1, dtype=np.int32)  # -1: free slot
+        self.last_used = np.zeros(size, dtype=np.float64)
+        self.entries = [None] * size  # slot -> (question, answer, guard tokens)
+        # Namespaces carry client-chosen system prompts and options, so only those with rows in the cache are kept
+        self.namespace_ids = {}  # namespace -> id
+        self.namespace_rows = {}  # id -> [namespace, rows using it]
+        self.next_namespace = 0
+        self.count = 0
+        self.counters = {"hits": 0, "misses": 0, "skipped": 0, "added": 0, "evicted": 0}
+        self.lookup_ms = 0.0  # EWMA
+
+    def _namespace(self, namespace):
+        # Id of the namespace for one more row
+        if namespace not in self.namespace_ids:
+            self.namespace_ids[namespace] = self.next_namespace
+            self.namespace_rows[self.next_namespace] = [namespace, 0]
+            self.next_namespace += 1
+        namespace_id = self.namespace_ids[namespace]
+        self.namespace_rows[namespace_id][1] += 1
+        return namespace_id
+
+    def _release(self, namespace_id):
+        # A row of the namespace was evicted, forget the namespace with its last row
+        entry = self.namespace_rows[namespace_id]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.namespace_ids[entry[0]]
+            del self.namespace_rows[namespace_id]
+
+    def lookup(self, namespace, question):
+        # The cached answer and its similarity, or None
+        if not self.size:
+            return None
+        start = time.perf_counter()
+        words = normalise(question)
+        if len(words) < MIN_WORDS or not self.count or namespace not in self.namespace_ids:
+            self.counters["misses" if len(words) >= MIN_WORDS else "skipped"] += 1
+            return None
+        scores = self.vectors[:self.count] @ embed(words)
+        scores[self.namespaces[:self.count] != self.namespace_ids[namespace]] = -1.0
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        hit = similarity >= self.threshold and self.entries[best][2] == guard(words)
+        self.lookup_ms += 0.1 * ((time.perf_counter() - start) * 1000 - self.lookup_ms)
+        if not hit:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        self.last_used[best] = time.time()
+        return self.entries[best][1], similarity
+
+    def add(self, namespace, question, answer):
+        if not self.size:
+            return
+        words = normalise(question)
+        if len(words) < MIN_WORDS:
+            return
+        if self.count < self.size:
+            slot = self.count
+            self.count += 1
+        else:
+            slot = int(np.argmin(self.last_used))  # least recently used
+            self._release(int(self.namespaces[slot]))
+            self.counters["evicted"] += 1
+        self.vectors[slot] = embed(words)
+        self.namespaces[slot] = self._namespace(namespace)
+        self.last_used[slot] = time.time()
+        self.entries[slot] = (question, answer, guard(words))
+        self.counters["added"] += 1
+
+    def stats(self):
+        asked = self.counters["hits"] + self.counters["misses"]
+        return {"entries": self.count, "namespaces": len(self.namespace_ids), "size": self.size,
+                "threshold": self.threshold,
+                "hit_rate": self.counters["hits"] / asked if asked else 0.0,
+                "lookup_ms": round(self.lookup_ms, 3), "matrix_bytes": self.vectors.nbytes, **self.counters}
+
+
+if __name__ == "__main__":
+    # Lookup latency with a full cache: python ChatService/semantic_cache.py --entries 100000
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="Time semantic cache lookups")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocab = [f"word{i}" for i in range(20000)]
+    cache = SemanticCache(size=args.entries)
+    for i in range(args.entries):
+        cache.add("bench", " ".join(rng.choices(vocab, k=rng.randint(3, 12))), "answer")
+    cache.add("bench", "who made you", "Aadish")
+    times = []
+    for i in range(args.lookups):
+        question = "who created you?" if i % 2 else " ".join(rng.choices(vocab, k=6))
+        start = time.perf_counter()
+        cache.lookup("bench", question)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    print(f"{args.entries} entries, {cache.vectors.nbytes / 1e6:.0f} MB: lookup p50 {times[len(times) // 2]:.2f} ms, "
+          f"p99 {times[int(len(times) * 0.99)]:.2f} ms, hit rate {cache.stats()['hit_rate']:.0%}")
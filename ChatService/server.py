@@ -0,0 +1,310 @@
+# Chat service shared by all the chat front-ends
+# Keeps the conversations, applies the memory policy, picks the model and talks to Groq, so the Streamlit apps
+# and CLI bots only send a question and show the answer. Any number of app replicas can use one service.
+# Usage: GROQ_API_KEY=... python ChatService/server.py [--host 0.0.0.0] [--port 8080]
+#
+# API (JSON):
+#   GET    /health
+#   GET    /models                    the models, plus "auto" and its tiers
+#   GET    /stats?sessions=1          memory use in total and per session, rate-limit queues and budgets per model,
+#                                     latency and error EWMAs the router keeps per model, semantic cache hit rate,
+#                                     upstream calls saved by coalescing identical ones, hedged calls and
+#                                     circuit breaker state per model
+#   POST   /sessions                  {"model", "system_prompt", "memory", "options"} -> session
+#                                     model "auto" routes every question to a model, see router.py
+#   GET    /sessions/{id}?limit=N     session with its newest messages (default: the ones kept in RAM)
+#   DELETE /sessions/{id}
+#   POST   /sessions/{id}/messages    {"content", "model", "stream", "temperature", "max_tokens", "top_p", "cache"}
+#          stream=false -> {"reply", "model", "usage", "stored"}, plus "cached": similarity when answered from the cache
+#          stream=true  -> NDJSON lines {"delta": "..."} then {"done": true, "model", "stored", ["cached"]} or {"error"},
+#                          while waiting for Groq quota {"queued": place in line, "eta": seconds} comes first.
+#          "stored": false means the session was deleted meanwhile and the exchange is not in its history
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from aiohttp import web
+
+from llm import DEFAULT_MODEL, MODELS, OPTIONS, GroqBackend, UpstreamError
+from router import AUTO, TIERS, ModelRouter
+from semantic_cache import SemanticCache, standalone
+from sessions import SessionStore, sweep_idle
+
+HOST = os.getenv("CHAT_SERVICE_HOST", "0.0.0.0")
+PORT = int(os.getenv("CHAT_SERVICE_PORT", "8080"))
+
+STORE = web.AppKey("store", SessionStore)
+BACKEND = web.AppKey("backend", GroqBackend)
+ROUTER = web.AppKey("router", ModelRouter)
+CACHE = web.AppKey("cache", SemanticCache)
+
+routes = web.RouteTableDef()
+
+
+def error(status, message, **headers):
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+def http_error(cls, message):
+    # For checks deep in a handler, raised instead of returned
+    return cls(text=json.dumps({"error": message}), content_type="application/json")
+
+
+async def read_json(request):
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        raise http_error(web.HTTPBadRequest, "body is not valid JSON")
+    if not isinstance(data, dict):
+        raise http_error(web.HTTPBadRequest, "body must be a JSON object")
+    return data
+
+
+def check_model(model):
+    if model not in MODELS and model != AUTO:
+        raise http_error(web.HTTPBadRequest, f"unknown model {model!r}")
+    return model
+
+
+def check_options(data):
+    # Only the options Groq knows about, inside their valid range
+    options = {}
+    for name, (low, high) in OPTIONS.items():
+        if data.get(name) is None:
+            continue
+        value = data[name]
+        if not isinstance(value, (int, float)) or not low <= value <= high:
+            raise http_error(web.HTTPBadRequest, f"{name} must be between {low} and {high}")
+        options[name] = value
+    return options
+
+
+def get_session(request):
+    session = request.app[STORE].get(request.match_info["session_id"])
+    if session is None:
+        raise http_error(web.HTTPNotFound, "no such session")
+    return session
+
+
+@routes.get("/health")
+async def health(request):
+    return web.json_response({"status": "ok", **request.app[STORE].stats()})
+
+
+@routes.get("/stats")
+async def stats(request):
+    data = request.app[STORE].stats(per_session=request.query.get("sessions") == "1")
+    data["rate_limits"] = request.app[BACKEND].limiter.stats()
+    data["router"] = request.app[ROUTER].stats()
+    data["semantic_cache"] = request.app[CACHE].stats()
+    data["singleflight"] = request.app[BACKEND].flights.stats()
+    data["resilience"] = {"hedging": request.app[BACKEND].hedger.stats(),
+                          "breakers": {model: b.stats() for model, b in request.app[BACKEND].breakers.items()}}
+    return web.json_response(data)
+
+
+@routes.get("/models")
+async def models(request):
+    return web.json_response({"models": MODELS, "default": DEFAULT_MODEL, "auto": AUTO, "tiers": TIERS})
+
+
+@routes.post("/sessions")
+async def create_session(request):
+    data = await read_json(request)
+    model = check_model(data.get("model") or DEFAULT_MODEL)
+    options = check_options(data.get("options") or {})
+    try:
+        session = request.app[STORE].create(model, data.get("system_prompt"), data.get("memory"), options)
+    except (TypeError, ValueError) as e:
+        return error(400, f"bad memory policy: {e}")
+    return web.json_response(session.to_dict(), status=201)
+
+
+@routes.get("/sessions/{session_id}")
+async def read_session(request):
+    session = get_session(request)
+    limit = request.query.get("limit")
+    if limit is None:
+        return web.json_response(session.to_dict())
+    if not limit.isdigit():
+        return error(400, "limit must be a whole number")
+    return web.json_response(session.to_dict(request.app[STORE].history(session, int(limit))))
+
+
+@routes.delete("/sessions/{session_id}")
+async def delete_session(request):
+    if not request.app[STORE].delete(request.match_info["session_id"]):
+        return error(404, "no such session")
+    return web.json_response({"deleted": True})
+
+
+def outcome(router, model, start, failure=None, first=None):
+    # Feeds one call into the router's latency/error stats and returns it for the decision log.
+    # Latency is until the reply starts: the first token when streaming, the whole reply otherwise.
+    # Only transport errors, timeouts and 5xx count against the model; a 400 or 429 says nothing about its health.
+    total = time.monotonic() - start
+    if failure is None or failure.status >= 500:
+        router.record(model, first if first is not None else total, failure is None)
+    entry = {"model": model, "ok": failure is None, "total": round(total, 3)}
+    if first is not None:
+        entry["first_token"] = round(first, 3)
+    if failure is not None:
+        entry["status"] = failure.status
+    return entry
+
+
+async def send_cached(request, session, content, hit, stream):
+    # A question asked before in other words, answered like a fresh reply but marked "cached" with the similarity
+    (reply, model), similarity = hit
+    stored = request.app[STORE].add_exchange(session, content, reply)
+    if not stream:
+        return web.json_response({"reply": reply, "model": model, "usage": {}, "cached": round(similarity, 3),
+                                  "stored": stored})
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+    await response.prepare(request)
+    try:
+        await response.write((json.dumps({"delta": reply}) + "\n").encode())
+        await response.write((json.dumps({"done": True, "model": model, "cached": round(similarity, 3),
+                                          "stored": stored}) + "\n").encode())
+        await response.write_eof()
+    except ConnectionResetError:
+        pass
+    return response
+
+
+@routes.post("/sessions/{session_id}/messages")
+async def send_message(request):
+    session = get_session(request)
+    with request.app[STORE].pinned(session):
+        return await answer(request, session)
+
+
+async def answer(request, session):
+    data = await read_json(request)
+    content = data.get("content")
+    if not isinstance(content, str) or not content.strip():
+        return error(400, "content must be a non-empty string")
+    model = check_model(data.get("model") or session.model)
+    options = {**session.options, **check_options(data)}
+    backend = request.app[BACKEND]
+    router = request.app[ROUTER]
+    cache = request.app[CACHE]
+
+    async with session.lock:
+        messages = session.prompt(content)
+        # Questions that make sense on their own may be answered from a near-duplicate asked before, by the same
+        # model (or "auto") under the same system prompt and generation options (a max_tokens=50 or
+        # temperature=1.5 session never gets another's reply). "cache": false in the body skips it.
+        namespace = (model, session.system_prompt, tuple(sorted(options.items())))
+        history = [m for m in messages[:-1] if m["role"] != "system"]
+        cacheable = data.get("cache", True) is not False and standalone(content, history)
+        hit = cache.lookup(namespace, content) if cacheable else None
+        if hit is not None:
+            return await send_cached(request, session, content, hit, data.get("stream"))
+        # "auto" lets the router pick, and move on to its next candidate when a model fails
+        decision = router.route(messages) if model == AUTO else None
+        candidates = decision["candidates"] if decision else [model]
+        attempts = []
+        if not candidates:  # no model's context window holds the conversation
+            router.log(session.id, decision, attempts)
+            return error(413, "conversation too long for any model")
+
+        if not data.get("stream"):
+            for model in candidates:
+                start = time.monotonic()
+                try:
+                    reply, usage = await backend.complete(model, messages, **options)
+                except UpstreamError as e:
+                    attempts.append(outcome(router, model, start, e))
+                    if model != candidates[-1]:
+                        continue
+                    if decision:
+                        router.log(session.id, decision, attempts)
+                    headers = {"Retry-After": e.retry_after} if e.retry_after else {}
+                    return error(e.status, str(e), **headers)
+                attempts.append(outcome(router, model, start))
+                break
+            if decision:
+                router.log(session.id, decision, attempts)
+            stored = request.app[STORE].add_exchange(session, content, reply)
+            if cacheable:
+                cache.add(namespace, content, (reply, model))
+            return web.json_response({"reply": reply, "model": model, "usage": usage, "stored": stored})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+        await response.prepare(request)
+        parts = []
+        gone = False  # the client went away; the reply is still finished, scored and kept
+
+        async def send(event):
+            nonlocal gone
+            if gone:
+                return
+            try:
+                await response.write((json.dumps(event) + "\n").encode())
+            except ConnectionResetError:
+                gone = True
+
+        async def queued(position, eta):
+            await send({"queued": position + 1, "eta": round(eta, 1)})
+
+        for model in candidates:
+            start = time.monotonic()
+            first = None
+            try:
+                async for delta in backend.stream(model, messages, on_queue=queued, **options):
+                    if first is None:
+                        first = time.monotonic() - start
+                    parts.append(delta)
+                    await send({"delta": delta})
+            except UpstreamError as e:
+                attempts.append(outcome(router, model, start, e, first))
+                if not parts and model != candidates[-1]:
+                    continue  # nothing was sent yet, so the next model can still answer
+                # Headers are already sent, so the failure goes in the stream and the exchange is not kept
+                await send({"error": str(e), "status": e.status})
+            else:
+                attempts.append(outcome(router, model, start, first=first))
+                stored = request.app[STORE].add_exchange(session, content, "".join(parts))
+                if cacheable:
+                    cache.add(namespace, content, ("".join(parts), model))
+                await send({"done": True, "model": model, "stored": stored})
+            break
+        if not gone:
+            try:
+                await response.write_eof()
+            except ConnectionResetError:
+                pass
+        if decision:
+            router.log(session.id, decision, attempts)
+        return response
+
+
+async def background(app):
+    sweeper = asyncio.create_task(sweep_idle(app[STORE]))
+    yield
+    sweeper.cancel()
+    await app[BACKEND].close()
+    app[STORE].close()
+
+
+def make_app(backend=None, store=None, router=None, cache=None):
+    app = web.Application()
+    app[STORE] = store or SessionStore()
+    app[BACKEND] = backend or GroqBackend()
+    app[ROUTER] = router or ModelRouter(MODELS, app[BACKEND].limiter)
+    app[CACHE] = cache or SemanticCache()
+    app.add_routes(routes)
+    app.cleanup_ctx.append(background)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared chat service for the chat front-ends")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    web.run_app(make_app(), host=args.host, port=args.port)
@@ -0,0 +1,243 @@
+# Conversation state for every chat front-end, kept by the service instead of each Streamlit process
+# RAM only holds a ring of the newest messages per session and the sessions in use, under one global byte cap.
+# Every message is also written to sqlite, so sessions dropped from RAM (idle or over the cap) come back on demand.
+import asyncio
+import contextlib
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
+
+from memory import make_memory
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("CHAT_SESSION_DB", os.path.join(HERE, "sessions.db"))
+RING_SIZE = int(os.getenv("CHAT_RING_SIZE", "50"))  # messages per session kept in RAM
+MAX_BYTES = int(float(os.getenv("CHAT_MEMORY_MB", "64")) * 1024 * 1024)  # all sessions together
+IDLE_SECONDS = int(os.getenv("CHAT_IDLE_SECONDS", "900"))  # unused this long -> dropped from RAM
+SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL_DAYS", "30")) * 86400  # unused this long -> deleted
+SESSION_OVERHEAD = 1024  # rough cost of a Session object, its lock and its deque
+MESSAGE_OVERHEAD = 200   # rough cost of a message dict on top of its text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY, model TEXT, system_prompt TEXT, memory TEXT, options TEXT,
+    created REAL, last_used REAL, length INTEGER
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT, seq INTEGER, role TEXT, content TEXT,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+def message_bytes(message):
+    return sys.getsizeof(message["content"]) + MESSAGE_OVERHEAD
+
+
+class Session():
+    def __init__(self, session_id, model, system_prompt=None, memory=None, options=None, created=None, length=0):
+        self.id = session_id
+        self.model = model
+        self.system_prompt = system_prompt
+        self.memory = make_memory(memory)
+        self.options = dict(options or {})  # default temperature, max_tokens, top_p for this session
+        self.messages = deque(maxlen=RING_SIZE)  # the newest messages, older ones are only in sqlite
+        self.length = length  # messages over the whole life of the session
+        self.created = created or time.time()
+        self.last_used = time.time()
+        self.bytes = SESSION_OVERHEAD + (sys.getsizeof(system_prompt) if system_prompt else 0)
+        # One message at a time per session, so replies land in the order they were asked
+        self.lock = asyncio.Lock()
+        self.pins = 0  # requests using the session right now, it stays in RAM while there are any
+
+    def prompt(self, content):
+        # Messages sent upstream: system prompt, what the memory policy keeps, the new question
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        messages.extend(self.memory.select(list(self.messages)))
+        messages.append({"role": "user", "content": content})
+        return messages
+
+    def add(self, role, content):
+        message = {"role": role, "content": content}
+        if len(self.messages) == self.messages.maxlen:
+            self.bytes -= message_bytes(self.messages[0])
+        self.messages.append(message)
+        self.bytes += message_bytes(message)
+        self.length += 1
+        self.last_used = time.time()
+        return message
+
+    def to_dict(self, messages=None):
+        return {
+            "id": self.id,
+            "model": self.model,
+            "system_prompt": self.system_prompt,
+            "memory": self.memory.to_dict(),
+            "options": self.options,
+            "created": self.created,
+            "last_used": self.last_used,
+            "length": self.length,
+            "memory_bytes": self.bytes,
+            "messages": list(self.messages) if messages is None else messages,
+        }
+
+
+class SessionStore():
+    def __init__(self, db_path=DB_PATH, max_bytes=MAX_BYTES, idle_seconds=IDLE_SECONDS, ttl=SESSION_TTL):
+        self.sessions = OrderedDict()  # least recently used first
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.counters = {"created": 0, "restored": 0, "evicted_idle": 0, "evicted_cap": 0, "expired": 0,
+                         "exchanges_dropped": 0}
+
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _keep(self, session):
+        self.sessions[session.id] = session
+        self.total_bytes += session.bytes
+        self._enforce_cap(session)
+
+    def create(self, model, system_prompt=None, memory=None, options=None):
+        session = Session(secrets.token_urlsafe(16), model, system_prompt, memory, options)
+        with self.db:
+            self.db.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                            (session.id, model, system_prompt, json.dumps(session.memory.to_dict()),
+                             json.dumps(session.options), session.created, session.last_used))
+        self.counters["created"] += 1
+        self._keep(session)
+        return session
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self._restore(session_id)
+            if session is None:
+                return None
+            self._keep(session)
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_used = time.time()
+        return session
+
+    @contextlib.contextmanager
+    def pinned(self, session):
+        # Keeps the session in RAM for the block, so whatever the request awaits (its body, the session lock,
+        # the reply) its exchange lands on the live object instead of a copy the cap already evicted
+        session.pins += 1
+        try:
+            yield session
+        finally:
+            session.pins -= 1
+
+    def _restore(self, session_id):
+        row = self.db.execute("SELECT model, system_prompt, memory, options, created, length FROM sessions WHERE id = ?",
+                              (session_id,)).fetchone()
+        if row is None:
+            return None
+        model, system_prompt, memory, options, created, length = row
+        session = Session(session_id, model, system_prompt, json.loads(memory), json.loads(options), created)
+        rows = self.db.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                               (session_id, RING_SIZE)).fetchall()
+        for role, content in reversed(rows):
+            session.add(role, content)
+        session.length = length
+        self.counters["restored"] += 1
+        return session
+
+    def add_exchange(self, session, question, answer):
+        # Returns False when the exchange could not be stored, the caller tells the client
+        if self.sessions.get(session.id) is not session:
+            self.counters["exchanges_dropped"] += 1  # deleted while the reply was being written
+            return False
+        before = session.bytes
+        first = session.length
+        session.add("user", question)
+        session.add("assistant", answer)
+        self.total_bytes += session.bytes - before
+        with self.db:
+            self.db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?)",
+                                [(session.id, first, "user", question), (session.id, first + 1, "assistant", answer)])
+            self.db.execute("UPDATE sessions SET last_used = ?, length = ? WHERE id = ?",
+                            (session.last_used, session.length, session.id))
+        self._enforce_cap(session)
+        return True
+
+    def history(self, session, limit):
+        # The newest `limit` messages, from RAM when the ring has them
+        if limit <= len(session.messages):
+            return list(session.messages)[-limit:] if limit > 0 else []
+        rows = self.db.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                               (session.id, limit)).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def delete(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.total_bytes -= session.bytes
+        with self.db:
+            self.db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            deleted = self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+        return session is not None or deleted > 0
+
+    def _evict(self, session, reason):
+        # Everything is already in sqlite, so dropping it from RAM loses nothing
+        del self.sessions[session.id]
+        self.total_bytes -= session.bytes
+        self.counters[reason] += 1
+
+    def _enforce_cap(self, keep=None):
+        # Oldest first, never the session being served or one a request is using
+        for session in list(self.sessions.values()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if session is not keep and not session.pins and not session.lock.locked():
+                self._evict(session, "evicted_cap")
+
+    def evict_idle(self, now=None):
+        now = now or time.time()
+        for session in list(self.sessions.values()):
+            if now - session.last_used > self.idle_seconds and not session.pins and not session.lock.locked():
+                self._evict(session, "evicted_idle")
+        # Sessions nobody came back to for a long time are deleted from disk as well
+        cutoff = now - self.ttl
+        with self.db:
+            self.db.execute("DELETE FROM messages WHERE session_id IN (SELECT id FROM sessions WHERE last_used < ?)",
+                            (cutoff,))
+            self.counters["expired"] += self.db.execute("DELETE FROM sessions WHERE last_used < ?", (cutoff,)).rowcount
+
+    def stats(self, per_session=False):
+        data = {
+            "sessions_in_memory": len(self.sessions),
+            "sessions_on_disk": self.db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+            "memory_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            **self.counters,
+        }
+        if per_session:
+            now = time.time()
+            data["sessions"] = sorted(
+                ({"id": s.id, "memory_bytes": s.bytes, "messages_in_memory": len(s.messages), "length": s.length,
+                  "idle_seconds": round(now - s.last_used, 1)} for s in self.sessions.values()),
+                key=lambda s: s["memory_bytes"], reverse=True)
+        return data
+
+
+async def sweep_idle(store, interval=60):
+    # Background task of the server: drop idle sessions from RAM now and then
+    while True:
+        await asyncio.sleep(interval)
+        store.evict_idle()
@@ -0,0 +1,101 @@
+# Identical Groq calls in flight at the same time share one upstream call
+# Sessions with the same system prompt asking the same first question send exactly the same messages. The first
+# caller makes the call, later ones wait for its reply, and streamed replies (and rate-limit queue updates) are
+# replayed to every follower as they arrive. The shared call runs in its own task, so it carries on if the client
+# that started it goes away.
+import asyncio
+import hashlib
+import json
+
+
+def request_key(kind, model, messages, options):
+    body = json.dumps([kind, model, messages, options], sort_keys=True)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class _Stream():
+    # The deltas of one streamed reply so far, for every caller following it
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Event()
+        self.listeners = []  # on_queue callbacks of the callers following this stream
+
+    def _notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def queued(self, position, eta):
+        # Passed to the shared call as its on_queue, tells every follower
+        for listener in list(self.listeners):
+            try:
+                await listener(position, eta)
+            except Exception:
+                self.listeners.remove(listener)  # that client is gone
+
+    async def feed(self, deltas):
+        try:
+            async for delta in deltas:
+                self.parts.append(delta)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def follow(self, on_queue=None):
+        if on_queue:
+            self.listeners.append(on_queue)
+        sent = 0
+        try:
+            while True:
+                while sent < len(self.parts):
+                    yield self.parts[sent]
+                    sent += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self.changed.wait()
+        finally:
+            if on_queue in self.listeners:
+                self.listeners.remove(on_queue)
+
+
+class SingleFlight():
+    def __init__(self):
+        self.calls = {}  # key -> task of a call in flight
+        self.streams = {}  # key -> _Stream in flight
+        self.tasks = set()
+        self.counters = {"calls": 0, "upstream": 0, "saved": 0}  # saved: calls that got another call's result
+
+    def _count(self, leader):
+        self.counters["calls"] += 1
+        self.counters["upstream" if leader else "saved"] += 1
+
+    async def do(self, key, call):
+        # await call(), or the call with the same key that is already running
+        task = self.calls.get(key)
+        self._count(task is None)
+        if task is None:
+            task = self.calls[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        # shield: a caller that gives up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def stream(self, key, start, on_queue=None):
+        # Yields the deltas of start(on_queue), an async generator, or of the same stream that is already running
+        stream = self.streams.get(key)
+        self._count(stream is None)
+        if stream is None:
+            stream = self.streams[key] = _Stream()
+            task = asyncio.ensure_future(stream.feed(start(stream.queued)))
+            self.tasks.add(task)  # keep a reference until it finishes
+            task.add_done_callback(lambda t: (self.tasks.discard(t), self.streams.pop(key, None)))
+        async for delta in stream.follow(on_queue):
+            yield delta
+
+    def stats(self):
+        return {**self.counters, "in_flight": len(self.calls) + len(self.streams)}
@@ -0,0 +1,12 @@
+# Performance of this app, see shared/performance_page.py
+import os
+import sys
+
+import streamlit as st
+
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from shared.performance_page import render
+
+st.set_page_config(page_title="Performance", page_icon="📈", layout="wide")
+render()
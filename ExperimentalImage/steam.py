@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import os
+import sys
 import io
 from PIL import Image
 from dotenv import load_dotenv, find_dotenv
@@ -8,6 +9,13 @@ from datetime import datetime
 import re
 import base64
 
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.background import background_css
+from shared.hf_client import HFClient
+from shared.metrics import METRICS
+from shared.resilience import CircuitOpen
+
 # Load environment variables from .env file
 load_dotenv(find_dotenv())
 
@@ -15,37 +23,45 @@ load_dotenv(find_dotenv())
 HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
+# API hosts, can be pointed at the local stand-ins in loadtest/stubs.py
+HF_API_BASE = os.getenv("HF_API_BASE", "https://api-inference.huggingface.co")
+GITHUB_API_BASE = os.getenv("GITHUB_API_BASE", "https://api.github.com")
+# Seconds to connect and to wait for GitHub, a stuck upload must not hang the page forever
+GITHUB_TIMEOUT = (10, 60)
+
 # Define models and their API URLs
 # Define models and their API URLs
 models = {
-    "Stable Diffusion v1.5": "https://api-inference.huggingface.co/models/runwayml/stable-diffusion-v1-5",
-    "FLUX.1": "https://api-inference.huggingface.co/models/black-forest-labs/FLUX.1-schnell",
-    "phantasma-anime": "https://api-inference.huggingface.co/models/alvdansen/phantasma-anime",
-    "newrealityxl": "https://api-inference.huggingface.co/models/stablediffusionapi/newrealityxl-global-nsfw",
-    "Stable Diffusion 3": "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-3-medium-diffusers",
-    "Clandestine XL 1.0": "https://api-inference.huggingface.co/models/yodayo-ai/clandestine-xl-1.0",
-    "Animagine XL 3.1": "https://api-inference.huggingface.co/models/cagliostrolab/animagine-xl-3.1",
-    "ICantBelieveItSNotPhotography": "https://api-inference.huggingface.co/models/Yntec/ICantBelieveItSNotPhotography",
-    "DreamlikePhotoReal2": "https://api-inference.huggingface.co/models/Yntec/DreamlikePhotoReal2",
-    "beLIEve": "https://api-inference.huggingface.co/models/Yntec/beLIEve",
-    "Counterfeit-V2.5": "https://api-inference.huggingface.co/models/gsdf/Counterfeit-V2.5",
+    "Stable Diffusion v1.5": f"{HF_API_BASE}/models/runwayml/stable-diffusion-v1-5",
+    "FLUX.1": f"{HF_API_BASE}/models/black-forest-labs/FLUX.1-schnell",
+    "phantasma-anime": f"{HF_API_BASE}/models/alvdansen/phantasma-anime",
+    "newrealityxl": f"{HF_API_BASE}/models/stablediffusionapi/newrealityxl-global-nsfw",
+    "Stable Diffusion 3": f"{HF_API_BASE}/models/stabilityai/stable-diffusion-3-medium-diffusers",
+    "Clandestine XL 1.0": f"{HF_API_BASE}/models/yodayo-ai/clandestine-xl-1.0",
+    "Animagine XL 3.1": f"{HF_API_BASE}/models/cagliostrolab/animagine-xl-3.1",
+    "ICantBelieveItSNotPhotography": f"{HF_API_BASE}/models/Yntec/ICantBelieveItSNotPhotography",
+    "DreamlikePhotoReal2": f"{HF_API_BASE}/models/Yntec/DreamlikePhotoReal2",
+    "beLIEve": f"{HF_API_BASE}/models/Yntec/beLIEve",
+    "Counterfeit-V2.5": f"{HF_API_BASE}/models/gsdf/Counterfeit-V2.5",
 }
 
 
 # Sidebar for model selection
 selected_model = st.sidebar.selectbox("Choose a model", list(models.keys()))
 API_URL = models[selected_model]
-headers = {"Authorization": f"Bearer {HUGGINGFACEHUB_API_TOKEN}"}
 
 # GitHub repository details
 GITHUB_REPO = "AadishY/Images"  # Replace with your GitHub username/repo
 GITHUB_PATH = "images/"  # Path in the repository to save the images
 GITHUB_BRANCH = "main"  # Branch where images will be saved
 
+@st.cache_resource
+def get_hf_client():
+    # One per process, so sessions share identical calls in flight and each model's hedging and breaker
+    return HFClient(HUGGINGFACEHUB_API_TOKEN)
+
 def query(payload):
-    response = requests.post(API_URL, headers=headers, json=payload)
-    response.raise_for_status()  # Raises an error for bad responses
-    return response.content
+    return get_hf_client().query(API_URL, payload)
 
 def text2image(prompt: str):
     image_bytes = query({"inputs": prompt})
@@ -64,7 +80,7 @@ def text2image(prompt: str):
     img_str = base64.b64encode(buffered.getvalue()).decode()
 
     # Create the GitHub API URL
-    github_api_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_PATH}{filename}"
+    github_api_url = f"{GITHUB_API_BASE}/repos/{GITHUB_REPO}/contents/{GITHUB_PATH}{filename}"
     
     # Prepare the data for the GitHub API
     data = {
@@ -74,21 +90,23 @@ def text2image(prompt: str):
     }
     
     # Send the request to GitHub API
-    response = requests.put(github_api_url, headers={"Authorization": f"token {GITHUB_TOKEN}"}, json=data)
+    with METRICS.timer("image: GitHub upload"):
+        response = requests.put(github_api_url, headers={"Authorization": f"token {GITHUB_TOKEN}"}, json=data,
+                                timeout=GITHUB_TIMEOUT)
     response.raise_for_status()  # Check if the request was successful
     
     return response.json()["content"]["download_url"], filename
 
 # Streamlit app
 st.markdown(
-    """
+    f"""
     <style>
-    .stApp {
-        background-image: url('https://cdn.jsdelivr.net/gh/AadishY/Python-Aadish@main/merge.gif');
+    {background_css(__file__)}
+    .stApp {{
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
-    }
+    }}
     </style>
     """,
     unsafe_allow_html=True
@@ -104,7 +122,11 @@ prompt = st.text_area("Enter your prompt here:", placeholder="Enter the prompt c
 if st.button("Enter"):
     if prompt:
         with st.spinner("Aadish is cooking 🧑‍🍳....."):
-            image_url, filename = text2image(prompt)
+            try:
+                image_url, filename = text2image(prompt)
+            except CircuitOpen as e:
+                st.error(f"{e}. Try again later or pick another model.")
+                st.stop()
             st.success("Image generated and saved to GitHub successfully!")
 
             # Display the image in the Streamlit app
@@ -1,9 +1,21 @@
-import streamlit as st
-import torch
-from diffusers import AnimateDiffPipeline, DDIMScheduler, MotionAdapter
-from diffusers.utils import export_to_gif
-from PIL import Image
 import os
+import sys
+import threading
+
+import streamlit as st
+import schedulers
+import video_cache
+
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.metrics import METRICS
+
+# torch and diffusers take seconds to import, so they (and prompt_cache, which uses torch) are only imported
+# once a video is generated. long_video imports torch only when it generates. Showing the form and answering
+# from the result cache stay fast.
+
+ADAPTER_ID = "guoyww/animatediff-motion-adapter-v1-5-2"
+MODEL_ID = "SG161222/Realistic_Vision_V5.1_noVAE"
 
 # Streamlit App Title
 st.title("Text-to-Video Generation with AnimateDiff")
@@ -18,65 +30,154 @@ prompt = st.text_area(
 )
 
 negative_prompt = st.text_input("Enter negative prompt (optional):", "bad quality, worse quality")
-num_frames = st.slider("Number of frames:", min_value=8, max_value=64, value=16)
-guidance_scale = st.slider("Guidance scale:", min_value=1.0, max_value=15.0, value=7.5)
-num_inference_steps = st.slider("Number of inference steps:", min_value=10, max_value=100, value=25)
+long_mode = st.checkbox("Long video mode (generate in overlapping windows, saves as MP4)")
+if long_mode:
+    num_frames = st.slider("Number of frames:", min_value=16, max_value=512, value=96, step=4)
+else:
+    num_frames = st.slider("Number of frames:", min_value=8, max_value=64, value=16)
+
+# Speed/quality preset picks the scheduler and sensible step counts
+preset_names = schedulers.available_presets()
+if not preset_names:
+    st.error("diffusers is not installed, or has none of the schedulers the presets need.")
+    st.stop()
+# The default preset is hidden when the installed diffusers lacks its scheduler
+default_index = preset_names.index(schedulers.DEFAULT_PRESET) if schedulers.DEFAULT_PRESET in preset_names else 0
+preset_name = st.selectbox("Speed / quality preset:", preset_names, index=default_index)
+preset = schedulers.PRESETS[preset_name]
+timings = schedulers.benchmark_timings()
+if preset_name in timings and schedulers.DEFAULT_PRESET in timings:
+    speedup = timings[schedulers.DEFAULT_PRESET] / timings[preset_name]
+    st.caption(f"{preset['description']} About {speedup:.1f}x the speed of {schedulers.DEFAULT_PRESET} in benchmarks.")
+else:
+    st.caption(preset["description"])
+
+guidance_scale = st.slider("Guidance scale:", min_value=1.0, max_value=15.0, value=preset["guidance_scale"])
+num_inference_steps = st.slider(
+    "Number of inference steps:", min_value=preset["min_steps"], max_value=preset["max_steps"], value=preset["steps"]
+)
 seed = st.number_input("Random seed (optional):", value=42, step=1)
 
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_pipeline(preset_name):
+    # Loaded once and kept for the next clicks; switching presets replaces it, only one fits in memory
+    import torch
+    from diffusers import AnimateDiffPipeline, MotionAdapter
+
+    # Load the motion adapter, distilled presets bring their own
+    adapter_id = schedulers.PRESETS[preset_name].get("adapter", ADAPTER_ID)
+    adapter = MotionAdapter.from_pretrained(adapter_id, torch_dtype=torch.float16)
+
+    # Load a finetuned Stable Diffusion model
+    pipe = AnimateDiffPipeline.from_pretrained(MODEL_ID, motion_adapter=adapter, torch_dtype=torch.float16)
+
+    # Set up the scheduler
+    schedulers.apply_preset(pipe, preset_name, MODEL_ID)
+
+    # Enable memory savings
+    pipe.enable_vae_slicing()
+    pipe.enable_model_cpu_offload()
+    return pipe
+
+
+@st.cache_resource
+def generation_lock():
+    return threading.Lock()
+
+
+@st.cache_resource
+def get_prompt_cache():
+    # Shared by every session so repeated prompts skip the text encoder
+    import prompt_cache
+
+    embeddings = prompt_cache.PromptEmbeddingCache()
+    METRICS.gauge("video: prompt cache hit rate", lambda: round(embeddings.stats()["hit_rate"], 3))
+    return embeddings
+
+
 # Generate Button
 if st.button("Generate Video"):
+    import long_video
 
-    # Load the motion adapter
-    with st.spinner("Loading model..."):
-        adapter = MotionAdapter.from_pretrained("guoyww/animatediff-motion-adapter-v1-5-2", torch_dtype=torch.float16)
-
-        # Load a finetuned Stable Diffusion model
-        model_id = "SG161222/Realistic_Vision_V5.1_noVAE"
-        pipe = AnimateDiffPipeline.from_pretrained(model_id, motion_adapter=adapter, torch_dtype=torch.float16)
-
-        # Set up the scheduler
-        scheduler = DDIMScheduler.from_pretrained(
-            model_id,
-            subfolder="scheduler",
-            clip_sample=False,
-            timestep_spacing="linspace",
-            beta_schedule="linear",
-            steps_offset=1,
-        )
-        pipe.scheduler = scheduler
-
-        # Enable memory savings
-        pipe.enable_vae_slicing()
-        pipe.enable_model_cpu_offload()
-
-    # Generate video frames
-    with st.spinner("Generating video frames..."):
-        output = pipe(
-            prompt=prompt,
-            negative_prompt=negative_prompt,
-            num_frames=num_frames,
-            guidance_scale=guidance_scale,
-            num_inference_steps=num_inference_steps,
-            generator=torch.Generator("cpu").manual_seed(seed),
-        )
+    # Identical inputs with a fixed seed give identical frames, so reuse earlier results
+    model_ids = dict(adapter=ADAPTER_ID, model=MODEL_ID, preset=preset_name)
+    if long_mode:
+        model_ids.update(window=long_video.WINDOW_FRAMES, overlap=long_video.OVERLAP_FRAMES)
+    ext = "mp4" if long_mode else "gif"
+    cache_key = video_cache.make_key(
+        prompt, negative_prompt, num_frames, guidance_scale, num_inference_steps, seed, **model_ids
+    )
+    video_path = video_cache.get(cache_key, ext)
+    METRICS.cache("video: result cache", video_path is not None, preset_name)
+
+    if video_path is None:
+        # The cached pipeline is shared by every session, they take turns with it
+        with METRICS.queue("video: generation", generation_lock(), preset_name):
+            with st.spinner("Loading model..."), METRICS.timer("video: load pipeline", preset_name):
+                pipe = load_pipeline(preset_name)
 
-        # Export to GIF
-        frames = output.frames[0]
-        gif_path = "animation.gif"
-        export_to_gif(frames, gif_path)
+            # Reuse text embeddings when only seed, frames or guidance changed
+            embeddings = get_prompt_cache()
+            with METRICS.timer("video: encode prompt", preset_name):
+                prompt_inputs = embeddings.encode_pair(pipe, prompt, negative_prompt, namespace=preset_name)
+
+            if long_mode:
+                # Denoise one window at a time and stream finished frames into the encoder
+                progress = st.progress(0.0, text="Generating video frames...")
+                frames = long_video.generate_frames(
+                    pipe, prompt, negative_prompt, num_frames, guidance_scale, num_inference_steps, seed,
+                    on_window=lambda done, total: progress.progress(done / total, text=f"Window {done}/{total}"),
+                    prompt_embeds=prompt_inputs,
+                )
+                # frames is a generator, denoising happens while the video is written
+                with METRICS.timer("video: generate and encode", preset_name):
+                    long_video.write_video(frames, "animation.mp4")
+                video_path = video_cache.put(cache_key, "animation.mp4", ext)
+            else:
+                import torch
+                from diffusers.utils import export_to_gif
+
+                # Generate video frames
+                with st.spinner("Generating video frames..."):
+                    with METRICS.timer("video: generate", preset_name):
+                        output = pipe(
+                            **prompt_inputs,
+                            num_frames=num_frames,
+                            guidance_scale=guidance_scale,
+                            num_inference_steps=num_inference_steps,
+                            generator=torch.Generator("cpu").manual_seed(int(seed)),
+                        )
+
+                    # Export to GIF and keep a copy in the cache
+                    frames = output.frames[0]
+                    with METRICS.timer("video: encode", preset_name):
+                        export_to_gif(frames, "animation.gif")
+                    video_path = video_cache.put(cache_key, "animation.gif", ext)
 
-        # Display the generated GIF
         st.success("Video generation complete!")
-        st.image(gif_path, caption="Generated Video", use_column_width=True)
-
-        # Provide download option
-        with open(gif_path, "rb") as file:
-            btn = st.download_button(
-                label="Download GIF",
-                data=file,
-                file_name="generated_video.gif",
-                mime="image/gif"
-            )
+        cache_stats = embeddings.stats()
+        st.caption(
+            f"Prompt cache: {cache_stats['entries']} prompts, {cache_stats['bytes'] / 1024 / 1024:.1f} MB, "
+            f"hit rate {cache_stats['hit_rate']:.0%}"
+        )
+    else:
+        st.success("Loaded from cache!")
+
+    # Display the generated video
+    if long_mode:
+        st.video(video_path)
+    else:
+        st.image(video_path, caption="Generated Video", use_column_width=True)
+
+    # Provide download option
+    with open(video_path, "rb") as file:
+        btn = st.download_button(
+            label="Download MP4" if long_mode else "Download GIF",
+            data=file,
+            file_name=f"generated_video.{ext}",
+            mime="video/mp4" if long_mode else "image/gif"
+        )
 
 # Footer
 st.write("This application uses the AnimateDiff pipeline for text-to-video generation.")
@@ -0,0 +1,250 @@
+"""Offline CPU benchmark for the AnimateDiff pipeline used by app.py.
+
+The pipeline is built from tiny random-weight configs, so nothing is downloaded
+and the numbers only track framework overhead between torch/diffusers versions.
+
+    python benchmark.py --output results.json
+    python benchmark.py --output new.json --compare results.json
+    python benchmark.py --presets    # writes GenVideo/benchmark_results.json, which app.py reads
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_FRAMES = [8, 16]
+DEFAULT_STEPS = [4, 8]
+DEFAULT_DTYPES = ["float32", "bfloat16"]
+DEFAULT_THREADS = [1, os.cpu_count() or 1]
+REPEATS = 3
+
+
+def _tiny_tokenizer(folder):
+    from transformers import CLIPTokenizer
+
+    # Character level vocab so the tokenizer works without any download
+    vocab = {"<|startoftext|>": 0, "<|endoftext|>": 1, "!": 2}
+    for ch in "abcdefghijklmnopqrstuvwxyz,.":
+        vocab[ch] = len(vocab)
+        vocab[ch + "</w>"] = len(vocab)
+    with open(os.path.join(folder, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(folder, "merges.txt"), "w") as f:
+        f.write("#version: 0.2\n")
+    return CLIPTokenizer(os.path.join(folder, "vocab.json"), os.path.join(folder, "merges.txt"), model_max_length=77)
+
+
+def build_tiny_pipeline(scheduler_name="DDIMScheduler"):
+    import diffusers
+    import torch
+    from diffusers import AnimateDiffPipeline, AutoencoderKL, MotionAdapter, UNet2DConditionModel
+    from transformers import CLIPTextConfig, CLIPTextModel
+
+    torch.manual_seed(0)
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=2,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+        up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"),
+        cross_attention_dim=32,
+        norm_num_groups=2,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[32, 64],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D", "DownEncoderBlock2D"],
+        up_block_types=["UpDecoderBlock2D", "UpDecoderBlock2D"],
+        latent_channels=4,
+        norm_num_groups=2,
+    )
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        bos_token_id=0,
+        eos_token_id=1,
+        hidden_size=32,
+        intermediate_size=37,
+        layer_norm_eps=1e-05,
+        num_attention_heads=4,
+        num_hidden_layers=5,
+        pad_token_id=1,
+        vocab_size=1000,
+    ))
+    adapter = MotionAdapter(
+        block_out_channels=(32, 64),
+        motion_layers_per_block=2,
+        motion_norm_num_groups=2,
+        motion_num_attention_heads=4,
+    )
+    scheduler = getattr(diffusers, scheduler_name)(
+        beta_start=0.00085,
+        beta_end=0.012,
+        beta_schedule="linear",
+    )
+    tokenizer = _tiny_tokenizer(tempfile.mkdtemp(prefix="genvideo-bench-"))
+    return AnimateDiffPipeline(
+        unet=unet,
+        vae=vae,
+        text_encoder=text_encoder,
+        tokenizer=tokenizer,
+        motion_adapter=adapter,
+        scheduler=scheduler,
+    )
+
+
+def run_case(case):
+    # Runs in its own process so peak RSS belongs to this case only
+    import torch
+
+    torch.set_num_threads(case["threads"])
+    pipe = build_tiny_pipeline(case.get("scheduler", "DDIMScheduler"))
+    if case.get("preset"):
+        import schedulers
+
+        # Only the scheduler is swapped, LoRA weights don't fit the tiny random UNet
+        pipe.scheduler = schedulers.make_scheduler(case["preset"], config=pipe.scheduler.config)
+    pipe.to(dtype=getattr(torch, case["dtype"]))
+    pipe.set_progress_bar_config(disable=True)
+
+    def generate():
+        pipe(
+            prompt="sunset over the sea, fishing boats",
+            negative_prompt="bad quality",
+            num_frames=case["frames"],
+            num_inference_steps=case["steps"],
+            guidance_scale=7.5,
+            height=64,
+            width=64,
+            generator=torch.Generator("cpu").manual_seed(42),
+            output_type="np",
+        )
+
+    # First call pays for lazy allocations, keep it out of the numbers
+    generate()
+    times = []
+    for _ in range(case.get("repeats", REPEATS)):
+        start = time.perf_counter()
+        generate()
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+    wall = times[len(times) // 2]
+    return {
+        **case,
+        "wall_time_s": wall,
+        "min_wall_time_s": times[0],
+        "seconds_per_step": wall / case["steps"],
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def case_key(case):
+    return f"{case.get('preset') or case.get('scheduler', 'DDIMScheduler')}/f{case['frames']}/s{case['steps']}/{case['dtype']}/t{case['threads']}"
+
+
+def run_in_subprocess(case):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return {**case, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    import diffusers
+    import torch
+    import transformers
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "diffusers": diffusers.__version__,
+        "transformers": transformers.__version__,
+    }
+
+
+def compare(results, previous):
+    # Ratio < 1 means the new run is faster than the previous one
+    old = {case_key(r): r for r in previous["results"] if "error" not in r}
+    print(f"{'case':<40}{'old s/step':>12}{'new s/step':>12}{'ratio':>8}")
+    for r in results["results"]:
+        key = case_key(r)
+        if "error" in r or key not in old:
+            continue
+        ratio = r["seconds_per_step"] / old[key]["seconds_per_step"]
+        print(f"{key:<40}{old[key]['seconds_per_step']:>12.4f}{r['seconds_per_step']:>12.4f}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=DEFAULT_FRAMES)
+    parser.add_argument("--steps", type=int, nargs="+", default=DEFAULT_STEPS)
+    parser.add_argument("--dtypes", nargs="+", default=DEFAULT_DTYPES)
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREADS)
+    parser.add_argument("--schedulers", nargs="+", default=["DDIMScheduler"])
+    parser.add_argument("--presets", action="store_true", help="time every schedulers.py preset at its recommended steps")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    # Next to this script, where schedulers.BENCHMARK_RESULTS (the app's speed-up caption) reads it
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                          "benchmark_results.json"))
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    results = {"environment": environment(), "results": []}
+    cases = []
+    if args.presets:
+        import schedulers
+
+        for preset, frames, dtype, threads in itertools.product(
+            schedulers.available_presets(), args.frames, args.dtypes, sorted(set(args.threads))
+        ):
+            cases.append({"preset": preset, "scheduler": schedulers.PRESETS[preset]["scheduler"], "frames": frames,
+                          "steps": schedulers.PRESETS[preset]["steps"], "dtype": dtype, "threads": threads,
+                          "repeats": args.repeats})
+    else:
+        for scheduler, frames, steps, dtype, threads in itertools.product(
+            args.schedulers, args.frames, args.steps, args.dtypes, sorted(set(args.threads))
+        ):
+            cases.append({"scheduler": scheduler, "frames": frames, "steps": steps, "dtype": dtype,
+                          "threads": threads, "repeats": args.repeats})
+
+    for case in cases:
+        result = run_in_subprocess(case)
+        results["results"].append(result)
+        if "error" in result:
+            print(f"{case_key(case):<40} error: {result['error']}")
+        else:
+            print(f"{case_key(case):<40} {result['wall_time_s']:.3f}s  {result['seconds_per_step']:.4f}s/step  "
+                  f"{result['peak_rss_mb']:.0f}MB")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {len(results['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
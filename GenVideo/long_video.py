@@ -0,0 +1,101 @@
+import numpy as np
+from PIL import Image
+
+# torch is imported where it is used: the app reads WINDOW_FRAMES/OVERLAP_FRAMES for its result cache key
+# on every click, and a cache hit should not pay for a torch import
+
+# AnimateDiff motion modules are trained on 16 frame clips
+WINDOW_FRAMES = 16
+OVERLAP_FRAMES = 4
+
+
+def plan_windows(total_frames, window=WINDOW_FRAMES, overlap=OVERLAP_FRAMES):
+    # Start frame and length of every window, each one sharing `overlap` frames with the previous
+    if overlap >= window:
+        raise ValueError("overlap must be smaller than the window")
+    if total_frames <= window:
+        return [(0, total_frames)]
+
+    stride = window - overlap
+    windows = []
+    start = 0
+    while start + window < total_frames:
+        windows.append((start, window))
+        start += stride
+    windows.append((start, total_frames - start))
+    return windows
+
+
+def _window_noise(pipe, length, generator, carried=None):
+    # Initial latents for one window, shaped (batch, channels, frames, height, width)
+    import torch
+
+    channels = pipe.unet.config.in_channels
+    size = pipe.unet.config.sample_size
+    noise = torch.randn((1, channels, length, size, size), generator=generator, dtype=torch.float32)
+    if carried is not None:
+        # Reuse the noise of the overlapping frames so both windows start from the same point
+        noise[:, :, :carried.shape[2]] = carried
+    return noise
+
+
+def _blend(previous, current):
+    # Linear crossfade from the end of the previous window into the start of this one
+    blended = []
+    count = len(previous)
+    for i, (old, new) in enumerate(zip(previous, current)):
+        weight = (i + 1) / (count + 1)
+        mixed = (1 - weight) * np.asarray(old, dtype=np.float32) + weight * np.asarray(new, dtype=np.float32)
+        blended.append(Image.fromarray(mixed.round().astype(np.uint8)))
+    return blended
+
+
+def generate_frames(pipe, prompt, negative_prompt, total_frames, guidance_scale, num_inference_steps, seed,
+                    window=WINDOW_FRAMES, overlap=OVERLAP_FRAMES, on_window=None, prompt_embeds=None):
+    # Yields frames as soon as each window is decoded, so only one window is ever in memory
+    import torch
+
+    prompt_inputs = prompt_embeds or {"prompt": prompt, "negative_prompt": negative_prompt}
+    generator = torch.Generator("cpu").manual_seed(int(seed))
+    windows = plan_windows(total_frames, window, overlap)
+
+    carried_noise = None
+    held_back = []
+    for index, (start, length) in enumerate(windows):
+        latents = _window_noise(pipe, length, generator, carried_noise).to(pipe.unet.dtype)
+        output = pipe(
+            **prompt_inputs,
+            num_frames=length,
+            guidance_scale=guidance_scale,
+            num_inference_steps=num_inference_steps,
+            latents=latents,
+        )
+        frames = output.frames[0]
+        del output
+
+        head = len(held_back)
+        for frame in _blend(held_back, frames[:head]):
+            yield frame
+
+        # Keep the tail back to blend with the next window
+        last = index == len(windows) - 1
+        tail = 0 if last else overlap
+        for frame in frames[head:len(frames) - tail]:
+            yield frame
+        held_back = frames[len(frames) - tail:] if tail else []
+        carried_noise = latents[:, :, length - tail:].float() if tail else None
+
+        if on_window is not None:
+            on_window(index + 1, len(windows))
+
+
+def write_video(frames, path, fps=8):
+    # imageio hands each frame straight to ffmpeg instead of collecting a list first
+    import imageio
+
+    count = 0
+    with imageio.get_writer(path, fps=fps, codec="libx264", macro_block_size=1) as writer:
+        for frame in frames:
+            writer.append_data(np.asarray(frame))
+            count += 1
+    return count
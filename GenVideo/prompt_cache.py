@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+# Upper bound on memory held by cached embeddings. One SD1.5 prompt is 77x768 floats,
+# about 118 KB in fp16, so the default keeps a few hundred prompts around.
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class PromptEmbeddingCache():
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(pipe, text, namespace=""):
+        # Embeddings only depend on the tokenizer, the text encoder weights and the text
+        return (
+            getattr(pipe.tokenizer, "name_or_path", ""),
+            pipe.text_encoder.config._name_or_path,
+            str(pipe.text_encoder.dtype),
+            namespace,
+            text,
+        )
+
+    def get(self, key):
+        with self.lock:
+            embeds = self.entries.get(key)
+            if embeds is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return embeds
+
+    def put(self, key, embeds):
+        size = self._size(embeds)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self._size(self.entries.pop(key))
+            self.entries[key] = embeds
+            self.bytes += size
+            # Evict least recently used prompts until we fit again
+            while self.bytes > self.max_bytes:
+                _, old = self.entries.popitem(last=False)
+                self.bytes -= self._size(old)
+
+    @staticmethod
+    def _size(embeds):
+        return embeds.element_size() * embeds.nelement()
+
+    def encode(self, pipe, text, namespace=""):
+        key = self.key(pipe, text, namespace)
+        embeds = self.get(key)
+        if embeds is None:
+            with torch.no_grad():
+                embeds, _ = pipe.encode_prompt(
+                    text,
+                    device=pipe._execution_device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=False,
+                )
+            # Keep cached copies on the CPU, the pipeline moves them to the right device
+            embeds = embeds.detach().to("cpu")
+            self.put(key, embeds)
+        return embeds
+
+    def encode_pair(self, pipe, prompt, negative_prompt, namespace=""):
+        # Returns the keyword arguments to pass to the pipeline instead of prompt/negative_prompt
+        return {
+            "prompt_embeds": self.encode(pipe, prompt, namespace),
+            "negative_prompt_embeds": self.encode(pipe, negative_prompt or "", namespace),
+        }
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,135 @@
+import importlib.util
+import json
+import os
+
+# Speed/quality presets. Steps are what each scheduler needs for a clean result,
+# fewer steps means proportionally less time since every step is one UNet pass.
+PRESETS = {
+    "Quality (DDIM)": {
+        "scheduler": "DDIMScheduler",
+        "scheduler_kwargs": {
+            "clip_sample": False,
+            "timestep_spacing": "linspace",
+            "beta_schedule": "linear",
+            "steps_offset": 1,
+        },
+        "steps": 25,
+        "min_steps": 10,
+        "max_steps": 100,
+        "guidance_scale": 7.5,
+        "description": "The original setup. Slowest, most detailed.",
+    },
+    "Balanced (DPM-Solver++ 2M)": {
+        "scheduler": "DPMSolverMultistepScheduler",
+        "scheduler_kwargs": {
+            "algorithm_type": "dpmsolver++",
+            "solver_order": 2,
+            "timestep_spacing": "linspace",
+            "beta_schedule": "linear",
+            "steps_offset": 1,
+        },
+        "steps": 12,
+        "min_steps": 10,
+        "max_steps": 30,
+        "guidance_scale": 7.5,
+        "description": "Multistep solver, close to DDIM quality in half the steps.",
+    },
+    "Fast (DPM-Solver++ 2M Karras)": {
+        "scheduler": "DPMSolverMultistepScheduler",
+        "scheduler_kwargs": {
+            "algorithm_type": "dpmsolver++",
+            "solver_order": 2,
+            "use_karras_sigmas": True,
+            "timestep_spacing": "linspace",
+            "beta_schedule": "linear",
+            "steps_offset": 1,
+        },
+        "steps": 8,
+        "min_steps": 6,
+        "max_steps": 20,
+        "guidance_scale": 7.0,
+        "description": "Karras sigmas keep 8 steps usable. Slightly softer detail.",
+    },
+    "Turbo (AnimateLCM, 4 steps)": {
+        "scheduler": "LCMScheduler",
+        "scheduler_kwargs": {
+            "beta_schedule": "linear",
+        },
+        # Distilled motion module + LoRA trained for few-step sampling
+        "adapter": "wangfuyun/AnimateLCM",
+        "lora": {
+            "repo": "wangfuyun/AnimateLCM",
+            "weight_name": "AnimateLCM_sd15_t2v_lora.safetensors",
+            "adapter_name": "lcm-lora",
+            "scale": 0.8,
+        },
+        "steps": 4,
+        "min_steps": 2,
+        "max_steps": 8,
+        "guidance_scale": 1.5,
+        "description": "Distilled few-step model. Fastest, needs low guidance.",
+    },
+}
+
+# Where diffusers defines each scheduler, so availability can be checked without importing it
+SCHEDULER_MODULES = {
+    "DDIMScheduler": "scheduling_ddim",
+    "DPMSolverMultistepScheduler": "scheduling_dpmsolver_multistep",
+    "LCMScheduler": "scheduling_lcm",
+}
+
+DEFAULT_PRESET = "Quality (DDIM)"
+BENCHMARK_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results.json")
+
+
+def available_presets():
+    # Older diffusers releases don't ship every scheduler, hide what can't be built.
+    # Looks for the scheduler's file instead of importing diffusers, which would pull in torch.
+    spec = importlib.util.find_spec("diffusers")
+    if spec is None:
+        return []
+    folder = os.path.join(spec.submodule_search_locations[0], "schedulers")
+    # Loading a LoRA goes through peft, which requirements.txt leaves out
+    has_peft = importlib.util.find_spec("peft") is not None
+    return [name for name, preset in PRESETS.items()
+            if os.path.exists(os.path.join(folder, SCHEDULER_MODULES[preset["scheduler"]] + ".py"))
+            and (has_peft or "lora" not in preset)]
+
+
+def make_scheduler(name, model_id=None, config=None):
+    import diffusers
+
+    preset = PRESETS[name]
+    scheduler_class = getattr(diffusers, preset["scheduler"])
+    if config is not None:
+        return scheduler_class.from_config(config, **preset["scheduler_kwargs"])
+    return scheduler_class.from_pretrained(model_id, subfolder="scheduler", **preset["scheduler_kwargs"])
+
+
+def apply_preset(pipe, name, model_id):
+    preset = PRESETS[name]
+    pipe.scheduler = make_scheduler(name, model_id)
+    lora = preset.get("lora")
+    if lora:
+        pipe.load_lora_weights(lora["repo"], weight_name=lora["weight_name"], adapter_name=lora["adapter_name"])
+        pipe.set_adapters([lora["adapter_name"]], [lora["scale"]])
+    return pipe
+
+
+def benchmark_timings(path=BENCHMARK_RESULTS):
+    # Seconds per run for each preset at its recommended steps, as measured by benchmark.py --presets
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        results = json.load(f)["results"]
+    timings = {}
+    setup = None
+    for result in results:
+        preset = result.get("preset")
+        if not preset or "error" in result or result["steps"] != PRESETS.get(preset, {}).get("steps"):
+            continue
+        # Only compare presets measured with the same frames/dtype/threads
+        setup = setup or (result["frames"], result["dtype"], result["threads"])
+        if (result["frames"], result["dtype"], result["threads"]) == setup:
+            timings.setdefault(preset, result["wall_time_s"])
+    return timings
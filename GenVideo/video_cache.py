@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import shutil
+
+# Where finished videos are kept and how big the folder may grow
+CACHE_DIR = os.getenv("GENVIDEO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_MAX_BYTES = int(float(os.getenv("GENVIDEO_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+
+def make_key(prompt, negative_prompt, num_frames, guidance_scale, num_inference_steps, seed, **model_ids):
+    # Same inputs + same models + fixed seed = same frames, so the hash of them names the file
+    params = {
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "num_frames": int(num_frames),
+        "guidance_scale": round(float(guidance_scale), 4),
+        "num_inference_steps": int(num_inference_steps),
+        "seed": int(seed),
+        "models": model_ids,
+    }
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path(key, ext):
+    return os.path.join(CACHE_DIR, f"{key}.{ext}")
+
+
+def get(key, ext="gif"):
+    path = _path(key, ext)
+    if not os.path.exists(path):
+        return None
+    # Touch the file so eviction treats it as recently used
+    os.utime(path, None)
+    return path
+
+
+def put(key, src_path, ext="gif"):
+    # Returns where the video can be read from: the cached copy, or src_path itself when the video alone is
+    # bigger than the whole cache and is not kept
+    if os.path.getsize(src_path) > CACHE_MAX_BYTES:
+        return src_path
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(key, ext)
+    # Copy next to the target first so readers never see a half written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, path)
+    evict()
+    return path
+
+
+def evict(max_bytes=None):
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+
+    entries = []
+    total = 0
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        if not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    # Drop least recently used videos until we are under the cap
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def stats():
+    if not os.path.isdir(CACHE_DIR):
+        return {"files": 0, "bytes": 0, "max_bytes": CACHE_MAX_BYTES}
+    paths = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR) if not name.endswith(".tmp")]
+    sizes = [os.path.getsize(path) for path in paths if os.path.isfile(path)]
+    return {"files": len(sizes), "bytes": sum(sizes), "max_bytes": CACHE_MAX_BYTES}
@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import os
+import sys
 import io
 from PIL import Image
 from dotenv import load_dotenv, find_dotenv
@@ -8,32 +9,49 @@ from datetime import datetime
 import re
 import base64
 
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.background import background_css
+from shared.hf_client import HFClient
+from shared.metrics import METRICS
+from shared.resilience import CircuitOpen
+
 # Load environment variables from .env file
 load_dotenv(find_dotenv())
 
+# API hosts, can be pointed at the local stand-ins in loadtest/stubs.py
+HF_API_BASE = os.getenv("HF_API_BASE", "https://api-inference.huggingface.co")
+GITHUB_API_BASE = os.getenv("GITHUB_API_BASE", "https://api.github.com")
+# Seconds to connect and to wait for GitHub, a stuck upload must not hang the page forever
+GITHUB_TIMEOUT = (10, 60)
+
 # GitHub Configuration
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = "AadishY/Images"
 GITHUB_BRANCH = "main"
-GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/contents/"
+GITHUB_API_URL = f"{GITHUB_API_BASE}/repos/{GITHUB_REPO}/contents/"
 
 # Hugging Face Configuration
 HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
-API_URL = "https://api-inference.huggingface.co/models/runwayml/stable-diffusion-v1-5"
-headers = {"Authorization": f"Bearer {HUGGINGFACEHUB_API_TOKEN}"}
+API_URL = f"{HF_API_BASE}/models/runwayml/stable-diffusion-v1-5"
+
+# Where images are kept before they are uploaded, relative to the working directory
+SAVE_DIR = "Appimage 1"
+
+@st.cache_resource
+def get_hf_client():
+    # One per process, so sessions share identical calls in flight and each model's hedging and breaker
+    return HFClient(HUGGINGFACEHUB_API_TOKEN)
 
 def query(payload):
-    response = requests.post(API_URL, headers=headers, json=payload)
-    response.raise_for_status()  # Raises an error for bad responses
-    return response.content
+    return get_hf_client().query(API_URL, payload)
 
 def text2image(prompt: str):
     image_bytes = query({"inputs": prompt})
     image = Image.open(io.BytesIO(image_bytes))
 
     # Create the directory if it doesn't exist
-    save_dir = "Appimage 1"
-    os.makedirs(save_dir, exist_ok=True)
+    os.makedirs(SAVE_DIR, exist_ok=True)
 
     # Use the prompt and date-time for the filename
     safe_prompt = re.sub(r'[^\w\s-]', '', prompt)  # Remove unsafe characters
@@ -46,7 +64,7 @@ def text2image(prompt: str):
     filename = re.sub(r'[\\/*?:"<>|]', "", filename)  # Remove invalid characters
     
     # Save the image locally
-    local_filepath = os.path.join(save_dir, filename)
+    local_filepath = os.path.join(SAVE_DIR, filename)
     image.save(local_filepath)
     
     # Upload the image to GitHub
@@ -75,10 +93,11 @@ def upload_to_github(filepath, filename):
     
     # Send request to GitHub API to upload the file
     upload_url = GITHUB_API_URL + filename
-    response = requests.put(upload_url, headers={
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json"
-    }, json=data)
+    with METRICS.timer("image: GitHub upload"):
+        response = requests.put(upload_url, headers={
+            "Authorization": f"token {GITHUB_TOKEN}",
+            "Accept": "application/vnd.github.v3+json"
+        }, json=data, timeout=GITHUB_TIMEOUT)
     
     if response.status_code == 201:
         # Do nothing for successful upload
@@ -88,24 +107,24 @@ def upload_to_github(filepath, filename):
 
 # Streamlit app
 st.markdown(
-    """
+    f"""
     <style>
-    .stApp {
-        background-image: url('https://cdn.jsdelivr.net/gh/AadishY/Python-Aadish@main/merge.gif');
+    {background_css(__file__)}
+    .stApp {{
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
         height: 100vh;  /* Full viewport height */
-    }
-    .css-1d391kg {
+    }}
+    .css-1d391kg {{
         display: none; /* Hide the top-right widget and icon */
-    }
-    .css-1v3k9fb {
+    }}
+    .css-1v3k9fb {{
         display: none; /* Hide the "Share" button */
-    }
-    .css-2mmtk2b {
+    }}
+    .css-2mmtk2b {{
         display: none; /* Hide the "Running" indicator */
-    }
+    }}
     </style>
     """,
     unsafe_allow_html=True
@@ -121,7 +140,11 @@ prompt = st.text_area("Enter your prompt here:", placeholder="Enter the prompt c
 if st.button("Enter"):
     if prompt:
         with st.spinner("Aadish is cooking 🧑‍🍳....."):
-            image_content, download_filename = text2image(prompt)
+            try:
+                image_content, download_filename = text2image(prompt)
+            except CircuitOpen as e:
+                st.error(f"{e}. Try again in a little while.")
+                st.stop()
             st.success("Image generated successfully!")
 
             # Display the image in the Streamlit app
@@ -1,80 +1,83 @@
 import os
+import sys
 import streamlit as st
-from langchain.chains import ConversationChain
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
-from langchain_groq import ChatGroq
-from langchain.schema import SystemMessage
 import dotenv
 
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.background import background_css
+from shared.chat_client import ChatClient, ChatServiceError
+
 dotenv.load_dotenv(dotenv.find_dotenv())
 
 # Set page configuration
 st.set_page_config(page_title="Aadish GPT", page_icon="🤖")
 
-BACKGROUND_IMAGE_URL = "https://cdn.jsdelivr.net/gh/AadishY/Python-Aadish@main/merge.gif"
+BACKGROUND_CSS = background_css(__file__)
+MODELS = ['gemma2-9b-it', 'llama3-groq-70b-8192-tool-use-preview', 'llama-3.1-70b-versatile', 'llama3-groq-8b-8192-tool-use-preview', 'auto']
+MEMORY_LENGTH = 10
+SYSTEM_PROMPT = "You are made by Aadish. You are a helpful AI assistant designed to provide accurate and helpful responses."
+
+
+@st.cache_resource
+def get_chat_client():
+    # One client (and connection pool) for every browser session of this process
+    return ChatClient()
+
 
+def new_session(client, model):
+    return client.create_session(model, SYSTEM_PROMPT, memory={"policy": "window", "k": MEMORY_LENGTH})
 
-def initialize_session_state():
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+
+def initialize_session_state(client):
+    # Only the model and the session id live here, the conversation is kept by the chat service
     if 'model' not in st.session_state:
-        st.session_state.model = 'gemma2-9b-it'
-    if 'conversation' not in st.session_state:
-        st.session_state.conversation = None
-    if 'groq_chat' not in st.session_state:
-        st.session_state.groq_chat = None
-    if 'last_input' not in st.session_state:
-        st.session_state.last_input = ""
-
-def display_customization_options():
+        st.session_state.model = MODELS[0]
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = new_session(client, st.session_state.model)
+
+def display_customization_options(client):
     st.sidebar.title('Customization')
     model = st.sidebar.selectbox(
         'Choose a model',
-        ['gemma2-9b-it', 'llama3-groq-70b-8192-tool-use-preview', 'llama-3.1-70b-versatile', 'llama3-groq-8b-8192-tool-use-preview'],
+        MODELS,
         index=0,
-        key='model_selectbox'
+        key='model_selectbox',
+        format_func=lambda name: "auto (picks a model per question)" if name == "auto" else name
     )
     if st.sidebar.button("Clear Chat"):
+        client.delete_session(st.session_state.session_id)
         st.session_state.clear()
         st.rerun()
     return model
 
-def initialize_groq_chat(groq_api_key, model):
-    return ChatGroq(
-        groq_api_key=groq_api_key,
-        model_name=model
-    )
-
-def add_system_prompt_to_memory(memory, system_prompt):
-    memory.chat_memory.add_message(SystemMessage(content=system_prompt))
+def load_history(client):
+    session = client.session(st.session_state.session_id)
+    if session is None:
+        # The service restarted or dropped the session, start a fresh one
+        st.session_state.session_id = new_session(client, st.session_state.model)
+        return []
+    return session["messages"]
 
-def initialize_conversation(groq_chat, memory, system_prompt):
-    conversation = ConversationChain(
-        llm=groq_chat,
-        memory=memory
-    )
-    # Add the system message
-    add_system_prompt_to_memory(memory, system_prompt)
-    return conversation
-
-def process_user_question(user_question):
-    if user_question != st.session_state.last_input:
-        conversation = st.session_state.conversation
-        response = conversation.run(user_question)
-        message = {'human': user_question, 'AI': response}
-        st.session_state.chat_history.append(message)
-        st.session_state.last_input = user_question
+def reply_stream(client, question, answered_by):
+    # The streamed reply, with a note while the chat service waits for Groq quota
+    waiting = st.empty()
 
-def main():
-    groq_api_key = os.environ['GROQ_API_KEY']
+    def show_queue(place, eta):
+        waiting.caption(f"⏳ Groq is busy, you are number {place} in line (about {eta:.0f}s)")
 
-    initialize_session_state()
+    parts = client.stream(st.session_state.session_id, question, on_queue=show_queue, on_done=answered_by.append)
+    for i, part in enumerate(parts):
+        if i == 0:
+            waiting.empty()
+        yield part
 
+def main():
     st.markdown(
         f"""
         <style>
+        {BACKGROUND_CSS}
         .stApp {{
-            background-image: url("{BACKGROUND_IMAGE_URL}");
             background-size: cover;
             background-position: center;
         }}
@@ -86,37 +89,43 @@ def main():
     st.title("Aadish GPT 🤖")
     st.markdown("Chat with Aadish!")
 
-    model = display_customization_options()
-
-    # Define the system prompt
-    system_prompt = "You are made by Aadish. You are a helpful AI assistant designed to provide accurate and helpful responses."
+    client = get_chat_client()
+    try:
+        initialize_session_state(client)
+        model = display_customization_options(client)
 
-    if st.session_state.model != model:
-        st.session_state.model = model
-        st.session_state.groq_chat = initialize_groq_chat(groq_api_key, model)
-        memory = ConversationBufferWindowMemory(k=10)
-        st.session_state.conversation = initialize_conversation(st.session_state.groq_chat, memory, system_prompt)
-        st.session_state.chat_history = []
-        st.session_state.last_input = ""
-        st.rerun()
+        if st.session_state.model != model:
+            # A new model starts a new conversation
+            client.delete_session(st.session_state.session_id)
+            st.session_state.model = model
+            st.session_state.session_id = new_session(client, model)
+            st.rerun()
 
-    if st.session_state.conversation is None or st.session_state.groq_chat is None:
-        st.session_state.groq_chat = initialize_groq_chat(groq_api_key, st.session_state.model)
-        memory = ConversationBufferWindowMemory(k=10)
-        st.session_state.conversation = initialize_conversation(st.session_state.groq_chat, memory, system_prompt)
+        history = load_history(client)
+    except ChatServiceError as e:
+        st.error(f"Chat service error: {e}")
+        return
 
     st.divider()
 
+    for message in history:
+        with st.chat_message("user" if message['role'] == "user" else "assistant"):
+            st.markdown(message['content'])
+
     user_question = st.chat_input("Ask something...")
     if user_question:
-        process_user_question(user_question)
-        st.rerun()
-
-    for message in st.session_state.chat_history:
         with st.chat_message("user"):
-            st.markdown(message['human'])
+            st.markdown(user_question)
         with st.chat_message("assistant"):
-            st.markdown(message['AI'])
+            try:
+                answered_by = []
+                st.write_stream(reply_stream(client, user_question, answered_by))
+                if answered_by and "cached" in answered_by[0]:
+                    st.caption(f"Answered from a similar earlier question ({answered_by[0]['model']})")
+                elif answered_by and st.session_state.model == "auto":
+                    st.caption(f"Answered by {answered_by[0]['model']}")
+            except ChatServiceError as e:
+                st.error(f"Chat service error: {e}")
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,11 @@
 import os
+import sys
 import streamlit as st
 from dotenv import load_dotenv
-from langchain.chains import ConversationChain
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
-from langchain_groq import ChatGroq
+
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.chat_client import ChatClient, ChatServiceError
 
 # Load environment variables
 load_dotenv()
@@ -12,45 +14,45 @@ load_dotenv()
 MODEL_NAME = "gemma2-9b-it"
 MEMORY_LENGTH = 5
 
-# Initialize session state
-def initialize_session_state():
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
-    if 'memory' not in st.session_state:
-        st.session_state.memory = ConversationBufferWindowMemory(k=MEMORY_LENGTH)
+# One chat service client for every browser session
+@st.cache_resource
+def get_chat_client():
+    return ChatClient()
+
+def new_session(client):
+    return client.create_session(MODEL_NAME, memory={"policy": "window", "k": MEMORY_LENGTH})
 
-# Initialize the ChatGroq API
-def initialize_groq_chat():
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        st.error("GROQ_API_KEY is not set in environment variables.")
-        return None
-    return ChatGroq(groq_api_key=groq_api_key, model_name=MODEL_NAME)
+# Initialize session state, only the session id is kept here
+def initialize_session_state(client):
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = new_session(client)
 
-# Initialize the conversation chain
-def initialize_conversation(groq_chat, memory):
-    if groq_chat is None:
-        return None
-    return ConversationChain(llm=groq_chat, memory=memory)
+# Load the conversation from the chat service
+def load_history(client):
+    session = client.session(st.session_state.session_id)
+    if session is None:
+        # The service restarted or dropped the session, start a fresh one
+        st.session_state.session_id = new_session(client)
+        return []
+    return session["messages"]
 
 # Process the user’s question and generate a response
-def process_user_question(user_question, conversation):
+def process_user_question(client, user_question):
     try:
-        response = conversation(user_question)
-        message = {'human': user_question, 'AI': response['response']}
-        st.session_state.chat_history.append(message)
-        return response['response']
-    except Exception as e:
+        return client.send(st.session_state.session_id, user_question)
+    except ChatServiceError as e:
         st.error(f"Error processing question: {e}")
         return "Sorry, something went wrong."
 
 # Display chat history
-def display_chat_history():
+def display_chat_history(history):
     chat_display = st.container()
     with chat_display:
-        for message in st.session_state.chat_history:
-            display_message(message['human'], "You", "#007bff", right_align=True)
-            display_message(message['AI'], "Aadish", "#28a745", right_align=False)
+        for message in history:
+            if message['role'] == "user":
+                display_message(message['content'], "You", "#007bff", right_align=True)
+            else:
+                display_message(message['content'], "Aadish", "#28a745", right_align=False)
 
 # Display a single message
 def display_message(text, sender, color, right_align):
@@ -71,30 +73,27 @@ def display_message(text, sender, color, right_align):
 
 # Main application logic
 def main():
-    initialize_session_state()
-
     st.title("Aadish GPT 🤖")
     st.markdown("Chat with Aadish!")
 
-    if st.button("Clear Chat"):
-        st.session_state.chat_history = []
-        st.session_state.memory = ConversationBufferWindowMemory(k=MEMORY_LENGTH)
-
-    groq_chat = initialize_groq_chat()
-    if groq_chat is None:
-        return
-
-    conversation = initialize_conversation(groq_chat, st.session_state.memory)
-    if conversation is None:
+    client = get_chat_client()
+    try:
+        initialize_session_state(client)
+        if st.button("Clear Chat"):
+            client.delete_session(st.session_state.session_id)
+            st.session_state.session_id = new_session(client)
+        history = load_history(client)
+    except ChatServiceError as e:
+        st.error(f"Chat service error: {e}")
         return
 
-    display_chat_history()
+    display_chat_history(history)
 
     user_question = st.chat_input("What is up?")
     if user_question:
         display_message(user_question, "You", "#007bff", right_align=True)
         with st.spinner("Aadish is typing..."):
-            response = process_user_question(user_question, conversation)
+            response = process_user_question(client, user_question)
         display_message(response, "Aadish", "#28a745", right_align=False)
 
 if __name__ == "__main__":
@@ -1,106 +1,79 @@
-import os
 import streamlit as st
-from langchain.chains import ConversationChain
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
-from langchain_groq import ChatGroq
+from shared.chat_client import ChatClient, ChatServiceError
 
 MODEL_NAME = "gemma2-9b-it"
 MEMORY_LENGTH = 5
 
-def initialize_session_state():
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
-    if 'memory' not in st.session_state:
-        st.session_state.memory = ConversationBufferWindowMemory(k=MEMORY_LENGTH)
+@st.cache_resource
+def get_chat_client():
+    # One client (and connection pool) for every browser session of this process
+    return ChatClient()
 
-def initialize_groq_chat():
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        st.error("GROQ_API_KEY is not set in environment variables.")
-        return None
-    return ChatGroq(
-        groq_api_key=groq_api_key,
-        model_name=MODEL_NAME
-    )
+def new_session(client):
+    return client.create_session(MODEL_NAME, memory={"policy": "window", "k": MEMORY_LENGTH})
 
-def initialize_conversation(groq_chat, memory):
-    if groq_chat is None:
-        return None
-    return ConversationChain(
-        llm=groq_chat,
-        memory=memory
-    )
+def initialize_session_state(client):
+    # Only the session id lives here, the conversation is kept by the chat service
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = new_session(client)
 
-def process_user_question(user_question, conversation):
-    response = conversation(user_question)
-    message = {'human': user_question, 'AI': response['response']}
-    st.session_state.chat_history.append(message)
-    return response['response']
+def load_history(client):
+    session = client.session(st.session_state.session_id)
+    if session is None:
+        # The service restarted or dropped the session, start a fresh one
+        st.session_state.session_id = new_session(client)
+        return []
+    return session["messages"]
 
-def main():
-    initialize_session_state()
+def process_user_question(client, user_question):
+    return client.send(st.session_state.session_id, user_question)
+
+def display_message(text, sender):
+    if sender == "You":
+        color, align, ratio, column = "#007bff", "right", [1, 4], 1
+    else:
+        color, align, ratio, column = "#28a745", "left", [4, 1], 0
+    cols = st.columns(ratio)
+    with cols[column]:
+        st.markdown(
+            f"""
+            <div style='background-color: {color}; padding: 15px; border-radius: 15px; color: white; text-align: {align};
+            box-shadow: 2px 2px 10px rgba(0, 0, 0, 0.1); margin-bottom: 10px;'>
+                <b>{sender}:</b><br>{text}
+            </div>
+            """, unsafe_allow_html=True
+        )
 
+def main():
     st.title("Lightning ⚡️")
     st.markdown("Chat with Aadish, an ultra-fast AI chatbot!")
 
-    if st.button("Clear Chat"):
-        st.session_state.chat_history = []
-
-    groq_chat = initialize_groq_chat()
-    if groq_chat is None:
-        return
-    conversation = initialize_conversation(groq_chat, st.session_state.memory)
-    if conversation is None:
+    client = get_chat_client()
+    try:
+        initialize_session_state(client)
+        if st.button("Clear Chat"):
+            client.delete_session(st.session_state.session_id)
+            st.session_state.session_id = new_session(client)
+        history = load_history(client)
+    except ChatServiceError as e:
+        st.error(f"Chat service error: {e}")
         return
 
     chat_display = st.empty()
 
     with chat_display.container():
-        for message in st.session_state.chat_history:
-            cols = st.columns([1, 4])
-            with cols[1]:
-                st.markdown(
-                    f"""
-                    <div style='background-color: #007bff; padding: 15px; border-radius: 15px; color: white; text-align: right;
-                    box-shadow: 2px 2px 10px rgba(0, 0, 0, 0.1); margin-bottom: 10px;'>
-                        <b>You:</b><br>{message['human']}
-                    </div>
-                    """, unsafe_allow_html=True
-                )
-            cols = st.columns([4, 1])
-            with cols[0]:
-                st.markdown(
-                    f"""
-                    <div style='background-color: #28a745; padding: 15px; border-radius: 15px; color: white; text-align: left;
-                    box-shadow: 2px 2px 10px rgba(0, 0, 0, 0.1); margin-bottom: 10px;'>
-                        <b>Aadish:</b><br>{message['AI']}
-                    </div>
-                    """, unsafe_allow_html=True
-                )
+        for message in history:
+            display_message(message['content'], "You" if message['role'] == "user" else "Aadish")
 
     if user_question := st.chat_input("What is up?"):
-        cols = st.columns([1, 4])
-        with cols[1]:
-            st.markdown(
-                f"""
-                <div style='background-color: #007bff; padding: 15px; border-radius: 15px; color: white; text-align: right;
-                box-shadow: 2px 2px 10px rgba(0, 0, 0, 0.1); margin-bottom: 10px;'>
-                    <b>You:</b><br>{user_question}
-                </div>
-                """, unsafe_allow_html=True
-            )
+        display_message(user_question, "You")
         with st.spinner("Aadish is typing..."):
-            response = process_user_question(user_question, conversation)
-        cols = st.columns([4, 1])
-        with cols[0]:
-            st.markdown(
-                f"""
-                <div style='background-color: #28a745; padding: 15px; border-radius: 15px; color: white; text-align: left;
-                box-shadow: 2px 2px 10px rgba(0, 0, 0, 0.1); margin-bottom: 10px;'>
-                    <b>Aadish:</b><br>{response}
-                </div>
-                """, unsafe_allow_html=True
-            )
+            try:
+                response = process_user_question(client, user_question)
+            except ChatServiceError as e:
+                st.error(f"Chat service error: {e}")
+                return
+        display_message(response, "Aadish")
 
 if __name__ == "__main__":
     main()
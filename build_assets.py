@@ -0,0 +1,96 @@
+# Build step for the merge.gif background
+# Transcodes the 3.2 MB GIF into an animated WebP and a still JPEG, names them after a hash of their
+# content and writes them with a background.json manifest into each app's static/ folder.
+# Usage: python build_assets.py [--out OnlineBot/static ...] [--width 500] [--quality 65]
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image, ImageSequence
+
+from shared.background import MANIFEST
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(HERE, "merge.gif")
+APP_DIRS = ["OnlineBot", "ImageGen", "ExperimentalImage"]
+PREFIX = "merge"
+
+
+def load_frames(path, width=None):
+    gif = Image.open(path)
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(gif):
+        frame = frame.convert("RGB")
+        if width and frame.width > width:
+            frame = frame.resize((width, round(frame.height * width / frame.width)), Image.LANCZOS)
+        frames.append(frame)
+        durations.append(frame.info.get("duration", gif.info.get("duration", 100)))
+    return frames, durations
+
+
+def encode_webp(frames, durations, quality):
+    buffer = io.BytesIO()
+    frames[0].save(buffer, "WEBP", save_all=True, append_images=frames[1:], duration=durations,
+                   loop=0, quality=quality, method=6)
+    return buffer.getvalue()
+
+
+def encode_still(frames):
+    buffer = io.BytesIO()
+    frames[0].save(buffer, "JPEG", quality=70, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def build(source=SOURCE, width=None, quality=65):
+    # Returns {variant: (extension, bytes)}
+    frames, durations = load_frames(source, width)
+    variants = {
+        "webp": ("webp", encode_webp(frames, durations, quality)),
+        "still": ("jpg", encode_still(frames)),
+    }
+    return variants
+
+
+def write(variants, out_dir, source_hash):
+    os.makedirs(out_dir, exist_ok=True)
+    # Old builds have different hashes in their names, clear them so the folder doesn't grow
+    for old in glob.glob(os.path.join(out_dir, f"{PREFIX}.*")):
+        os.remove(old)
+
+    files = {}
+    for variant, (ext, data) in variants.items():
+        name = f"{PREFIX}.{hashlib.sha256(data).hexdigest()[:12]}.{ext}"
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(data)
+        files[variant] = name
+
+    manifest = {"hash": source_hash, "files": files, "bytes": {v: len(d) for v, (_, d) in variants.items()}}
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the optimised merge.gif background assets")
+    parser.add_argument("--source", default=SOURCE)
+    parser.add_argument("--out", nargs="+", default=[os.path.join(HERE, app, "static") for app in APP_DIRS],
+                        help="static folders to write to, default every app's static/")
+    parser.add_argument("--width", type=int, help="scale the frames down to this width")
+    parser.add_argument("--quality", type=int, default=65, help="WebP quality 0-100")
+    args = parser.parse_args()
+
+    with open(args.source, "rb") as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+    original = os.path.getsize(args.source)
+
+    variants = build(args.source, args.width, args.quality)
+    for out_dir in args.out:
+        manifest = write(variants, out_dir, source_hash)
+        print(f"{out_dir}:")
+        for variant, name in manifest["files"].items():
+            size = manifest["bytes"][variant]
+            print(f"  {name:<28} {size / 1024:8.1f} KB  ({size / original:.1%} of the GIF)")
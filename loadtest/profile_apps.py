@@ -0,0 +1,140 @@
+# Cold-start and rerun cost of the Streamlit apps
+# Every app runs in a fresh interpreter under Streamlit's AppTest, with python -X importtime:
+#   cold     interpreter start until the first run of the script is done (a new container or process)
+#   first    that first run on its own, imports   the part of it spent importing what the app needs beyond streamlit
+#   rerun    every later run, which is what each click or chat message costs
+# and lists the slowest imports of the first run. The chat apps talk to a chat service backed by the Groq stub.
+# Usage: python loadtest/profile_apps.py [app ...] [--reruns 20] [--output profile.json] [--fail-cold 5]
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+APPS = {
+    "lightning": "app.py",
+    "onlinebot": "OnlineBot/app.py",
+    "exbot": "OnlineBot/ExBot/main.py",
+    "imagegen": "ImageGen/app.py",
+    "experimental": "ExperimentalImage/steam.py",
+    "genvideo": "GenVideo/app.py",
+}
+CHAT_APPS = ("lightning", "onlinebot", "exbot")
+MARKER = "profile_apps: first run starts"
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def child(name, reruns):
+    # Runs inside the profiled interpreter, prints the timings as JSON
+    path = os.path.join(ROOT, APPS[name])
+    sys.path.insert(0, os.path.dirname(path))  # `streamlit run` puts the script's folder on the path too
+    if name in CHAT_APPS:
+        sys.path.insert(0, HERE)
+        import run
+        import stubs
+
+        stub_url = run.ServerThread(lambda: stubs.make_app({"groq": {"latency": 0.0, "tail": 0}})).start()
+        os.environ["CHAT_SERVICE_URL"] = run.start_chat_service(stub_url)
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(path, default_timeout=600)
+    sys.stderr.write(MARKER + "\n")
+    sys.stderr.flush()
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    first_done = time.time()
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    errors = [e.message for e in app.exception] + [e.value for e in app.error]
+    print(json.dumps({"first": first, "first_done": first_done, "reruns": times, "errors": errors}))
+
+
+def parse_imports(stderr):
+    # Top-level imports made after the marker, as (cumulative seconds, module)
+    lines = stderr.split(MARKER, 1)[-1].splitlines()
+    found = []
+    for line in lines:
+        match = IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            found.append((int(match.group(2)) / 1e6, match.group(4)))
+    return sorted(found, reverse=True)
+
+
+def profile(name, reruns):
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    started = time.time()
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", name,
+                             "--reruns", str(reruns)], cwd=os.path.dirname(os.path.join(ROOT, APPS[name])),
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"app": name, "failed": result.stderr.strip().splitlines()[-1:]}
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_imports(result.stderr)
+    times = sorted(data["reruns"])
+    return {
+        "app": name,
+        "cold": data["first_done"] - started,
+        "first": data["first"],
+        "imports": sum(seconds for seconds, _ in imports),
+        "rerun_p50": times[len(times) // 2] if times else float("nan"),
+        "rerun_max": times[-1] if times else float("nan"),
+        "top_imports": [{"module": module, "seconds": round(seconds, 3)} for seconds, module in imports[:5]],
+        "errors": data["errors"],
+    }
+
+
+def print_report(rows):
+    print(f"\n{'app':<14} {'cold':>7} {'first':>7} {'imports':>8} {'rerun p50':>10} {'rerun max':>10}")
+    for row in rows:
+        if "failed" in row:
+            print(f"{row['app']:<14} failed: {' '.join(row['failed'])}")
+            continue
+        print(f"{row['app']:<14} {row['cold']:>7.2f} {row['first']:>7.2f} {row['imports']:>8.2f} "
+              f"{row['rerun_p50'] * 1000:>8.1f}ms {row['rerun_max'] * 1000:>8.1f}ms")
+        slow = ", ".join(f"{i['module']} {i['seconds']:.2f}s" for i in row["top_imports"] if i["seconds"] >= 0.01)
+        if slow:
+            print(f"{'':<16}slowest imports: {slow}")
+        for message in row["errors"]:
+            print(f"{'':<16}app error: {message}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time and rerun-time profile of the Streamlit apps")
+    parser.add_argument("apps", nargs="*", metavar="app", help=f"{', '.join(APPS)} (default all)")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns timed after the first run")
+    parser.add_argument("--output", help="write the report as JSON, to track it over time")
+    parser.add_argument("--fail-cold", type=float, help="exit 1 when an app's cold start is above this many seconds")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.reruns)
+        sys.exit()
+
+    for name in args.apps:
+        if name not in APPS:
+            parser.error(f"unknown app {name!r}")
+    rows = []
+    for name in args.apps or list(APPS):
+        print(f"Profiling {name} ...")
+        rows.append(profile(name, args.reruns))
+    print_report(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "reruns": args.reruns, "apps": rows}, f, indent=2)
+
+    failed = [row["app"] for row in rows if "failed" in row
+              or (args.fail_cold is not None and row["cold"] > args.fail_cold)]
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        sys.exit(1)
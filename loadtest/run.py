@@ -0,0 +1,293 @@
+# Load test for the apps' upstream request paths, against the local stubs in stubs.py
+# Simulated users run the same calls the apps make, each in its own thread like a Streamlit session:
+#   chat          shared.chat_client -> ChatService -> Groq stub   (OnlineBot/app.py: history + streamed reply)
+#   imagegen      ImageGen/app.py text2image -> HF stub + GitHub stub
+#   experimental  ExperimentalImage/steam.py text2image -> HF stub + GitHub stub
+# Reports throughput and p50/p95/p99 latency per operation, and can fail the run on a p95 or error budget.
+# Usage: python loadtest/run.py chat imagegen --users 50 --duration 30 --groq-latency 0.5 --fail-p95 3
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from aiohttp import web
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import stubs  # noqa: E402
+
+QUESTIONS = [
+    "who made you?", "tell me a joke", "explain recursion in one line",
+    "what is the capital of France?", "write a haiku about rain", "how do I reverse a list in python?",
+]
+PROMPTS = ["a cat astronaut", "sunset over the ocean", "a castle in the clouds", "cyberpunk city at night"]
+
+
+class ServerThread():
+    # Runs an aiohttp app on its own event loop in a background thread.
+    # The app is built in that thread, so things like the chat service's sqlite connection belong to it.
+    def __init__(self, make_app, port=0):
+        self.make_app = make_app
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        runner = web.AppRunner(self.make_app())
+        self.loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", self.port)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=10)
+
+
+def load_script(path, name):
+    # Import a Streamlit script as a module, its widgets return their defaults outside `streamlit run`
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_chat_service(groq_url, limit_scale=None):
+    # limit_scale: multiplies the requests and tokens per minute the service allows every model, e.g. a paid tier
+    sys.path.insert(0, os.path.join(ROOT, "ChatService"))
+    from llm import MODELS, GroqBackend
+    from rate_limiter import RateLimiter
+    from server import make_app
+    from sessions import SessionStore
+
+    limiter = RateLimiter()
+    for model in MODELS if limit_scale else []:
+        limits = limiter.model_limits(model)
+        limits.update(rpm=int(limits["rpm"] * limit_scale), tpm=int(limits["tpm"] * limit_scale))
+    db = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "sessions.db")
+    return ServerThread(lambda: make_app(GroqBackend(api_key="stub", base_url=groq_url, limiter=limiter),
+                                         SessionStore(db))).start()
+
+
+class Recorder():
+    # Latency samples and failures per operation, shared by all user threads
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def measure(self, operation, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            with self.lock:
+                self.errors[operation][_error_label(e)] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples[operation].append(elapsed)
+        return result
+
+
+def _error_label(error):
+    status = getattr(error, "status", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return f"{type(error).__name__} {status}" if status else type(error).__name__
+
+
+# ------------------------------------------------------------------
+# Simulated users, one call of these is one user action
+# ------------------------------------------------------------------
+
+def chat_user(context, recorder, rng):
+    if "session_id" not in context:
+        session_id = recorder.measure("chat: create session", context["client"].create_session,
+                                      context["model"], "You are a helpful assistant.", {"policy": "window", "k": 10})
+        if session_id is None:
+            return
+        context["session_id"] = session_id
+    client, session_id = context["client"], context["session_id"]
+    # Every rerun of OnlineBot/app.py loads the history, then the reply is streamed
+    recorder.measure("chat: load history", client.session, session_id)
+    recorder.measure("chat: streamed reply", lambda: "".join(client.stream(session_id, rng.choice(QUESTIONS))))
+
+
+def image_user(module, label):
+    def user(context, recorder, rng):
+        recorder.measure(f"{label}: text2image", module.text2image, rng.choice(PROMPTS))
+    return user
+
+
+def run_users(scenario, make_context, users, duration, think, ramp, recorder, seed=0):
+    deadline = time.perf_counter() + duration
+
+    def loop(index):
+        rng = random.Random(seed + index)
+        time.sleep(ramp * index / max(1, users))
+        context = make_context()
+        while time.perf_counter() < deadline:
+            scenario(context, recorder, rng)
+            if think:
+                time.sleep(min(rng.expovariate(1 / think), max(0.0, deadline - time.perf_counter())))
+
+    threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return float("nan")
+    index = max(0, min(len(values) - 1, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarise(recorder, duration):
+    report = {}
+    for operation in sorted(set(recorder.samples) | set(recorder.errors)):
+        values = sorted(recorder.samples[operation])
+        errors = sum(recorder.errors[operation].values())
+        total = len(values) + errors
+        report[operation] = {
+            "requests": total,
+            "ok": len(values),
+            "error_rate": errors / total if total else 0.0,
+            "throughput": len(values) / duration,
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1] if values else float("nan"),
+            "errors": dict(recorder.errors[operation]),
+        }
+    return report
+
+
+def print_report(report, stub_stats, rate_limits=None, coalesced=None, resilience=None):
+    print(f"\n{'operation':<26} {'reqs':>6} {'err%':>6} {'req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}")
+    for operation, row in report.items():
+        print(f"{operation:<26} {row['requests']:>6} {row['error_rate']:>6.1%} {row['throughput']:>7.2f} "
+              f"{row['p50']:>7.3f} {row['p95']:>7.3f} {row['p99']:>7.3f} {row['max']:>7.3f}")
+        for label, count in row["errors"].items():
+            print(f"{'':<28}{count} x {label}")
+    print("\nStub answers:", json.dumps(stub_stats))
+    for model, row in (rate_limits or {}).items():
+        if not row.get("admitted") and not row.get("rejected"):
+            continue
+        print(f"Chat service limiter, {model}: admitted {row.get('admitted', 0)}, waited {row.get('waited', 0)}, "
+              f"throttled {row.get('throttled', 0)}, rejected {row.get('rejected', 0)}, "
+              f"wait p50 {row['wait_p50']:.2f}s p95 {row['wait_p95']:.2f}s, limits {row['limits']}")
+    for name, row in (coalesced or {}).items():
+        print(f"Coalesced, {name}: {row['calls']} calls, {row['upstream']} sent upstream, {row['saved']} shared")
+    for name, endpoints in (resilience or {}).items():
+        for endpoint, row in endpoints.items():
+            after = f"{row['hedge_after']:.2f}s" if row.get("hedge_after") else "not yet"
+            breaker = row["breaker"]
+            print(f"Hedging, {name} {endpoint}: {row.get('calls', 0)} calls, {row.get('hedged', 0)} hedged "
+                  f"({row['hedge_rate']:.1%}), {row.get('hedge_won', 0)} won by the hedge, hedge after {after}; "
+                  f"breaker {breaker['state']}, opened {breaker.get('opened', 0)}x, "
+                  f"{breaker.get('rejected', 0)} calls failed fast")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the apps' upstream paths against local stubs")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help="chat, imagegen, experimental (default all)")
+    parser.add_argument("--users", type=int, default=20, help="simulated users per scenario")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per scenario")
+    parser.add_argument("--think", type=float, default=1.0, help="mean pause between a user's actions")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which users join")
+    parser.add_argument("--chat-model", default="gemma2-9b-it", help="model of the chat sessions, e.g. auto")
+    parser.add_argument("--chat-limit-scale", type=float,
+                        help="multiply the chat service's per-minute Groq limits, e.g. 10 for a paid tier")
+    parser.add_argument("--stub-url", help="use stubs already running here instead of starting them")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--fail-p95", type=float, help="exit 1 when an operation's p95 is above this many seconds")
+    parser.add_argument("--fail-error-rate", type=float, help="exit 1 when an operation's error rate is above this")
+    stubs.add_arguments(parser)
+    args = parser.parse_args()
+
+    names = args.scenarios or ["chat", "imagegen", "experimental"]
+    for name in names:
+        if name not in ("chat", "imagegen", "experimental"):
+            parser.error(f"unknown scenario {name!r}")
+
+    stub_thread = None
+    stub_url = args.stub_url
+    if stub_url is None:
+        stub_thread = ServerThread(lambda: stubs.make_app(stubs.settings_from_args(args)))
+        stub_url = stub_thread.start()
+    # The apps read these when they are imported
+    os.environ.update(HF_API_BASE=stub_url, GITHUB_API_BASE=stub_url, HUGGINGFACEHUB_API_TOKEN="stub",
+                      GITHUB_TOKEN="stub")
+
+    import requests
+
+    recorder = Recorder()
+    rate_limits = {}
+    coalesced = {}  # identical calls in flight at once that shared one upstream call
+    resilience = {}  # hedged calls and circuit breakers per upstream endpoint
+    for name in names:
+        print(f"Running {name}: {args.users} users for {args.duration:.0f}s ...")
+        if name == "chat":
+            from shared.chat_client import ChatClient
+
+            chat_url = start_chat_service(stub_url, args.chat_limit_scale)
+            # Each simulated user is its own Streamlit session, but they share the app's cached client
+            client = ChatClient(chat_url, timeout=60)
+            scenario, make_context = chat_user, lambda: {"client": client, "model": args.chat_model}
+        else:
+            path = os.path.join(ROOT, "ImageGen", "app.py") if name == "imagegen" else \
+                os.path.join(ROOT, "ExperimentalImage", "steam.py")
+            module = load_script(path, name)
+            if hasattr(module, "SAVE_DIR"):  # keep the generated images out of the repository
+                module.SAVE_DIR = tempfile.mkdtemp(prefix="loadtest-")
+            scenario, make_context = image_user(module, name), dict
+        run_users(scenario, make_context, args.users, args.duration, args.think, args.ramp, recorder)
+        if name == "chat":
+            service_stats = requests.get(f"{chat_url}/stats", timeout=10).json()
+            rate_limits, coalesced[name] = service_stats["rate_limits"], service_stats["singleflight"]
+            breakers = service_stats["resilience"]["breakers"]
+            resilience[name] = {model: {**row, "breaker": breakers.get(model, {"state": "closed"})}
+                                for model, row in service_stats["resilience"]["hedging"].items()}
+        else:
+            coalesced[name] = module.get_hf_client().flights.stats()
+            resilience[name] = module.get_hf_client().guard.stats()
+
+    report = summarise(recorder, args.duration)
+    stub_stats = requests.get(f"{stub_url}/_stats", timeout=10).json()
+    print_report(report, stub_stats, rate_limits, coalesced, resilience)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "report": report, "stubs": stub_stats, "rate_limits": rate_limits,
+                       "coalesced": coalesced, "resilience": resilience}, f, indent=2)
+    if stub_thread:
+        stub_thread.stop()
+
+    failed = [op for op, row in report.items()
+              if (args.fail_p95 is not None and row["p95"] > args.fail_p95)
+              or (args.fail_error_rate is not None and row["error_rate"] > args.fail_error_rate)]
+    if failed:
+        print(f"\nFAILED budget: {', '.join(failed)}")
+        sys.exit(1)
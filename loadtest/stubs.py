@@ -0,0 +1,267 @@
+# Local stand-ins for the upstream APIs the apps call, for load tests without network or quota
+#   Groq           POST /openai/v1/chat/completions      (JSON or streamed, with Groq's rate-limit headers)
+#   HF inference   POST /models/{owner}/{name}            (JPEG bytes, 503 "model is loading" like HF)
+#   GitHub         PUT  /repos/{owner}/{repo}/contents/*  (201 with a download_url)
+# Every service has its own latency, error rates and optional per-minute limits, changeable while running
+# through POST /_config {"groq": {"latency": 1.0}}. GET /_stats counts requests and answers per service.
+# A share of requests can stall for extra seconds on top (--groq-stall-rate 0.05 --groq-stall 5), like a slow
+# replica, which is the tail hedged requests are meant to cut.
+# Usage: python loadtest/stubs.py --port 9100 --groq-latency 0.4 --groq-rpm 30 --hf-unavailable-rate 0.1
+#   then GROQ_BASE_URL=http://localhost:9100  HF_API_BASE=http://localhost:9100  GITHUB_API_BASE=http://localhost:9100
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+SERVICES = ("groq", "hf", "github")
+DEFAULTS = {
+    # median seconds, spread of the log-normal latency (bigger = longer tail)
+    "groq": {"latency": 0.3, "tail": 0.5, "tokens_per_sec": 400},
+    "hf": {"latency": 2.0, "tail": 0.4},
+    "github": {"latency": 0.2, "tail": 0.3},
+}
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class Behaviour():
+    # How one stub service answers: latency, random failures and request/token limits
+    def __init__(self, latency=0.3, tail=0.5, error_rate=0.0, unavailable_rate=0.0, rate_limit_rate=0.0,
+                 rpm=None, tpm=None, rpd=None, tokens_per_sec=None, stall_rate=0.0, stall=5.0):
+        self.latency = latency
+        self.tail = tail
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.unavailable_rate = unavailable_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.tokens_per_sec = tokens_per_sec
+        self.window = deque()  # (time, tokens) of accepted requests in the last minute
+        self.day = deque()  # times of accepted requests in the last day
+        self.counts = Counter()
+
+    def update(self, settings):
+        for name, value in settings.items():
+            if not hasattr(self, name) or name in ("window", "day", "counts"):
+                raise ValueError(f"unknown setting {name!r}")
+            setattr(self, name, value)
+
+    def settings(self):
+        return {name: value for name, value in vars(self).items() if name not in ("window", "day", "counts")}
+
+    def delay(self):
+        delay = self.latency * random.lognormvariate(0, self.tail) if self.tail else self.latency
+        if random.random() < self.stall_rate:
+            self.counts["stalled"] += 1
+            delay += self.stall
+        return delay
+
+    def limit_headers(self, now):
+        # Same names and meaning as Groq: requests per day and tokens per minute (requests per minute has no header)
+        headers = {}
+        tokens = sum(t for _, t in self.window)
+        if self.rpd:
+            reset = max(0.0, 86400 - (now - self.day[0])) if self.day else 0
+            headers.update({"x-ratelimit-limit-requests": str(self.rpd),
+                            "x-ratelimit-remaining-requests": str(max(0, self.rpd - len(self.day))),
+                            "x-ratelimit-reset-requests": f"{reset // 60:.0f}m{reset % 60:.2f}s"})
+        if self.tpm:
+            reset = max(0.0, 60 - (now - self.window[0][0])) if self.window else 0
+            headers.update({"x-ratelimit-limit-tokens": str(self.tpm),
+                            "x-ratelimit-remaining-tokens": str(max(0, self.tpm - tokens)),
+                            "x-ratelimit-reset-tokens": f"{reset:.2f}s"})
+        return headers
+
+    def admit(self, tokens=0):
+        # None when the request may go ahead, otherwise the (status, body, headers) to fail it with
+        now = time.monotonic()
+        while self.window and now - self.window[0][0] > 60:
+            self.window.popleft()
+        while self.day and now - self.day[0] > 86400:
+            self.day.popleft()
+        over_rpm = self.rpm and len(self.window) >= self.rpm
+        over_tpm = self.tpm and sum(t for _, t in self.window) + tokens > self.tpm
+        over_rpd = self.rpd and len(self.day) >= self.rpd
+        if over_rpm or over_tpm or over_rpd or random.random() < self.rate_limit_rate:
+            retry = 2.0
+            if over_rpd:
+                retry = 86400 - (now - self.day[0])
+            elif self.window and (over_rpm or over_tpm):
+                retry = max(1.0, 60 - (now - self.window[0][0]))
+            headers = {"retry-after": f"{retry:.0f}", **self.limit_headers(now)}
+            return 429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}, headers
+        if random.random() < self.unavailable_rate:
+            return 503, {"error": "Service unavailable, model is loading", "estimated_time": 20.0}, {}
+        if random.random() < self.error_rate:
+            return 500, {"error": {"message": "Internal server error", "type": "internal_error"}}, {}
+        self.window.append((now, tokens))
+        self.day.append(now)
+        return None
+
+
+BEHAVIOUR = web.AppKey("behaviour", dict)
+routes = web.RouteTableDef()
+
+
+async def gate(request, service, tokens=0):
+    # Waits the simulated latency and returns an error response, or None to carry on
+    behaviour = request.app[BEHAVIOUR][service]
+    behaviour.counts["requests"] += 1
+    await asyncio.sleep(behaviour.delay())
+    failure = behaviour.admit(tokens)
+    if failure is None:
+        behaviour.counts["200"] += 1
+        return None
+    status, body, headers = failure
+    behaviour.counts[str(status)] += 1
+    return web.json_response(body, status=status, headers=headers)
+
+
+@routes.post("/openai/v1/chat/completions")
+async def chat_completions(request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+    completion_tokens = min(int(body.get("max_tokens") or 60), 60)
+    failure = await gate(request, "groq", prompt_tokens + completion_tokens)
+    if failure is not None:
+        return failure
+
+    behaviour = request.app[BEHAVIOUR]["groq"]
+    question = messages[-1]["content"] if messages else ""
+    words = [f"stub{i}" for i in range(completion_tokens - 1)]
+    text = f"Reply to {question[:40]!r}: " + " ".join(words)
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens}
+    base = {"id": "chatcmpl-stub", "created": int(time.time()), "model": body.get("model")}
+    headers = behaviour.limit_headers(time.monotonic())
+
+    if not body.get("stream"):
+        return web.json_response({
+            **base, "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        }, headers=headers)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", **headers})
+    await response.prepare(request)
+    pause = 1 / behaviour.tokens_per_sec if behaviour.tokens_per_sec else 0
+    for i, piece in enumerate(text.split(" ")):
+        delta = {"content": piece if i == 0 else " " + piece}
+        chunk = {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if pause:
+            await asyncio.sleep(pause)
+    last = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": usage}}
+    await response.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode())
+    return response
+
+
+@routes.post("/models/{owner}/{name}")
+async def hf_inference(request):
+    await request.read()
+    failure = await gate(request, "hf")
+    if failure is not None:
+        return failure
+    return web.Response(body=request.app[IMAGE], content_type="image/jpeg")
+
+
+@routes.put("/repos/{owner}/{repo}/contents/{path:.*}")
+async def github_contents(request):
+    body = await request.json()
+    failure = await gate(request, "github")
+    if failure is not None:
+        return failure
+    path = request.match_info["path"]
+    host = f"{request.scheme}://{request.host}"
+    return web.json_response({
+        "content": {"name": path.rsplit("/", 1)[-1], "path": path, "size": len(body.get("content", "")) * 3 // 4,
+                    "download_url": f"{host}/raw/{request.match_info['owner']}/{request.match_info['repo']}/{path}"},
+        "commit": {"message": body.get("message")},
+    }, status=201)
+
+
+@routes.get("/_stats")
+async def stats(request):
+    return web.json_response({name: dict(b.counts) for name, b in request.app[BEHAVIOUR].items()})
+
+
+@routes.post("/_config")
+async def config(request):
+    data = await request.json()
+    try:
+        for name, settings in data.items():
+            request.app[BEHAVIOUR][name].update(settings)
+    except (KeyError, ValueError) as e:
+        return web.json_response({"error": str(e)}, status=400)
+    return web.json_response({name: b.settings() for name, b in request.app[BEHAVIOUR].items()})
+
+
+def _stub_image():
+    # One small JPEG reused for every HF answer
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+IMAGE = web.AppKey("image", bytes)
+
+
+def make_app(settings=None):
+    # settings: {"groq": {"latency": ..., "rpm": ...}, "hf": {...}, "github": {...}}
+    settings = settings or {}
+    app = web.Application()
+    app[BEHAVIOUR] = {name: Behaviour(**{**DEFAULTS[name], **settings.get(name, {})}) for name in SERVICES}
+    app[IMAGE] = _stub_image()
+    app.add_routes(routes)
+    return app
+
+
+def add_arguments(parser):
+    # --groq-latency, --hf-error-rate, ... for every service and setting
+    for name in SERVICES:
+        group = parser.add_argument_group(f"{name} stub")
+        group.add_argument(f"--{name}-latency", type=float, help="median seconds per request")
+        group.add_argument(f"--{name}-tail", type=float, help="log-normal spread of the latency")
+        group.add_argument(f"--{name}-error-rate", type=float, help="share of requests answered 500")
+        group.add_argument(f"--{name}-unavailable-rate", type=float, help="share answered 503")
+        group.add_argument(f"--{name}-rate-limit-rate", type=float, help="share answered 429 at random")
+        group.add_argument(f"--{name}-rpm", type=int, help="requests per minute before 429")
+        group.add_argument(f"--{name}-tpm", type=int, help="tokens per minute before 429")
+        group.add_argument(f"--{name}-rpd", type=int, help="requests per day before 429")
+        group.add_argument(f"--{name}-stall-rate", type=float, help="share of requests that stall")
+        group.add_argument(f"--{name}-stall", type=float, help="extra seconds a stalled request takes")
+    parser.add_argument("--groq-tokens-per-sec", type=float, help="streaming speed")
+
+
+def settings_from_args(args):
+    settings = {}
+    for name in SERVICES:
+        prefix = f"{name}_"
+        settings[name] = {key[len(prefix):]: value for key, value in vars(args).items()
+                          if key.startswith(prefix) and value is not None}
+    return settings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Groq, HF inference and GitHub APIs for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(make_app(settings_from_args(args)), host=args.host, port=args.port)
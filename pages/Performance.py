@@ -0,0 +1,20 @@
+# Performance of this app and of the chat service behind it, see shared/performance_page.py
+import os
+import sys
+
+import streamlit as st
+
+# The shared helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.chat_client import ChatClient
+from shared.performance_page import render
+
+st.set_page_config(page_title="Performance", page_icon="📈", layout="wide")
+
+
+@st.cache_resource
+def get_stats_client():
+    return ChatClient(timeout=10)
+
+
+render(get_stats_client())
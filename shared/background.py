@@ -0,0 +1,49 @@
+# CSS for the animated merge.gif background used by the Streamlit apps
+# build_assets.py writes the optimised files and a background.json manifest into each app's static/ folder,
+# Streamlit serves them at app/static/ (enableStaticServing in .streamlit/config.toml).
+
+import functools
+import json
+import os
+
+MANIFEST = "background.json"
+STATIC_URL = "app/static/"
+# Used when the assets have not been built, e.g. a deployment without the build step
+CDN_URL = "https://cdn.jsdelivr.net/gh/AadishY/Python-Aadish@main/merge.gif"
+
+
+@functools.lru_cache(maxsize=None)
+def load_manifest(app_dir):
+    path = os.path.join(app_dir, "static", MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def asset_url(manifest, variant):
+    # Streamlit's static handler sends no long Cache-Control, so browsers revalidate; the content hashed names
+    # only make sure a new build is never mixed up with a cached old one
+    name = manifest["files"].get(variant)
+    if name is None:
+        return None
+    return f"{STATIC_URL}{name}"
+
+
+def background_css(app_file, selector=".stApp"):
+    # Background rules for the app whose script is app_file, to go inside a <style> block.
+    # The small still frame is layered under the animation so it shows straight away while the WebP loads,
+    # and clients that ask for less data or motion only get the still.
+    manifest = load_manifest(os.path.dirname(os.path.abspath(app_file)))
+    if manifest is None:
+        return f"{selector} {{ background-image: url('{CDN_URL}'); }}"
+
+    still = asset_url(manifest, "still")
+    animated = asset_url(manifest, "webp")
+    layers = f"url('{animated}'), url('{still}')" if animated else f"url('{still}')"
+    return (
+        f"{selector} {{ background-image: {layers}; }}\n"
+        f"@media (prefers-reduced-data: reduce), (prefers-reduced-motion: reduce) {{\n"
+        f"    {selector} {{ background-image: url('{still}'); }}\n"
+        f"}}"
+    )
@@ -0,0 +1,139 @@
+# Thin client for ChatService/server.py, used by the Streamlit chat apps and the CLI bots
+# The apps only remember a session id, the conversation itself lives in the service.
+# Reply times, tokens per second, semantic cache hits and rate-limit queueing go to shared.metrics.
+
+import json
+import os
+import time
+
+import requests
+
+from shared.metrics import METRICS
+
+DEFAULT_URL = "http://localhost:8080"
+
+
+class ChatServiceError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ChatClient():
+    def __init__(self, base_url=None, timeout=120):
+        # CHAT_SERVICE_URL is read here rather than at import, so a .env loaded after the import still counts
+        self.base_url = (base_url or os.getenv("CHAT_SERVICE_URL", DEFAULT_URL)).rstrip("/")
+        self.timeout = timeout
+        # One pooled connection set for every Streamlit session in the process
+        self.http = requests.Session()
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise ChatServiceError(f"chat service unreachable at {self.base_url}: {e}") from e
+        if response.status_code >= 400 and not kwargs.get("stream"):
+            raise ChatServiceError(_error_message(response), response.status_code)
+        return response
+
+    def models(self):
+        return self._request("GET", "/models").json()
+
+    def stats(self, per_session=False):
+        # The service's own numbers: rate-limit queues, router, semantic cache, coalescing, session memory
+        params = {"sessions": 1} if per_session else None
+        return self._request("GET", "/stats", params=params).json()
+
+    def create_session(self, model=None, system_prompt=None, memory=None, **options):
+        # memory: "full", {"policy": "window", "k": 5} or {"policy": "tokens", "max_tokens": 2000}
+        body = {"model": model, "system_prompt": system_prompt, "memory": memory, "options": options}
+        return self._request("POST", "/sessions", json=body).json()["id"]
+
+    def session(self, session_id, limit=None):
+        # The session with its newest messages, None when the service no longer has it
+        params = {"limit": limit} if limit is not None else None
+        try:
+            return self._request("GET", f"/sessions/{session_id}", params=params).json()
+        except ChatServiceError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def history(self, session_id):
+        session = self.session(session_id)
+        return session["messages"] if session else []
+
+    def delete_session(self, session_id):
+        try:
+            self._request("DELETE", f"/sessions/{session_id}")
+        except ChatServiceError as e:
+            if e.status != 404:
+                raise
+
+    def send(self, session_id, content, model=None, **options):
+        # Whole reply at once, returns the text
+        body = {"content": content, "model": model, **options}
+        start = time.perf_counter()
+        data = self._request("POST", f"/sessions/{session_id}/messages", json=body).json()
+        METRICS.cache("chat: semantic cache", "cached" in data, data.get("model"))
+        METRICS.observe("chat: reply", time.perf_counter() - start, data.get("model"))
+        return data["reply"]
+
+    def stream(self, session_id, content, model=None, on_queue=None, on_done=None, **options):
+        # Yields the reply in pieces as the model writes it, works with st.write_stream.
+        # on_queue(place, eta_seconds) is called while the service waits for Groq quota,
+        # on_done(event) at the end: {"model": the model that answered, "cached": similarity if from the cache}.
+        body = {"content": content, "model": model, "stream": True, **options}
+        start = time.perf_counter()
+        first = queued = None
+        characters = 0
+        with self._request("POST", f"/sessions/{session_id}/messages", json=body, stream=True) as response:
+            if response.status_code >= 400:
+                raise ChatServiceError(_error_message(response), response.status_code)
+            for event in _events(response):
+                if "error" in event:
+                    raise ChatServiceError(event["error"], event.get("status"))
+                if "queued" in event:
+                    queued = queued or time.perf_counter()
+                    METRICS.depth("chat: Groq rate limit", event["queued"], model)
+                    if on_queue:
+                        on_queue(event["queued"], event["eta"])
+                if "delta" in event:
+                    first = first or time.perf_counter()
+                    characters += len(event["delta"])
+                    yield event["delta"]
+                if event.get("done"):
+                    _record_stream(event, start, first, queued, characters)
+                    if on_done:
+                        on_done(event)
+
+
+def _record_stream(done, start, first, queued, characters):
+    # Times are measured here, so they include the hop to the chat service and what the user really waited
+    now = time.perf_counter()
+    model, cached = done.get("model"), "cached" in done
+    METRICS.cache("chat: semantic cache", cached, model)
+    if queued:
+        METRICS.observe("chat: rate-limit wait", (first or now) - queued, model)
+    if first:
+        METRICS.observe("chat: first token", first - start, model)
+    METRICS.observe("chat: reply", now - start, model)
+    if first and not cached:
+        METRICS.throughput(model, characters / 4, now - first)  # about 4 characters per token
+
+
+def _events(response):
+    # The NDJSON lines of a streamed reply, a connection that drops halfway becomes a ChatServiceError
+    try:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+    except requests.RequestException as e:
+        raise ChatServiceError(f"chat service stream broke off: {e}") from e
+
+
+def _error_message(response):
+    try:
+        return response.json()["error"]
+    except (ValueError, KeyError):
+        return f"chat service answered {response.status_code}"
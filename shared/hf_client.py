@@ -0,0 +1,40 @@
+# Hugging Face inference calls for the image apps
+# Sessions of one Streamlit process share a client: identical calls in flight at the same time make one upstream
+# call (SingleFlight), and every model gets hedging and a circuit breaker (UpstreamGuard). Keep one per process
+# with st.cache_resource. A call that is refused because the model's breaker is open raises CircuitOpen.
+
+import requests
+
+from shared.metrics import METRICS
+from shared.resilience import UpstreamGuard
+from shared.singleflight import SingleFlight, request_key
+
+# Seconds to connect and to wait for an answer, a stuck call must not hang the page forever
+HF_TIMEOUT = (10, 120)
+
+
+def model_name(url):
+    return url.split("/models/", 1)[-1]
+
+
+class HFClient():
+    def __init__(self, token, timeout=HF_TIMEOUT):
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.timeout = timeout
+        self.flights = SingleFlight()
+        self.guard = UpstreamGuard()
+        METRICS.gauge("image: Hugging Face calls in flight", lambda: self.flights.stats()["in_flight"])
+        METRICS.gauge("image: calls shared with an identical one", lambda: self.flights.stats()["saved"])
+        METRICS.gauge("image: hedging and breakers", self.guard.stats)
+
+    def _post(self, url, payload):
+        with METRICS.timer("image: Hugging Face call", model_name(url)):
+            response = requests.post(url, headers=self.headers, json=payload, timeout=self.timeout)
+        response.raise_for_status()  # Raises an error for bad responses
+        return response.content
+
+    def query(self, url, payload):
+        # Returns the response body. Timed here too, a session that shares another's call waits less than a whole call
+        model = model_name(url)
+        with METRICS.timer("image: generate", model):
+            return self.flights.do(request_key(url, payload), self.guard.call, model, self._post, url, payload)
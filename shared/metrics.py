@@ -0,0 +1,169 @@
+# In-process performance metrics for the Streamlit apps
+# The chat client, the image apps and GenVideo record how long each stage took, tokens per second, cache hits and
+# queue depths here. Every Streamlit session of a process runs in a thread of that process, so one module level
+# collector sees them all; the Performance page (shared/performance_page.py) summarises the last few minutes.
+# Samples go into a bounded deque, so recording is a lock and an append and memory stays flat.
+
+import contextlib
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+
+MAX_AGE = int(os.getenv("METRICS_MAX_AGE", "3600"))  # seconds of samples kept, the longest window on the page
+MAX_SAMPLES = int(os.getenv("METRICS_MAX_SAMPLES", "100000"))  # about 10 MB at most
+FIELDS = ("time", "kind", "name", "model", "value")
+
+
+def percentile(values, q):
+    # Nearest rank of sorted values
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+class Metrics():
+    def __init__(self, max_age=MAX_AGE, max_samples=MAX_SAMPLES):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=max_samples)  # (time, kind, name, model, value)
+        self.depths = {}  # queue -> callers waiting in it right now
+        self.gauges = {}  # name -> function giving its current value, e.g. the size of a cache
+        self.started = time.time()
+
+    def _add(self, kind, name, model, value):
+        now = time.time()
+        with self.lock:
+            self.samples.append((now, kind, name, model, value))
+            while self.samples and self.samples[0][0] < now - self.max_age:
+                self.samples.popleft()
+
+    # Recording
+
+    def observe(self, stage, seconds, model=None):
+        self._add("latency", stage, model, seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage, model=None):
+        # Times the block, also when it raises
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, model)
+
+    def throughput(self, model, tokens, seconds):
+        if tokens and seconds > 0:
+            self._add("tokens_per_s", "generation", model, tokens / seconds)
+
+    def cache(self, name, hit, model=None):
+        self._add("cache", name, model, 1.0 if hit else 0.0)
+
+    def depth(self, queue, value, model=None):
+        # A queue position reported from elsewhere, e.g. the chat service's place in the Groq rate-limit queue
+        self._add("queue", queue, model, value)
+
+    @contextlib.contextmanager
+    def queue(self, name, lock, model=None):
+        # Takes lock like `with lock:`, counting who waits for it and for how long
+        with self.lock:
+            depth = self.depths[name] = self.depths.get(name, 0) + 1
+        self._add("queue", name, model, depth - 1)  # the callers ahead of this one
+        start = time.perf_counter()
+        try:
+            lock.acquire()
+        finally:
+            with self.lock:
+                self.depths[name] -= 1
+            self.observe(f"{name} wait", time.perf_counter() - start, model)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def gauge(self, name, func):
+        # func() is read when the page is drawn; registering the same name again replaces it
+        with self.lock:
+            self.gauges[name] = func
+
+    # Reading
+
+    def window(self, seconds):
+        since = time.time() - seconds
+        with self.lock:
+            return [sample for sample in self.samples if sample[0] >= since]
+
+    def _groups(self, samples, kind):
+        groups = {}
+        for _, sample_kind, name, model, value in samples:
+            if sample_kind == kind:
+                groups.setdefault((name, model), []).append(value)
+        return sorted(groups.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+
+    def summary(self, seconds):
+        # Tables for the page, over the last `seconds`
+        samples = self.window(seconds)
+        latency, speed, caches, queues = [], [], [], []
+        for (stage, model), values in self._groups(samples, "latency"):
+            values.sort()
+            latency.append({"stage": stage, "model": model or "", "count": len(values),
+                            "p50_s": round(percentile(values, 0.5), 3), "p95_s": round(percentile(values, 0.95), 3),
+                            "max_s": round(values[-1], 3)})
+        for (_, model), values in self._groups(samples, "tokens_per_s"):
+            values.sort()
+            speed.append({"model": model or "", "replies": len(values),
+                          "p50_tokens_per_s": round(percentile(values, 0.5), 1),
+                          "p5_tokens_per_s": round(percentile(values, 0.05), 1)})
+        for (name, model), values in self._groups(samples, "cache"):
+            caches.append({"cache": name, "model": model or "", "lookups": len(values), "hits": int(sum(values)),
+                           "hit_rate": round(sum(values) / len(values), 3)})
+        with self.lock:
+            depths = dict(self.depths)
+        for (name, model), values in self._groups(samples, "queue"):
+            values.sort()
+            queues.append({"queue": name, "model": model or "", "waiting_now": depths.get(name, ""),
+                           "samples": len(values), "p95_depth": percentile(values, 0.95), "max_depth": values[-1]})
+        return {"latency": latency, "throughput": speed, "caches": caches, "queues": queues}
+
+    def timeline(self, seconds, bucket=60):
+        # p95 latency per stage for every `bucket` seconds, oldest first, for a chart
+        buckets = {}
+        for when, kind, stage, _, value in self.window(seconds):
+            if kind == "latency":
+                buckets.setdefault(int(when // bucket) * bucket, {}).setdefault(stage, []).append(value)
+        return [{"time": start, **{stage: percentile(sorted(values), 0.95) for stage, values in stages.items()}}
+                for start, stages in sorted(buckets.items())]
+
+    def read_gauges(self):
+        with self.lock:
+            gauges = dict(self.gauges)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = func()
+            except Exception as e:  # a broken gauge must not take the page down
+                values[name] = f"error: {e}"
+        return values
+
+    def to_csv(self, seconds):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+        for when, kind, name, model, value in self.window(seconds):
+            writer.writerow((round(when, 3), kind, name, model or "", round(value, 6)))
+        return out.getvalue()
+
+
+def process_memory():
+    # Resident memory of this process in bytes
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource  # not on Windows
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, in KB on Linux
+
+
+# The collector of this process
+METRICS = Metrics()
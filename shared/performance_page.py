@@ -0,0 +1,122 @@
+# The "Performance" page of the Streamlit apps
+# Each app has a pages/ entry that calls render(). It shows what shared.metrics collected in this process over a
+# rolling window, and for the chat apps what the chat service reports about itself (GET /stats).
+
+import time
+
+import pandas as pd
+import streamlit as st
+
+from shared.metrics import METRICS, process_memory
+
+WINDOWS = {"Last 5 minutes": 300, "Last 15 minutes": 900, "Last hour": 3600}
+MB = 1024 * 1024
+
+
+def active_sessions():
+    # Browser sessions connected to this Streamlit process, None outside `streamlit run`
+    from streamlit import runtime
+
+    if not runtime.exists():
+        return None
+    try:
+        return runtime.get_instance()._session_mgr.num_active_sessions()
+    except AttributeError:  # not a public API, may move between Streamlit versions
+        return None
+
+
+def table(rows, empty):
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True, width="stretch")
+    else:
+        st.caption(empty)
+
+
+def show_process():
+    sessions = active_sessions()
+    memory = process_memory()
+    cols = st.columns(4)
+    cols[0].metric("Up for", f"{(time.time() - METRICS.started) / 60:.0f} min")
+    cols[1].metric("Memory", f"{memory / MB:.0f} MB")
+    cols[2].metric("Sessions", sessions if sessions is not None else "n/a")
+    cols[3].metric("Memory per session", f"{memory / sessions / MB:.1f} MB" if sessions else "n/a",
+                   help="Resident memory of this process divided by its connected sessions")
+    gauges = METRICS.read_gauges()
+    if gauges:
+        table([{"value": name, "now": str(value)} for name, value in sorted(gauges.items())], "")
+
+
+def show_chat_service(client):
+    try:
+        stats = client.stats(per_session=True)
+    except Exception as e:
+        st.warning(f"Chat service stats unavailable: {e}")
+        return
+    st.subheader("Chat service")
+    sessions = stats.get("sessions_in_memory", 0)
+    cols = st.columns(3)
+    cols[0].metric("Sessions in memory", sessions)
+    cols[1].metric("Session memory", f"{stats.get('memory_bytes', 0) / MB:.1f} MB")
+    cols[2].metric("Per session", f"{stats['memory_bytes'] / sessions / 1024:.1f} KB" if sessions else "n/a")
+
+    st.markdown("**Rate-limit queues and waits** (since the service started)")
+    table([{"model": model, "queue": row.get("queue"), "waited": row.get("waited", 0),
+            "throttled": row.get("throttled", 0), "rejected": row.get("rejected", 0),
+            "wait_p50_s": round(row.get("wait_p50", 0), 2), "wait_p95_s": round(row.get("wait_p95", 0), 2),
+            "tokens_left": row.get("tokens_left"), "requests_left": row.get("requests_left")}
+           for model, row in sorted(stats.get("rate_limits", {}).items())], "No Groq calls yet.")
+
+    st.markdown("**Model health** (router EWMAs)")
+    table([{"model": model, **row} for model, row in sorted(stats.get("router", {}).items())], "No router data.")
+
+    cache, flights = stats.get("semantic_cache", {}), stats.get("singleflight", {})
+    cols = st.columns(3)
+    cols[0].metric("Semantic cache hit rate", f"{cache.get('hit_rate', 0):.0%}",
+                   help=f"{cache.get('entries', 0)} entries, lookup {cache.get('lookup_ms', 0)} ms")
+    cols[1].metric("Calls shared in flight", flights.get("saved", 0), help=f"of {flights.get('calls', 0)} calls")
+    cols[2].metric("Groq calls in flight", flights.get("in_flight", 0))
+
+    resilience = stats.get("resilience", {})
+    breakers = resilience.get("breakers", {})
+    st.markdown("**Hedged calls and circuit breakers**")
+    table([{"model": model, **row, "breaker": breakers.get(model, {}).get("state", "closed")}
+           for model, row in sorted(resilience.get("hedging", {}).items())], "No Groq calls yet.")
+
+    per_session = stats.get("sessions", [])
+    if per_session:
+        st.markdown("**Largest sessions**")
+        table(per_session[:20], "")
+
+
+def render(chat_client=None):
+    # chat_client: a shared.chat_client.ChatClient for the apps that talk to the chat service
+    st.title("Performance")
+    window_name = st.selectbox("Window", list(WINDOWS), index=1)
+    seconds = WINDOWS[window_name]
+    st.button("Refresh")  # a click reruns the page, which reads the numbers again
+    summary = METRICS.summary(seconds)
+
+    st.subheader("This app")
+    show_process()
+
+    st.markdown("**Latency per stage and model**")
+    table(summary["latency"], "Nothing recorded in this window yet.")
+    timeline = METRICS.timeline(seconds)
+    if len(timeline) > 1:
+        st.markdown("**p95 latency per minute** (seconds)")
+        frame = pd.DataFrame(timeline)
+        frame["time"] = pd.to_datetime(frame["time"], unit="s")
+        st.line_chart(frame.set_index("time"))
+
+    st.markdown("**Tokens per second** (from the first token to the end of the reply)")
+    table(summary["throughput"], "No streamed replies in this window.")
+    st.markdown("**Cache hit rates**")
+    table(summary["caches"], "No cache lookups in this window.")
+    st.markdown("**Queue depths** (callers ahead on arrival)")
+    table(summary["queues"], "Nobody queued in this window.")
+
+    if chat_client is not None:
+        show_chat_service(chat_client)
+
+    st.download_button("Export samples as CSV", METRICS.to_csv(seconds), file_name="performance.csv",
+                       mime="text/csv")
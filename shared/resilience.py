@@ -0,0 +1,282 @@
+# Hedged calls and circuit breakers for upstream calls: Hugging Face inference from the Streamlit apps,
+# Groq from the chat service
+#   hedging   a call still running after its endpoint's observed p95 gets a twin, the first answer wins.
+#             Only a small share of calls may be hedged, so a slow upstream does not get twice the traffic.
+#   breaker   an endpoint that keeps failing (5xx, timeouts, refused connections) is not called for a while,
+#             callers get CircuitOpen straight away instead of a spinner that ends in an error.
+#             After the cooldown one call probes it.
+# UpstreamGuard is for blocking calls made from session threads; the loser of a hedge cannot be stopped there,
+# a thread runs it to the end and its result is dropped. Keep one per process with st.cache_resource, like
+# SingleFlight. Hedger is the asyncio version, where the loser is cancelled.
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))  # share of recent calls that may be hedged, 0: off
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # latencies needed before the p95 is trusted
+HEDGE_MIN_DELAY = 0.5  # seconds, never hedge sooner than this
+SAMPLES = 200  # latencies and hedge decisions remembered per endpoint
+WORKERS = 32  # threads for calls in flight, hedges included
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))  # failures in a row that open the breaker
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))  # seconds before a probe is let through
+
+
+class CircuitOpen(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def hedge_delay(latencies, budget, min_delay):
+    # Seconds to wait before hedging, None until enough latencies are known
+    latencies = sorted(latencies)
+    if not budget or len(latencies) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(min_delay, latencies[int(len(latencies) * HEDGE_QUANTILE)])
+
+
+def budget_left(decisions, budget):
+    # decisions: recent calls, True when hedged
+    return sum(decisions) < budget * max(len(decisions), HEDGE_MIN_SAMPLES)
+
+
+def healthy(error):
+    # What a failed requests call says about its endpoint: False when the endpoint is failing, None when it was
+    # this call (bad request, no quota left)
+    import requests  # the chat service uses the breakers without requests installed
+
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return False
+    response = getattr(error, "response", None)
+    if response is not None and response.status_code >= 500:
+        return False
+    return None
+
+
+class CircuitBreaker():
+    # closed: calls go out. open: calls fail at once. half-open: one probe call decides which of the two is next
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.streak = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.counters = Counter()
+
+    def check(self, name):
+        # Raises CircuitOpen when a call should not go out now; every check needs a record() afterwards
+        with self.lock:
+            if self.state == "open":
+                left = self.opened_at + self.cooldown - time.monotonic()
+                if left > 0:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpen(f"{name} keeps failing, not calling it for {left:.0f}s", left)
+                self.state = "half-open"
+            if self.state == "half-open":
+                if self.probing:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpen(f"{name} keeps failing, a test call is under way", 1.0)
+                self.probing = True
+
+    def record(self, ok):
+        # ok: True, False, or None for outcomes that say nothing about the endpoint's health
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.state = "closed"
+                self.streak = 0
+            elif ok is not None:
+                self.streak += 1
+                if self.state == "half-open" or self.streak >= self.failures:
+                    if self.state != "open":
+                        self.counters["opened"] += 1
+                    self.state = "open"
+                    self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "failures_in_a_row": self.streak, **self.counters}
+
+
+class _Endpoint():
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=SAMPLES)
+        self.decisions = deque(maxlen=SAMPLES)  # True for hedged calls
+        self.counters = Counter()
+
+
+class UpstreamGuard():
+    def __init__(self, budget=HEDGE_BUDGET):
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="upstream")
+
+    def _endpoint(self, name):
+        with self.lock:
+            if name not in self.endpoints:
+                self.endpoints[name] = _Endpoint()
+            return self.endpoints[name]
+
+    def delay(self, endpoint):
+        with self.lock:
+            latencies = list(endpoint.latencies)
+        return hedge_delay(latencies, self.budget, HEDGE_MIN_DELAY)
+
+    def _may_hedge(self, endpoint):
+        with self.lock:
+            return budget_left(endpoint.decisions, self.budget)
+
+    def _timed(self, endpoint, func, args, kwargs, started=None):
+        if started is not None:
+            started.set()
+        start = time.monotonic()
+        result = func(*args, **kwargs)
+        with self.lock:
+            endpoint.latencies.append(time.monotonic() - start)
+        return result
+
+    def call(self, name, func, *args, **kwargs):
+        # func(*args, **kwargs) through the endpoint's breaker, hedged when it runs past the endpoint's p95
+        endpoint = self._endpoint(name)
+        endpoint.breaker.check(name)
+        health = None
+        try:
+            result = self._hedged(endpoint, func, args, kwargs)
+            health = True
+            return result
+        except Exception as e:
+            health = healthy(e)
+            raise
+        finally:
+            endpoint.breaker.record(health)
+
+    def _hedged(self, endpoint, func, args, kwargs):
+        # The loser keeps its thread until it ends and then still adds its latency, the slow tail included
+        started = threading.Event()
+        first = self.pool.submit(self._timed, endpoint, func, args, kwargs, started)
+        futures = [first]
+        delay = self.delay(endpoint)
+        hedged = False
+        if delay is not None:
+            # The p95 counts from when a worker picks the call up. Time spent waiting for a free worker says the
+            # pool is busy, not that the endpoint is slow, and a hedge would only add to the queue.
+            started.wait()
+            wait(futures, timeout=delay)
+            if not first.done() and self._may_hedge(endpoint):
+                hedged = True
+                futures.append(self.pool.submit(self._timed, endpoint, func, args, kwargs))
+        with self.lock:
+            endpoint.decisions.append(hedged)
+            endpoint.counters["calls"] += 1
+            endpoint.counters["hedged"] += hedged
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        with self.lock:
+                            endpoint.counters["hedge_won"] += 1
+                    return future.result()
+        return first.result()  # both failed, raise the first call's error
+
+    def stats(self):
+        with self.lock:
+            endpoints = dict(self.endpoints)
+        data = {}
+        for name, endpoint in endpoints.items():
+            delay = self.delay(endpoint)
+            with self.lock:
+                counters = dict(endpoint.counters)
+            calls = counters.get("calls", 0)
+            data[name] = {**counters, "hedge_rate": round(counters.get("hedged", 0) / calls, 3) if calls else 0.0,
+                          "hedge_after": round(delay, 3) if delay else None, "breaker": endpoint.breaker.stats()}
+        return data
+
+
+class Hedger():
+    # For coroutines: hedges per model (or any name) without a breaker, the caller keeps its own
+    def __init__(self, budget=HEDGE_BUDGET, min_delay=HEDGE_MIN_DELAY):
+        self.budget = budget
+        self.min_delay = min_delay
+        self.latencies = {}  # model -> recent call latencies
+        self.decisions = {}  # model -> recent calls, True when hedged
+        self.counters = {}
+
+    def _model(self, model):
+        if model not in self.latencies:
+            self.latencies[model] = deque(maxlen=SAMPLES)
+            self.decisions[model] = deque(maxlen=SAMPLES)
+            self.counters[model] = Counter()
+        return model
+
+    def delay(self, model):
+        return hedge_delay(self.latencies[self._model(model)], self.budget, self.min_delay)
+
+    async def _timed(self, model, call, first):
+        # Latency of every successful attempt. A first attempt that lost to its hedge counts with the time it had
+        # taken so far, leaving it out would hide the very tail the p95 is meant to track.
+        start = time.monotonic()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            if first:
+                self.latencies[model].append(time.monotonic() - start)
+            raise
+        self.latencies[model].append(time.monotonic() - start)
+        return result
+
+    async def run(self, model, call, may_hedge, discard=None):
+        # Awaits call(), or a second call() started after the p95 if the coroutine may_hedge() allows it (and took
+        # its quota).
+        # Returns (result, hedged); the first success wins, an error only counts once both attempts failed.
+        # discard(result) cleans up a loser that finished at the same moment, e.g. closes an unread stream.
+        self._model(model)
+        winner = None
+        counters = self.counters[model]
+        counters["calls"] += 1
+        tasks = [asyncio.ensure_future(self._timed(model, call, True))]
+        hedged = False
+        try:
+            delay = self.delay(model)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and budget_left(self.decisions[model], self.budget) and await may_hedge():
+                    hedged = True
+                    counters["hedged"] += 1
+                    tasks.append(asyncio.ensure_future(self._timed(model, call, False)))
+            self.decisions[model].append(hedged)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        if task is not tasks[0]:
+                            counters["hedge_won"] += 1
+                        return task.result(), hedged
+            raise tasks[0].exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and discard and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    def stats(self):
+        data = {}
+        for model, counters in self.counters.items():
+            delay = self.delay(model)
+            data[model] = {**counters, "hedge_rate": round(counters["hedged"] / counters["calls"], 3)
+                           if counters["calls"] else 0.0, "hedge_after": round(delay, 3) if delay else None}
+        return data
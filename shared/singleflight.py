@@ -0,0 +1,61 @@
+# Request coalescing for the Streamlit apps
+# Sessions of one Streamlit process run in threads. When several of them make the same upstream call at the same
+# time (same endpoint, model and payload), only the first one calls out and the others wait for its result.
+# Keep one SingleFlight per process with st.cache_resource, a new one on every rerun would share nothing.
+
+import hashlib
+import json
+import threading
+
+
+def request_key(endpoint, payload, model=None):
+    # Identical requests give the same key, whatever the order of the payload's keys
+    body = json.dumps([endpoint, model, payload], sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class _Call():
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> the call in flight
+        self.counters = {"calls": 0, "upstream": 0, "saved": 0}  # saved: calls that got another call's result
+
+    def do(self, key, func, *args, **kwargs):
+        # func(*args, **kwargs), unless the same key is already in flight; then its result (or exception) is shared
+        with self.lock:
+            self.counters["calls"] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.counters["upstream"] += 1
+            else:
+                self.counters["saved"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, "in_flight": len(self.calls)}
@@ -1,89 +1,129 @@
-import turtle as t
-import time 
-t.tracer(0, 0)
-screen = t.Screen()
-t.title("GenJutsu")
-
-def cir():
-    t.home()
-    t.goto(0,-140)
-    t.shape('blank')
-    t.color('black','red')
-    t.width(4)
-    t.begin_fill()
-    t.circle(200)
-    t.end_fill()
-    t.penup()
-    t.left(90)
-    t.forward(160)
-    t.right(90)
-    t.pendown()
-    t.color('black')
-    t.begin_fill()
-    t.circle(40)
-    t.end_fill()
-    t.penup()
-    t.right(90)
-    t.forward(60)
-    t.left(90)
-    t.pendown()
-    t.width(3)
-    t.color('grey')
-    t.circle(100)
-
-class yin():
-    def __init__(self, turtle):
-        self.turtle = turtle.clone()
-        
-    def draw(self, angle, distance):
-        t.right(angle)
-        
-        self.turtle.penup()
-        self.turtle.forward(100)
-        self.turtle.right(5)
-        self.turtle.pendown()
-        self.turtle.color('black','black')
-        
-        self.turtle.begin_fill()
-        self.turtle.circle(distance,180)
-        self.turtle.right(180)
-        self.turtle.circle(-2*distance,180)
-        self.turtle.circle(-1*distance,180)
-        self.turtle.end_fill()
-
-    def erase(self):
-        self.turtle.clear()
-
-    def go(self):
-        self.turtle.goto(0,60)
-
-t.penup()
-t.goto(0, 60)
-t.pendown()
-t.shape("blank")
-
-a = yin(t)
-t.right(120)
-b = yin(t)
-t.right(120)
-c = yin(t)
-
-i = 0
-for j in [a,b,c]:
-    j.erase()
-
-try:    
-    while True:
-        cir()
-        for j in [a,b,c]:
-            j.draw(i, 10)
-        screen.update()
-        for j in [a,b,c]:
-            j.go()
-            j.erase()
-        time.sleep(0.01)
-        i+=0.01
-except:
-    print("Aadish")
-    
-    
+# Live Tk animation of the sharingan. For a GIF/WebP file use sharingan_export.py, which needs no display.
+import time
+import numpy as np
+
+TARGET_FPS = 60
+ROTATION_SPEED = 240  # degrees per second, clockwise
+CENTER = np.array([0.0, 60.0])
+TOMOE_DISTANCE = 100
+TOMOE_SIZE = 10
+ARC_POINTS = 24
+
+
+def cir():
+    # Red disc, pupil and ring. Drawn once, only the tomoe move after that.
+    t.home()
+    t.goto(0,-140)
+    t.shape('blank')
+    t.color('black','red')
+    t.width(4)
+    t.begin_fill()
+    t.circle(200)
+    t.end_fill()
+    t.penup()
+    t.left(90)
+    t.forward(160)
+    t.right(90)
+    t.pendown()
+    t.color('black')
+    t.begin_fill()
+    t.circle(40)
+    t.end_fill()
+    t.penup()
+    t.right(90)
+    t.forward(60)
+    t.left(90)
+    t.pendown()
+    t.width(3)
+    t.color('grey')
+    t.circle(100)
+    t.penup()
+
+
+def arc(position, heading, radius, extent):
+    # Same path as turtle.circle(radius, extent), as an array of points
+    sign = 1 if radius > 0 else -1
+    h = np.radians(heading)
+    center = position + radius * np.array([-np.sin(h), np.cos(h)])
+    angles = h + sign * np.radians(np.linspace(0, extent, ARC_POINTS))
+    points = center + radius * np.stack([np.sin(angles), -np.cos(angles)], axis=1)
+    return points, heading + sign * extent
+
+
+def tomoe_shape(distance=TOMOE_SIZE):
+    # Outline of one tomoe pointing along heading 0, relative to the eye's center.
+    # Follows the turtle moves the old yin.draw() made: forward 100, right 5, then three half circles.
+    position = np.array([float(TOMOE_DISTANCE), 0.0])
+    heading = -5
+    outline = []
+    for radius, turn in ((distance, 0), (-2 * distance, -180), (-1 * distance, 0)):
+        heading += turn
+        points, heading = arc(position, heading, radius, 180)
+        outline.append(points)
+        position = points[-1]
+    return np.concatenate(outline)
+
+
+def rotation(degrees):
+    a = np.radians(degrees)
+    return np.array([[np.cos(a), np.sin(a)], [-np.sin(a), np.cos(a)]])
+
+
+# Precomputed geometry: one outline, rotated by 0, 120 and 240 degrees for the three tomoe
+SHAPE = tomoe_shape()
+TOMOE = [SHAPE @ rotation(offset) for offset in (0, 120, 240)]
+
+
+def to_canvas(points):
+    # Turtle coordinates have y pointing up, the Tk canvas has it pointing down
+    flat = np.empty(points.size)
+    flat[0::2] = points[:, 0] + CENTER[0]
+    flat[1::2] = -(points[:, 1] + CENTER[1])
+    return flat.tolist()
+
+
+if __name__ == '__main__':
+    # Only the live window needs Tk, the geometry above is also used by the headless exporter
+    import turtle as t
+
+    t.tracer(0, 0)
+    screen = t.Screen()
+    t.title("GenJutsu")
+    t.shape("blank")
+    cir()
+    canvas = screen.getcanvas()
+    polygons = [canvas.create_polygon(to_canvas(shape), fill='black', outline='black') for shape in TOMOE]
+    counter = canvas.create_text(-screen.window_width() / 2 + 10, -screen.window_height() / 2 + 10,
+                                 anchor='nw', fill='grey', font=('Courier', 12), text='')
+
+    frame_time = 1 / TARGET_FPS
+    start = time.perf_counter()
+    next_frame = start
+    last = start
+    fps = TARGET_FPS
+    work = 0.0
+
+    try:
+        while True:
+            now = time.perf_counter()
+            fps = 0.9 * fps + 0.1 / max(now - last, 1e-6)
+            last = now
+
+            # Angle comes from the clock, so the speed is the same whatever the frame rate
+            angle = (now - start) * ROTATION_SPEED
+            turn = rotation(-angle)
+            for polygon, shape in zip(polygons, TOMOE):
+                canvas.coords(polygon, to_canvas(shape @ turn))
+            canvas.itemconfigure(counter, text=f"FPS {fps:5.1f}  frame {work * 1000:5.2f} ms")
+            screen.update()
+            work = time.perf_counter() - now
+
+            # Sleep only for what is left of this frame, skip ahead if we fell behind
+            next_frame += frame_time
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.perf_counter()
+    except:
+        print("Aadish")
@@ -0,0 +1,160 @@
+# Headless export of the sharingan animation to an animated GIF or WebP
+# Every frame only depends on its rotation angle, so frames are drawn independently in a process pool
+# from the geometry in sharingan.py and quantised to one palette shared by the whole animation.
+# Usage: python sharingan_export.py sharingan.gif [--fps 30] [--size 440] [--workers 4] [--scaling]
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from sharingan import ROTATION_SPEED, TOMOE, rotation
+
+# Same circles cir() draws, radius and outline width in turtle units around the eye's center
+EYE = (200, 'red', 'black', 4)
+PUPIL = (40, 'black', 'black', 4)
+RING = (100, None, 'grey', 3)
+BACKGROUND = 'white'
+MARGIN = 10
+SYMMETRY = 120  # the three tomoe repeat every 120 degrees, so that much rotation is a seamless loop
+
+# Set once per worker process by _init_worker
+_worker = {}
+
+
+def loop_frames(fps):
+    # Frames in one seamless loop at the live animation's speed
+    return max(1, round(fps * SYMMETRY / ROTATION_SPEED))
+
+
+def frame_angle(index, frames):
+    return index * SYMMETRY / frames
+
+
+def _to_pixels(points, size, scale):
+    xy = np.empty(points.size)
+    xy[0::2] = size / 2 + points[:, 0] * scale
+    xy[1::2] = size / 2 - points[:, 1] * scale
+    return xy.tolist()
+
+
+def draw_background(size, supersample):
+    # Static part of the eye at supersampled resolution, drawn once per worker
+    big = size * supersample
+    scale = (size / 2 - MARGIN) / EYE[0] * supersample
+    image = Image.new('RGB', (big, big), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    for radius, fill, outline, width in (EYE, PUPIL, RING):
+        r = radius * scale
+        draw.ellipse((big / 2 - r, big / 2 - r, big / 2 + r, big / 2 + r),
+                     fill=fill, outline=outline, width=max(1, round(width * supersample)))
+    return image, scale
+
+
+def render_frame(angle, background, scale, size, supersample):
+    image = background.copy()
+    draw = ImageDraw.Draw(image)
+    turn = rotation(-angle)
+    for shape in TOMOE:
+        draw.polygon(_to_pixels(shape @ turn, size * supersample, scale), fill='black', outline='black')
+    return image.resize((size, size), Image.LANCZOS)
+
+
+def _init_worker(size, supersample, palette):
+    background, scale = draw_background(size, supersample)
+    _worker.update(background=background, scale=scale, size=size, supersample=supersample, palette=palette)
+
+
+def _work(job):
+    index, angle = job
+    frame = render_frame(angle, _worker['background'], _worker['scale'], _worker['size'], _worker['supersample'])
+    if _worker['palette'] is not None:
+        frame = frame.quantize(palette=_worker['palette'], dither=Image.Dither.NONE)
+    return index, frame
+
+
+def shared_palette(size, supersample, colors=64):
+    # Quantise once: the palette comes from a single frame, every colour in the animation is already in it
+    background, scale = draw_background(size, supersample)
+    return render_frame(0, background, scale, size, supersample).quantize(colors, method=Image.Quantize.MEDIANCUT)
+
+
+def render_frames(frames, size=440, supersample=4, workers=None, palette=None):
+    # Returns the frames in order, drawn by `workers` processes (1 = in this process)
+    jobs = [(i, frame_angle(i, frames)) for i in range(frames)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(size, supersample, palette)
+        results = map(_work, jobs)
+        return [frame for _, frame in results]
+
+    images = [None] * frames
+    chunk = max(1, frames // (workers * 4))
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(size, supersample, palette)) as pool:
+        for index, frame in pool.imap_unordered(_work, jobs, chunksize=chunk):
+            images[index] = frame
+    return images
+
+
+def save(images, path, fps):
+    duration = round(1000 / fps)
+    if path.lower().endswith('.webp'):
+        # Flat colours compress best losslessly
+        images[0].save(path, save_all=True, append_images=images[1:], duration=duration, loop=0, lossless=True)
+    else:
+        images[0].save(path, save_all=True, append_images=images[1:], duration=duration, loop=0, optimize=False)
+
+
+def export(path, fps=30, frames=None, size=440, supersample=4, workers=None):
+    frames = frames or loop_frames(fps)
+    palette = shared_palette(size, supersample)
+    start = time.perf_counter()
+    images = render_frames(frames, size, supersample, workers, palette)
+    rendered = time.perf_counter() - start
+    save(images, path, fps)
+    return {
+        'frames': frames,
+        'render_seconds': rendered,
+        'frames_per_sec': frames / rendered,
+        'total_seconds': time.perf_counter() - start,
+    }
+
+
+def scaling(frames, size, supersample):
+    # Frames/sec for 1, 2, 4 ... workers up to the core count
+    palette = shared_palette(size, supersample)
+    counts = sorted({min(2 ** i, os.cpu_count() or 1) for i in range(8)})
+    results = []
+    for workers in counts:
+        start = time.perf_counter()
+        render_frames(frames, size, supersample, workers, palette)
+        results.append((workers, frames / (time.perf_counter() - start)))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the sharingan animation without a display')
+    parser.add_argument('output', nargs='?', default='sharingan.gif', help='.gif or .webp')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--frames', type=int, help='default: one seamless loop at the live speed')
+    parser.add_argument('--size', type=int, default=440)
+    parser.add_argument('--supersample', type=int, default=4)
+    parser.add_argument('--workers', type=int, help='default: one per core')
+    parser.add_argument('--scaling', action='store_true', help='report frames/sec for 1..cores workers')
+    args = parser.parse_args()
+
+    stats = export(args.output, args.fps, args.frames, args.size, args.supersample, args.workers)
+    print(f"{args.output}: {stats['frames']} frames, {os.path.getsize(args.output) / 1024:.1f} KB")
+    print(f"Render : {stats['frames_per_sec']:.1f} frames/sec ({stats['render_seconds']:.2f}s)")
+    print(f"Total  : {stats['total_seconds']:.2f}s including encoding")
+
+    if args.scaling:
+        frames = max(args.frames or 0, 4 * (os.cpu_count() or 1), 32)
+        print(f"\nScaling over {frames} frames, {os.cpu_count()} cores:")
+        baseline = None
+        for workers, rate in scaling(frames, args.size, args.supersample):
+            baseline = baseline or rate
+            print(f"  {workers:>3} workers  {rate:8.1f} frames/sec  {rate / baseline:5.2f}x")
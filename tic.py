@@ -3,7 +3,12 @@
 # Email: aqeel.anwar@gatech.edu
 
 from tkinter import *
+import argparse
+import time
+from collections import deque
 import numpy as np
+from tic_engine import cell_index, make_board
+from tic_ai import Opponent
 
 size_of_board = 600
 symbol_size = (size_of_board / 3 - size_of_board / 8) / 2
@@ -11,15 +16,25 @@ symbol_thickness = 50
 symbol_X_color = '#EE4035'
 symbol_O_color = '#0492CF'
 Green_color = '#7BC043'
+computer_delay_ms = 300
 
 
 class Tic_Tac_Toe():
     # ------------------------------------------------------------------
     # Initialization Functions:
     # ------------------------------------------------------------------
-    def __init__(self):
+    def __init__(self, single_player=False, size=3, win_length=3):
+        if single_player and (size, win_length) != (3, 3):
+            raise ValueError('The computer opponent only plays the classic 3x3 game')
+        # Grid geometry, symbols shrink as the board grows
+        self.size = size
+        self.win_length = win_length
+        self.cell_size = size_of_board / size
+        self.symbol_size = symbol_size * 3 / size
+        self.symbol_thickness = symbol_thickness * 3 / size
+
         self.window = Tk()
-        self.window.title('Tic-Tac-Toe')
+        self.window.title('Tic-Tac-Toe (vs Computer)' if single_player else 'Tic-Tac-Toe')
         self.canvas = Canvas(self.window, width=size_of_board, height=size_of_board)
         self.canvas.pack()
         # Input from user in form of clicks
@@ -27,7 +42,7 @@ class Tic_Tac_Toe():
 
         self.initialize_board()
         self.player_X_turns = True
-        self.board_status = np.zeros(shape=(3, 3))
+        self.board = make_board(size, win_length, x_starts=True)
 
         self.player_X_starts = True
         self.reset_board = False
@@ -40,46 +55,93 @@ class Tic_Tac_Toe():
         self.O_score = 0
         self.tie_score = 0
 
+        # In single player mode the computer plays O, replies come from a pre-solved table
+        self.opponent = Opponent() if single_player else None
+
+        # How long each redraw took, including Tk's own work, to check it stays flat across games
+        self.redraw_times = deque(maxlen=200)
+        self.games_played = 0
+
     def mainloop(self):
         self.window.mainloop()
 
     def initialize_board(self):
-        for i in range(2):
-            self.canvas.create_line((i + 1) * size_of_board / 3, 0, (i + 1) * size_of_board / 3, size_of_board)
+        # Everything is created once here and then shown, hidden or recoloured, never deleted
+        for i in range(self.size - 1):
+            self.canvas.create_line((i + 1) * self.cell_size, 0, (i + 1) * self.cell_size, size_of_board, tags='grid')
+
+        for i in range(self.size - 1):
+            self.canvas.create_line(0, (i + 1) * self.cell_size, size_of_board, (i + 1) * self.cell_size, tags='grid')
+
+        # Symbols are made the first time a cell is used and reused in later games
+        self.symbol_cells = set()
+
+        # Game over screen
+        self.winner_text = self.canvas.create_text(size_of_board / 2, size_of_board / 3, font="cmr 60 bold",
+                                                   state=HIDDEN, tags='gameover')
+        self.canvas.create_text(size_of_board / 2, 5 * size_of_board / 8, font="cmr 40 bold", fill=Green_color,
+                                text='Scores \n', state=HIDDEN, tags='gameover')
+        self.score_text = self.canvas.create_text(size_of_board / 2, 3 * size_of_board / 4, font="cmr 30 bold",
+                                                  fill=Green_color, state=HIDDEN, tags='gameover')
+        self.canvas.create_text(size_of_board / 2, 15 * size_of_board / 16, font="cmr 20 bold", fill="gray",
+                                text='Click to play again \n', state=HIDDEN, tags='gameover')
 
-        for i in range(2):
-            self.canvas.create_line(0, (i + 1) * size_of_board / 3, size_of_board, (i + 1) * size_of_board / 3)
+    def record_redraw(self, start):
+        self.window.update_idletasks()
+        self.redraw_times.append(time.perf_counter() - start)
 
     def play_again(self):
-        self.initialize_board()
+        start = time.perf_counter()
+        self.canvas.itemconfigure('gameover', state=HIDDEN)
+        self.canvas.itemconfigure('symbol', state=HIDDEN)
+        self.canvas.itemconfigure('grid', state=NORMAL)
+        self.record_redraw(start)
+
         self.player_X_starts = not self.player_X_starts
         self.player_X_turns = self.player_X_starts
-        self.board_status = np.zeros(shape=(3, 3))
+        self.board.reset(x_starts=self.player_X_starts)
+        if self.opponent is not None and not self.player_X_turns:
+            self.window.after(computer_delay_ms, self.computer_move)
 
     # ------------------------------------------------------------------
     # Drawing Functions:
     # The modules required to draw required game based object on canvas
     # ------------------------------------------------------------------
 
-    def draw_O(self, logical_position):
-        logical_position = np.array(logical_position)
-        # logical_position = grid value on the board
+    def create_symbols(self, cell):
+        # Both an X and an O for this cell, hidden until needed
         # grid_position = actual pixel values of the center of the grid
-        grid_position = self.convert_logical_to_grid_position(logical_position)
-        self.canvas.create_oval(grid_position[0] - symbol_size, grid_position[1] - symbol_size,
-                                grid_position[0] + symbol_size, grid_position[1] + symbol_size, width=symbol_thickness,
-                                outline=symbol_O_color)
+        grid_position = self.convert_logical_to_grid_position(divmod(cell, self.size))
+        self.canvas.create_oval(grid_position[0] - self.symbol_size, grid_position[1] - self.symbol_size,
+                                grid_position[0] + self.symbol_size, grid_position[1] + self.symbol_size,
+                                width=self.symbol_thickness, outline=symbol_O_color, state=HIDDEN,
+                                tags=('symbol', 'O%d' % cell))
+        self.canvas.create_line(grid_position[0] - self.symbol_size, grid_position[1] - self.symbol_size,
+                                grid_position[0] + self.symbol_size, grid_position[1] + self.symbol_size,
+                                width=self.symbol_thickness, fill=symbol_X_color, state=HIDDEN,
+                                tags=('symbol', 'X%d' % cell))
+        self.canvas.create_line(grid_position[0] - self.symbol_size, grid_position[1] + self.symbol_size,
+                                grid_position[0] + self.symbol_size, grid_position[1] - self.symbol_size,
+                                width=self.symbol_thickness, fill=symbol_X_color, state=HIDDEN,
+                                tags=('symbol', 'X%d' % cell))
+        self.symbol_cells.add(cell)
+
+    def show_symbol(self, name, logical_position):
+        start = time.perf_counter()
+        cell = cell_index(logical_position, self.size)
+        if cell not in self.symbol_cells:
+            self.create_symbols(cell)
+        self.canvas.itemconfigure('%s%d' % (name, cell), state=NORMAL)
+        self.record_redraw(start)
+
+    def draw_O(self, logical_position):
+        self.show_symbol('O', logical_position)
 
     def draw_X(self, logical_position):
-        grid_position = self.convert_logical_to_grid_position(logical_position)
-        self.canvas.create_line(grid_position[0] - symbol_size, grid_position[1] - symbol_size,
-                                grid_position[0] + symbol_size, grid_position[1] + symbol_size, width=symbol_thickness,
-                                fill=symbol_X_color)
-        self.canvas.create_line(grid_position[0] - symbol_size, grid_position[1] + symbol_size,
-                                grid_position[0] + symbol_size, grid_position[1] - symbol_size, width=symbol_thickness,
-                                fill=symbol_X_color)
+        self.show_symbol('X', logical_position)
 
     def display_gameover(self):
+        start = time.perf_counter()
 
         if self.X_wins:
             self.X_score += 1
@@ -94,23 +156,22 @@ class Tic_Tac_Toe():
             text = 'Its a tie'
             color = 'gray'
 
-        self.canvas.delete("all")
-        self.canvas.create_text(size_of_board / 2, size_of_board / 3, font="cmr 60 bold", fill=color, text=text)
-
-        score_text = 'Scores \n'
-        self.canvas.create_text(size_of_board / 2, 5 * size_of_board / 8, font="cmr 40 bold", fill=Green_color,
-                                text=score_text)
+        self.canvas.itemconfigure('grid', state=HIDDEN)
+        self.canvas.itemconfigure('symbol', state=HIDDEN)
+        self.canvas.itemconfigure(self.winner_text, fill=color, text=text)
 
         score_text = 'Player 1 (X) : ' + str(self.X_score) + '\n'
         score_text += 'Player 2 (O): ' + str(self.O_score) + '\n'
         score_text += 'Tie                    : ' + str(self.tie_score)
-        self.canvas.create_text(size_of_board / 2, 3 * size_of_board / 4, font="cmr 30 bold", fill=Green_color,
-                                text=score_text)
+        self.canvas.itemconfigure(self.score_text, text=score_text)
+        self.canvas.itemconfigure('gameover', state=NORMAL)
         self.reset_board = True
+        self.record_redraw(start)
 
-        score_text = 'Click to play again \n'
-        self.canvas.create_text(size_of_board / 2, 15 * size_of_board / 16, font="cmr 20 bold", fill="gray",
-                                text=score_text)
+        self.games_played += 1
+        average = sum(self.redraw_times) / len(self.redraw_times)
+        print('Game %d: avg redraw %.2f ms, worst %.2f ms, %d canvas items' % (
+            self.games_played, average * 1000, max(self.redraw_times) * 1000, len(self.canvas.find_all())))
 
     # ------------------------------------------------------------------
     # Logical Functions:
@@ -119,46 +180,20 @@ class Tic_Tac_Toe():
 
     def convert_logical_to_grid_position(self, logical_position):
         logical_position = np.array(logical_position, dtype=int)
-        return (size_of_board / 3) * logical_position + size_of_board / 6
+        return self.cell_size * logical_position + self.cell_size / 2
 
     def convert_grid_to_logical_position(self, grid_position):
         grid_position = np.array(grid_position)
-        return np.array(grid_position // (size_of_board / 3), dtype=int)
+        return np.array(grid_position // self.cell_size, dtype=int)
 
     def is_grid_occupied(self, logical_position):
-        if self.board_status[logical_position[0]][logical_position[1]] == 0:
-            return False
-        else:
-            return True
+        return self.board.is_occupied(cell_index(logical_position, self.size))
 
     def is_winner(self, player):
-
-        player = -1 if player == 'X' else 1
-
-        # Three in a row
-        for i in range(3):
-            if self.board_status[i][0] == self.board_status[i][1] == self.board_status[i][2] == player:
-                return True
-            if self.board_status[0][i] == self.board_status[1][i] == self.board_status[2][i] == player:
-                return True
-
-        # Diagonals
-        if self.board_status[0][0] == self.board_status[1][1] == self.board_status[2][2] == player:
-            return True
-
-        if self.board_status[0][2] == self.board_status[1][1] == self.board_status[2][0] == player:
-            return True
-
-        return False
+        return self.board.is_winner(player)
 
     def is_tie(self):
-
-        r, c = np.where(self.board_status == 0)
-        tie = False
-        if len(r) == 0:
-            tie = True
-
-        return tie
+        return self.board.is_tie()
 
     def is_gameover(self):
         # Either someone wins or all grid occupied
@@ -189,26 +224,48 @@ class Tic_Tac_Toe():
         logical_position = self.convert_grid_to_logical_position(grid_position)
 
         if not self.reset_board:
+            if self.opponent is not None and not self.player_X_turns:
+                return  # Wait for the computer
             if self.player_X_turns:
                 if not self.is_grid_occupied(logical_position):
                     self.draw_X(logical_position)
-                    self.board_status[logical_position[0]][logical_position[1]] = -1
+                    self.board.move(cell_index(logical_position, self.size))
                     self.player_X_turns = not self.player_X_turns
             else:
                 if not self.is_grid_occupied(logical_position):
                     self.draw_O(logical_position)
-                    self.board_status[logical_position[0]][logical_position[1]] = 1
+                    self.board.move(cell_index(logical_position, self.size))
                     self.player_X_turns = not self.player_X_turns
 
             # Check if game is concluded
             if self.is_gameover():
                 self.display_gameover()
                 # print('Done')
+            elif self.opponent is not None and not self.player_X_turns:
+                self.window.after(computer_delay_ms, self.computer_move)
         else:  # Play Again
-            self.canvas.delete("all")
             self.play_again()
             self.reset_board = False
 
+    def computer_move(self):
+        if self.reset_board or self.player_X_turns:
+            return
+        cell = self.opponent.reply(self.board)
+        logical_position = divmod(cell, self.size)
+        self.draw_O(logical_position)
+        self.board.move(cell)
+        self.player_X_turns = True
+
+        if self.is_gameover():
+            self.display_gameover()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tic-Tac-Toe')
+    parser.add_argument('--ai', action='store_true', help='play against the computer (3x3 only)')
+    parser.add_argument('--size', type=int, default=3, help='board is size x size cells')
+    parser.add_argument('--k', type=int, default=3, help='stones in a row needed to win')
+    args = parser.parse_args()
 
-game_instance = Tic_Tac_Toe()
-game_instance.mainloop()
+    game_instance = Tic_Tac_Toe(single_player=args.ai, size=args.size, win_length=args.k)
+    game_instance.mainloop()
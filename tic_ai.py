@@ -0,0 +1,186 @@
+# Perfect-play Tic-Tac-Toe opponent
+# Negamax with alpha-beta pruning and a transposition table that folds the 8 board symmetries.
+# Every reachable position is solved once (or loaded from a table file), after that a reply is a dict lookup.
+
+import json
+import os
+import sys
+
+from tic_engine import FULL_BOARD, MASKS_BY_CELL
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tic_ai_table.json')
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def _symmetries():
+    # Cell permutations for the 4 rotations and their mirror images, cell = x * 3 + y
+    perms = []
+    for mirror in (False, True):
+        for turns in range(4):
+            perm = []
+            for cell in range(9):
+                x, y = divmod(cell, 3)
+                if mirror:
+                    x = 2 - x
+                for _ in range(turns):
+                    x, y = y, 2 - x
+                perm.append(x * 3 + y)
+            perms.append(tuple(perm))
+    return perms
+
+
+SYMMETRIES = _symmetries()
+INVERSES = [tuple(perm.index(cell) for cell in range(9)) for perm in SYMMETRIES]
+
+# TRANSFORMS[s][bits] is the 9 bit board `bits` after symmetry s
+TRANSFORMS = [
+    [sum(1 << perm[c] for c in range(9) if bits >> c & 1) for bits in range(FULL_BOARD + 1)]
+    for perm in SYMMETRIES
+]
+
+
+def canonical(me, them):
+    # Smallest key over the 8 symmetric copies, plus the symmetry that produced it
+    best_key, best_sym = None, 0
+    for sym, table in enumerate(TRANSFORMS):
+        key = table[me] | table[them] << 9
+        if best_key is None or key < best_key:
+            best_key, best_sym = key, sym
+    return best_key, best_sym
+
+
+def _won(board, cell):
+    for mask in MASKS_BY_CELL[cell]:
+        if board & mask == mask:
+            return True
+    return False
+
+
+class Solver():
+    def __init__(self):
+        self.tt = {}
+        self.book = {}
+        self.nodes = 0
+
+    def negamax(self, me, them, alpha, beta):
+        # Score from the side to move: +n win, -n loss, 0 draw, bigger n for quicker results
+        self.nodes += 1
+        occupied = me | them
+        if occupied == FULL_BOARD:
+            return 0
+
+        alpha_orig = alpha
+        key, _ = canonical(me, them)
+        entry = self.tt.get(key)
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        empties = 9 - bin(occupied).count('1')
+        best = -10
+        for cell in range(9):
+            if occupied >> cell & 1:
+                continue
+            board = me | 1 << cell
+            if _won(board, cell):
+                value = empties
+            else:
+                value = -self.negamax(them, board, -beta, -alpha)
+            if value > best:
+                best = value
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt[key] = (best, flag)
+        return best
+
+    def best_move(self, me, them):
+        # Full window search at the root, so the returned move is exactly optimal
+        occupied = me | them
+        best_cell, best = None, -11
+        for cell in range(9):
+            if occupied >> cell & 1:
+                continue
+            board = me | 1 << cell
+            if _won(board, cell):
+                value = 10
+            else:
+                value = -self.negamax(them, board, -10, 10)
+            if value > best:
+                best_cell, best = cell, value
+        return best_cell
+
+    def solve(self):
+        # Walk every reachable canonical position once and record its best reply.
+        # Positions are (side to move, other side), so the table works whoever started.
+        stack = [(0, 0)]
+        seen = set()
+        while stack:
+            me, them = stack.pop()
+            key, sym = canonical(me, them)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            cell = self.best_move(TRANSFORMS[sym][me], TRANSFORMS[sym][them])
+            if cell is None:
+                continue
+            self.book[key] = cell
+
+            occupied = me | them
+            for cell in range(9):
+                if occupied >> cell & 1:
+                    continue
+                board = me | 1 << cell
+                if _won(board, cell) or board | them == FULL_BOARD:
+                    continue
+                stack.append((them, board))
+        return self.book
+
+
+class Opponent():
+    def __init__(self, table_file=TABLE_FILE):
+        if table_file and os.path.exists(table_file):
+            with open(table_file) as f:
+                self.book = {int(key): cell for key, cell in json.load(f).items()}
+        else:
+            self.book = Solver().solve()
+
+    def save(self, table_file=TABLE_FILE):
+        with open(table_file, 'w') as f:
+            json.dump({str(key): cell for key, cell in sorted(self.book.items())}, f)
+
+    def reply(self, board):
+        # board is a tic_engine.Bitboard, the answer is a cell index for board.turn
+        key, sym = canonical(board.boards[board.turn], board.boards[1 - board.turn])
+        cell = self.book.get(key)
+        if cell is None:
+            return None
+        return INVERSES[sym][cell]
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    opponent = Opponent(table_file=None)
+    print(f'Solved {len(opponent.book)} canonical positions in {time.perf_counter() - start:.2f}s')
+    if '--save' in sys.argv:
+        opponent.save()
+        print(f'Saved table to {TABLE_FILE}')
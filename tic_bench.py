@@ -0,0 +1,119 @@
+# Moves/sec of the bitboard engine against the original numpy board from tic.py
+# Usage: python tic_bench.py [games]
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from tic_engine import Bitboard
+
+
+class NumpyBoard():
+    # The board logic tic.py used before tic_engine, kept as the baseline
+    def __init__(self):
+        self.board_status = np.zeros(shape=(3, 3))
+
+    def is_grid_occupied(self, logical_position):
+        if self.board_status[logical_position[0]][logical_position[1]] == 0:
+            return False
+        else:
+            return True
+
+    def is_winner(self, player):
+
+        player = -1 if player == 'X' else 1
+
+        # Three in a row
+        for i in range(3):
+            if self.board_status[i][0] == self.board_status[i][1] == self.board_status[i][2] == player:
+                return True
+            if self.board_status[0][i] == self.board_status[1][i] == self.board_status[2][i] == player:
+                return True
+
+        # Diagonals
+        if self.board_status[0][0] == self.board_status[1][1] == self.board_status[2][2] == player:
+            return True
+
+        if self.board_status[0][2] == self.board_status[1][1] == self.board_status[2][0] == player:
+            return True
+
+        return False
+
+    def is_tie(self):
+
+        r, c = np.where(self.board_status == 0)
+        tie = False
+        if len(r) == 0:
+            tie = True
+
+        return tie
+
+    def is_gameover(self):
+        X_wins = self.is_winner('X')
+        O_wins = False if X_wins else self.is_winner('O')
+        tie = False if O_wins else self.is_tie()
+        return X_wins or O_wins or tie
+
+
+def random_games(count, seed=0):
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        cells = list(range(9))
+        rng.shuffle(cells)
+        games.append(cells)
+    return games
+
+
+def play_numpy(games):
+    moves = 0
+    for cells in games:
+        board = NumpyBoard()
+        value = -1
+        for cell in cells:
+            position = (cell // 3, cell % 3)
+            if board.is_grid_occupied(position):
+                continue
+            board.board_status[position[0]][position[1]] = value
+            value = -value
+            moves += 1
+            if board.is_gameover():
+                break
+    return moves
+
+
+def play_bitboard(games):
+    moves = 0
+    board = Bitboard()
+    for cells in games:
+        board.reset()
+        for cell in cells:
+            if board.is_occupied(cell):
+                continue
+            board.move(cell)
+            moves += 1
+            if board.is_gameover():
+                break
+    return moves
+
+
+def bench(play, games):
+    start = time.perf_counter()
+    moves = play(games)
+    elapsed = time.perf_counter() - start
+    return moves, moves / elapsed
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    games = random_games(count)
+    numpy_moves, numpy_rate = bench(play_numpy, games)
+    bit_moves, bit_rate = bench(play_bitboard, games)
+    assert numpy_moves == bit_moves, 'engines disagree on when games end'
+
+    print(f'{count} random games, {bit_moves} moves')
+    print(f'numpy board : {numpy_rate:>12,.0f} moves/sec')
+    print(f'bitboard    : {bit_rate:>12,.0f} moves/sec')
+    print(f'speedup     : {bit_rate / numpy_rate:>12.1f}x')
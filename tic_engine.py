@@ -0,0 +1,212 @@
+# Headless Tic-Tac-Toe engine used by tic.py
+# Each player is a 9 bit integer, bit (x * 3 + y) is set when that player owns cell (x, y)
+
+X = 0
+O = 1
+PLAYER_NAMES = ('X', 'O')
+
+FULL_BOARD = 0b111111111
+
+# The 8 winning lines as bit masks, a player wins when (board & mask) == mask
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,  # x = 0, 1, 2
+    0b001001001, 0b010010010, 0b100100100,  # y = 0, 1, 2
+    0b100010001, 0b001010100,               # diagonals
+)
+
+# Only the lines through a cell can be completed by a move on that cell
+MASKS_BY_CELL = tuple(tuple(mask for mask in WIN_MASKS if mask >> cell & 1) for cell in range(9))
+
+
+# Line directions for the general N x N board: down, right and the two diagonals
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+def cell_index(logical_position, size=3):
+    return int(logical_position[0]) * size + int(logical_position[1])
+
+
+def has_line(bits):
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+class Bitboard():
+    def __init__(self, x_starts=True):
+        self.reset(x_starts)
+
+    def reset(self, x_starts=True):
+        self.boards = [0, 0]
+        self.turn = X if x_starts else O
+        self.history = []
+        self.last_winner = None
+
+    # ------------------------------------------------------------------
+    # Moves
+    # ------------------------------------------------------------------
+
+    def occupied(self):
+        return self.boards[X] | self.boards[O]
+
+    def is_occupied(self, cell):
+        return bool(self.occupied() >> cell & 1)
+
+    def legal_moves(self):
+        free = ~self.occupied() & FULL_BOARD
+        return [cell for cell in range(9) if free >> cell & 1]
+
+    def move(self, cell):
+        if self.is_occupied(cell):
+            raise ValueError(f'Cell {cell} is already occupied')
+        player = self.turn
+        self.boards[player] |= 1 << cell
+        self.history.append(cell)
+        self.turn = 1 - player
+
+        # Incremental check, only lines through the new cell can have been completed
+        board = self.boards[player]
+        self.last_winner = None
+        for mask in MASKS_BY_CELL[cell]:
+            if board & mask == mask:
+                self.last_winner = player
+                break
+        return player
+
+    def undo(self):
+        cell = self.history.pop()
+        player = 1 - self.turn
+        self.boards[player] &= ~(1 << cell)
+        self.turn = player
+        self.last_winner = None
+        return cell
+
+    # ------------------------------------------------------------------
+    # Game state
+    # ------------------------------------------------------------------
+
+    def is_winner(self, player):
+        player = X if player in (X, 'X') else O
+        return has_line(self.boards[player])
+
+    def winner(self):
+        if self.is_winner(X):
+            return X
+        if self.is_winner(O):
+            return O
+        return None
+
+    def is_tie(self):
+        return self.occupied() == FULL_BOARD and self.winner() is None
+
+    def is_gameover(self):
+        # The last move is the only one that can have ended the game
+        return self.last_winner is not None or self.occupied() == FULL_BOARD
+
+    def cells(self):
+        # 'X', 'O' or None for each cell, handy for drawing and debugging
+        return [PLAYER_NAMES[X] if self.boards[X] >> c & 1 else PLAYER_NAMES[O] if self.boards[O] >> c & 1 else None
+                for c in range(9)]
+
+
+class GridBoard():
+    # N x N board with k-in-a-row, same API as Bitboard.
+    # Each player is one arbitrary precision int with N * N bits, so a 15 x 15 board is ~30 bytes per player.
+    def __init__(self, size=3, win_length=3, x_starts=True):
+        if not 1 <= win_length <= size:
+            raise ValueError('win_length must be between 1 and the board size')
+        self.size = size
+        self.win_length = win_length
+        self.full_board = (1 << size * size) - 1
+        self.reset(x_starts)
+
+    def reset(self, x_starts=True):
+        self.boards = [0, 0]
+        self.turn = X if x_starts else O
+        self.history = []
+        self.last_winner = None
+
+    # ------------------------------------------------------------------
+    # Moves
+    # ------------------------------------------------------------------
+
+    def occupied(self):
+        return self.boards[X] | self.boards[O]
+
+    def is_occupied(self, cell):
+        return bool(self.occupied() >> cell & 1)
+
+    def legal_moves(self):
+        free = ~self.occupied() & self.full_board
+        return [cell for cell in range(self.size * self.size) if free >> cell & 1]
+
+    def move(self, cell):
+        if self.is_occupied(cell):
+            raise ValueError(f'Cell {cell} is already occupied')
+        player = self.turn
+        self.boards[player] |= 1 << cell
+        self.history.append(cell)
+        self.turn = 1 - player
+        self.last_winner = player if self.completes_line(player, cell) else None
+        return player
+
+    def undo(self):
+        cell = self.history.pop()
+        player = 1 - self.turn
+        self.boards[player] &= ~(1 << cell)
+        self.turn = player
+        self.last_winner = None
+        return cell
+
+    def completes_line(self, player, cell):
+        # Count the player's stones on the 4 lines through cell, at most k - 1 steps each way
+        board = self.boards[player]
+        size = self.size
+        x, y = divmod(cell, size)
+        for dx, dy in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                cx, cy = x + sign * dx, y + sign * dy
+                while count < self.win_length and 0 <= cx < size and 0 <= cy < size and board >> (cx * size + cy) & 1:
+                    count += 1
+                    cx += sign * dx
+                    cy += sign * dy
+            if count >= self.win_length:
+                return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Game state
+    # ------------------------------------------------------------------
+
+    def is_winner(self, player):
+        player = X if player in (X, 'X') else O
+        return self.last_winner == player
+
+    def winner(self):
+        return self.last_winner
+
+    def is_tie(self):
+        return self.occupied() == self.full_board and self.last_winner is None
+
+    def is_gameover(self):
+        return self.last_winner is not None or self.occupied() == self.full_board
+
+    def cells(self):
+        names = []
+        for c in range(self.size * self.size):
+            if self.boards[X] >> c & 1:
+                names.append(PLAYER_NAMES[X])
+            elif self.boards[O] >> c & 1:
+                names.append(PLAYER_NAMES[O])
+            else:
+                names.append(None)
+        return names
+
+
+def make_board(size=3, win_length=3, x_starts=True):
+    # The classic game keeps the precomputed-mask bitboard, everything else uses the general board
+    if size == 3 and win_length == 3:
+        return Bitboard(x_starts)
+    return GridBoard(size, win_length, x_starts)
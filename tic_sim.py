@@ -0,0 +1,158 @@
+# Headless, vectorised Tic-Tac-Toe self-play
+# A whole batch of games advances one ply at a time as NumPy arrays, so millions of games take seconds.
+# Usage: python tic_sim.py --games 1000000 --x random --o perfect
+
+import argparse
+import time
+
+import numpy as np
+
+from tic_engine import FULL_BOARD, WIN_MASKS
+
+LINE_MASKS = np.array(WIN_MASKS, dtype=np.uint16)
+CELL_BITS = (1 << np.arange(9)).astype(np.uint16)
+ALL_BOARDS = np.arange(FULL_BOARD + 1, dtype=np.uint16)
+
+# WINNING[bits] is True when the 9 bit board contains a line, built from the line masks in one go
+WINNING = ((ALL_BOARDS[:, None] & LINE_MASKS) == LINE_MASKS).any(axis=1)
+
+
+def free_cells(me, them):
+    # (games, 9) bool of empty cells
+    return ((me | them)[:, None] & CELL_BITS) == 0
+
+
+def winning_cells(board, free):
+    # (games, 9) bool of empty cells that would complete a line for `board`
+    return WINNING[board[:, None] | CELL_BITS] & free
+
+
+def _pick(scores, free):
+    return np.where(free, scores, -np.inf).argmax(axis=1)
+
+
+# ------------------------------------------------------------------
+# Policies: (me, them, rng) -> cell for each game, me is the side to move
+# ------------------------------------------------------------------
+
+def random_policy(me, them, rng):
+    free = free_cells(me, them)
+    return _pick(rng.random(free.shape), free)
+
+
+def greedy_policy(me, them, rng):
+    # Win if possible, otherwise block, otherwise prefer the centre, otherwise random
+    free = free_cells(me, them)
+    scores = rng.random(free.shape)
+    scores += winning_cells(me, free) * 8.0
+    scores += winning_cells(them, free) * 4.0
+    scores[:, 4] += 2.0
+    return _pick(scores, free)
+
+
+def perfect_table():
+    # Best reply for every reachable (me, them) pair, from the tic_ai solver
+    from tic_ai import INVERSES, Opponent, canonical
+
+    book = Opponent().book
+    table = np.full((FULL_BOARD + 1) << 9, -1, dtype=np.int8)
+    stack = [(0, 0)]
+    while stack:
+        me, them = stack.pop()
+        key, sym = canonical(me, them)
+        if table[me << 9 | them] >= 0 or key not in book:
+            continue
+        table[me << 9 | them] = INVERSES[sym][book[key]]
+        for cell in range(9):
+            if (me | them) >> cell & 1:
+                continue
+            board = me | 1 << cell
+            if not WINNING[board] and board | them != FULL_BOARD:
+                stack.append((them, board))
+    return table
+
+
+def perfect_policy_factory():
+    table = perfect_table()
+
+    def perfect_policy(me, them, rng):
+        return table[me.astype(np.int64) << 9 | them].astype(np.int64)
+
+    return perfect_policy
+
+
+POLICIES = {
+    'random': lambda: random_policy,
+    'greedy': lambda: greedy_policy,
+    'perfect': perfect_policy_factory,
+}
+
+
+# ------------------------------------------------------------------
+# Simulation
+# ------------------------------------------------------------------
+
+def play_batch(x_policy, o_policy, games, rng, x_starts=True):
+    # Returns an int8 array per game: 0 X won, 1 O won, -1 draw
+    boards = np.zeros((2, games), dtype=np.uint16)
+    result = np.full(games, -1, dtype=np.int8)
+    active = np.arange(games)
+    policies = (x_policy, o_policy)
+    player = 0 if x_starts else 1
+
+    for _ in range(9):
+        me = boards[player, active]
+        them = boards[1 - player, active]
+        cells = policies[player](me, them, rng)
+
+        me = me | CELL_BITS[cells]
+        boards[player, active] = me
+
+        # Games where this move completed a line are over, the rest carry on
+        won = WINNING[me]
+        result[active[won]] = player
+        active = active[~won]
+        if active.size == 0:
+            break
+        player = 1 - player
+    return result
+
+
+def simulate(x_policy, o_policy, games, batch_size=100000, seed=0, alternate_start=False):
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(3, dtype=np.int64)
+    start = time.perf_counter()
+    played = 0
+    while played < games:
+        size = min(batch_size, games - played)
+        x_starts = not alternate_start or (played // batch_size) % 2 == 0
+        result = play_batch(x_policy, o_policy, size, rng, x_starts)
+        counts += np.bincount(result + 1, minlength=3)
+        played += size
+    elapsed = time.perf_counter() - start
+    return {
+        'games': games,
+        'x_win_rate': counts[1] / games,
+        'o_win_rate': counts[2] / games,
+        'draw_rate': counts[0] / games,
+        'seconds': elapsed,
+        'games_per_sec': games / elapsed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vectorised Tic-Tac-Toe self-play')
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=100000)
+    parser.add_argument('--x', choices=POLICIES, default='random')
+    parser.add_argument('--o', choices=POLICIES, default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--alternate', action='store_true', help='alternate the starting player between batches')
+    args = parser.parse_args()
+
+    stats = simulate(POLICIES[args.x](), POLICIES[args.o](), args.games, args.batch, args.seed, args.alternate)
+    print(f"{args.x} (X) vs {args.o} (O), {stats['games']:,} games")
+    print(f"X wins : {stats['x_win_rate']:.2%}")
+    print(f"O wins : {stats['o_win_rate']:.2%}")
+    print(f"Draws  : {stats['draw_rate']:.2%}")
+    print(f"Speed  : {stats['games_per_sec']:,.0f} games/sec")
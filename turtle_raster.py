@@ -0,0 +1,169 @@
+# Headless renderer for the turtle art in Flower.py and desgin.py
+# The turtle paths are rebuilt as NumPy point arrays and drawn straight into a PNG, no Tk or display needed.
+# Usage: python turtle_raster.py flower design [--size 800] [--bench-turtle]
+
+import argparse
+import colorsys
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ARC_STEP = 2.0  # degrees between sampled points on an arc
+
+
+class Pen():
+    # Keeps the turtle state (position, heading, colour) and collects strokes instead of drawing them
+    def __init__(self):
+        self.position = np.zeros(2)
+        self.heading = 0.0
+        self.color = (1.0, 1.0, 1.0)
+        self.width = 1
+        self.arcs = []   # (x, y, heading, radius, extent, color, width)
+        self.lines = []  # (x0, y0, x1, y1, color, width)
+
+    def rt(self, angle):
+        self.heading -= angle
+
+    def lt(self, angle):
+        self.heading += angle
+
+    def fd(self, distance):
+        h = np.radians(self.heading)
+        end = self.position + distance * np.array([np.cos(h), np.sin(h)])
+        self.lines.append((*self.position, *end, self.color, self.width))
+        self.position = end
+
+    def circle(self, radius, extent=360):
+        self.arcs.append((*self.position, self.heading, radius, extent, self.color, self.width))
+        # Only the end point is needed here, the points in between are sampled later in one go
+        sign = 1 if radius > 0 else -1
+        h = np.radians(self.heading)
+        end_h = np.radians(self.heading + sign * extent)
+        center = self.position + radius * np.array([-np.sin(h), np.cos(h)])
+        self.position = center + radius * np.array([np.sin(end_h), -np.cos(end_h)])
+        self.heading += sign * extent
+
+    def strokes(self):
+        # Every arc and line as an (n, 2) point array with its colour and width
+        strokes = []
+        if self.arcs:
+            x, y, heading, radius, extent = (np.array([a[i] for a in self.arcs], dtype=float) for i in range(5))
+            steps = int(np.ceil(np.abs(extent).max() / ARC_STEP)) + 1
+            sign = np.sign(radius)
+            h = np.radians(heading)
+            cx = x - radius * np.sin(h)
+            cy = y + radius * np.cos(h)
+            # (arcs, steps) angles, every arc sampled at the same number of points
+            angles = h[:, None] + (sign * np.radians(extent))[:, None] * np.linspace(0, 1, steps)[None, :]
+            px = cx[:, None] + radius[:, None] * np.sin(angles)
+            py = cy[:, None] - radius[:, None] * np.cos(angles)
+            points = np.stack([px, py], axis=2)
+            for arc, arc_points in zip(self.arcs, points):
+                strokes.append((arc_points, arc[5], arc[6]))
+        for line in self.lines:
+            strokes.append((np.array([line[:2], line[2:4]]), line[4], line[5]))
+        return strokes
+
+
+def flower():
+    # Same moves as Flower.py
+    pen = Pen()
+    h = 0
+    for i in range(16):
+        for j in range(18):
+            pen.color = colorsys.hsv_to_rgb(h, 1, 1)
+            h += 0.005
+            pen.rt(90)
+            pen.circle(150 - j * 6, 90)
+            pen.lt(90)
+            pen.circle(150 - j * 6, 90)
+            pen.rt(180)
+        pen.circle(40, 24)
+    return pen, 'black'
+
+
+def design():
+    # Same moves as desgin.py
+    pen = Pen()
+    pen.color = tuple(c / 255 for c in ImageColor.getrgb('violet'))
+    for a in range(155):
+        pen.rt(a)
+        pen.circle(125, a)
+        pen.fd(a)
+        pen.rt(90)
+    return pen, 'black'
+
+
+DRAWINGS = {'flower': flower, 'design': design}
+
+
+def rasterise(strokes, background, size=800, supersample=4, scale=None):
+    # Draw at `supersample` times the size and shrink with a Lanczos filter for anti-aliasing
+    if scale is None:
+        # Fit the drawing into the image with a small margin, centred on the turtle origin
+        extent = max(np.abs(points).max() for points, _, _ in strokes)
+        scale = (size / 2 * 0.95) / extent
+    big = size * supersample
+    image = Image.new('RGB', (big, big), background)
+    draw = ImageDraw.Draw(image)
+    for points, color, width in strokes:
+        xy = np.empty_like(points)
+        xy[:, 0] = big / 2 + points[:, 0] * scale * supersample
+        xy[:, 1] = big / 2 - points[:, 1] * scale * supersample
+        rgb = tuple(int(round(c * 255)) for c in color)
+        draw.line(xy.ravel().tolist(), fill=rgb, width=max(1, int(round(width * scale * supersample))), joint='curve')
+    return image.resize((size, size), Image.LANCZOS)
+
+
+def render(name, path, size=800, supersample=4):
+    pen, background = DRAWINGS[name]()
+    image = rasterise(pen.strokes(), background, size, supersample)
+    image.save(path, optimize=True)
+    return image
+
+
+def turtle_run_time(script):
+    # Time the original turtle script, this needs Tk and a display so it may not be available
+    code = (
+        'import runpy, sys, time, turtle\n'
+        'turtle.done = lambda: None\n'
+        'start = time.perf_counter()\n'
+        'runpy.run_path(sys.argv[1])\n'
+        'print(time.perf_counter() - start)\n'
+    )
+    proc = subprocess.run([sys.executable, '-c', code, script], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the turtle art to PNG without a display')
+    parser.add_argument('drawings', nargs='*', metavar='drawing', help='flower and/or design, default both')
+    parser.add_argument('--size', type=int, default=800)
+    parser.add_argument('--supersample', type=int, default=4)
+    parser.add_argument('--out', default='.')
+    parser.add_argument('--bench-turtle', action='store_true', help='also time the original turtle scripts')
+    args = parser.parse_args()
+
+    scripts = {'flower': 'Flower.py', 'design': 'desgin.py'}
+    for name in args.drawings or list(DRAWINGS):
+        if name not in DRAWINGS:
+            parser.error(f'unknown drawing {name!r}, choose from {", ".join(DRAWINGS)}')
+        path = os.path.join(args.out, f'{name}.png')
+        start = time.perf_counter()
+        render(name, path, args.size, args.supersample)
+        elapsed = time.perf_counter() - start
+        print(f'{name}: {path} in {elapsed:.3f}s')
+
+        if args.bench_turtle:
+            turtle_time = turtle_run_time(os.path.join(HERE, scripts[name]))
+            if turtle_time is None:
+                print(f'{name}: turtle run skipped (no Tk display available)')
+            else:
+                print(f'{name}: turtle took {turtle_time:.2f}s, {turtle_time / elapsed:.0f}x slower')
@@ -0,0 +1,602 @@
+# Record a turtle script once, then replay or export it without running the script again.
+# The recording is a compact command log: one opcode + layer per command and a flat float32 argument array.
+#
+#   python turtle_record.py record Flower.py flower.npz
+#   python turtle_record.py record sharingan.py sharingan.npz --frames 120
+#   python turtle_record.py play flower.npz --batch 200
+#   python turtle_record.py export flower.npz flower.svg
+#   python turtle_record.py export sharingan.npz sharingan.png --frame 30
+
+import argparse
+import array
+import json
+import os
+import runpy
+import sys
+import time
+import types
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+
+# ------------------------------------------------------------------
+# Command log
+# ------------------------------------------------------------------
+
+# Opcodes and their argument counts, POLY is variable: n followed by n x,y pairs
+MOVE, LINE, ARC, PEN, FILL, WIDTH, BEGIN_FILL, END_FILL, BGCOLOR, CLEAR, POLY, FRAME = range(12)
+ARITY = {MOVE: 2, LINE: 2, ARC: 5, PEN: 3, FILL: 3, WIDTH: 1, BEGIN_FILL: 0, END_FILL: 0, BGCOLOR: 3, CLEAR: 0,
+         FRAME: 0}
+ARC_STEP = 4.0  # degrees between points when an arc is turned into a polyline
+
+
+class CommandLog():
+    # Typed arrays (over-allocating as they grow, like lists) keep a recording at its packed size:
+    # uint8 opcodes, int16 layers, uint32 argument offsets and float32 arguments
+    def __init__(self):
+        self.ops = array.array('B')
+        self.layers = array.array('h')
+        self.starts = array.array('I')
+        self.args = array.array('f')
+        self.meta = {}
+
+    def add(self, op, layer=0, *args):
+        self.ops.append(op)
+        self.layers.append(layer)
+        self.starts.append(len(self.args))
+        self.args.extend(args)
+
+    def arrays(self):
+        # Copies, a NumPy view would stop the typed arrays from growing
+        return (
+            np.array(self.ops, dtype=np.uint8),
+            np.array(self.layers, dtype=np.int16),
+            np.array(self.starts, dtype=np.uint32),
+            np.array(self.args, dtype=np.float32),
+        )
+
+    def nbytes(self):
+        # Memory the log holds, spare capacity included
+        return sum(sys.getsizeof(column) for column in (self.ops, self.layers, self.starts, self.args))
+
+    def save(self, path):
+        ops, layers, starts, args = self.arrays()
+        np.savez_compressed(path, ops=ops, layers=layers, starts=starts, args=args, meta=json.dumps(self.meta))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        log = cls()
+        log.ops = data['ops']
+        log.layers = data['layers']
+        log.starts = data['starts']
+        log.args = data['args']
+        log.meta = json.loads(str(data['meta']))
+        return log
+
+    def __len__(self):
+        return len(self.ops)
+
+    def commands(self):
+        ops, layers, starts, args = self.arrays()
+        for op, layer, start in zip(ops.tolist(), layers.tolist(), starts.tolist()):
+            if op == POLY:
+                count = int(args[start])
+                yield op, layer, args[start + 1:start + 1 + 2 * count]
+            else:
+                yield op, layer, args[start:start + ARITY[op]]
+
+
+# ------------------------------------------------------------------
+# Recording: a stand-in for the turtle module that logs instead of drawing
+# ------------------------------------------------------------------
+
+class StopRecording(Exception):
+    pass
+
+
+def _rgb(color, colormode=1.0):
+    if isinstance(color, str):
+        return tuple(c / 255 for c in ImageColor.getrgb(color))
+    return tuple(float(c) / colormode for c in color)
+
+
+class RecordingScreen():
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.canvas = RecordingCanvas(recorder)
+
+    def update(self):
+        self.recorder.frame()
+
+    def bgcolor(self, *color):
+        if color:
+            self.recorder.log.add(BGCOLOR, 0, *_rgb(color[0] if len(color) == 1 else color))
+
+    def getcanvas(self):
+        return self.canvas
+
+    def window_width(self):
+        return self.recorder.log.meta['width']
+
+    def window_height(self):
+        return self.recorder.log.meta['height']
+
+    def tracer(self, *args, **kwargs):
+        pass
+
+    def title(self, text):
+        self.recorder.log.meta['title'] = text
+
+    def colormode(self, mode=None):
+        if mode is None:
+            return self.recorder.colormode
+        self.recorder.colormode = mode
+
+    def mainloop(self):
+        pass
+
+    done = exitonclick = mainloop
+
+
+class RecordingCanvas():
+    # Enough of tkinter.Canvas for scripts that move polygons directly, like sharingan.py
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.items = {}
+
+    def create_polygon(self, *coords, fill='black', outline='', width=1, **kwargs):
+        item = 1000 + len(self.items)
+        self.items[item] = {'coords': list(np.ravel(coords)), 'fill': fill, 'outline': outline, 'width': width}
+        self.recorder.polygon(item, self.items[item])
+        return item
+
+    def coords(self, item, *coords):
+        if item in self.items:
+            self.items[item]['coords'] = list(np.ravel(coords))
+            self.recorder.polygon(item, self.items[item])
+
+    def create_text(self, *args, **kwargs):
+        return 0
+
+    def itemconfigure(self, *args, **kwargs):
+        pass
+
+    itemconfig = itemconfigure
+
+
+class RecordingTurtle():
+    def __init__(self, recorder, layer):
+        self.recorder = recorder
+        self.log = recorder.log
+        self.layer = layer
+        self.position = np.zeros(2)
+        self.heading = 0.0
+        self.pen_down = True
+        self.pen_rgb = (0.0, 0.0, 0.0)
+        self.fill_rgb = (0.0, 0.0, 0.0)
+        self.pen_width = 1.0
+
+    def _sync(self):
+        # Pen state is per turtle but the log is shared, so restate it before drawing
+        self.log.add(PEN, self.layer, *self.pen_rgb)
+        self.log.add(FILL, self.layer, *self.fill_rgb)
+        self.log.add(WIDTH, self.layer, self.pen_width)
+
+    def _move(self, end):
+        if self.pen_down:
+            self.log.add(LINE, self.layer, *end)
+        else:
+            self.log.add(MOVE, self.layer, *end)
+        self.position = np.asarray(end, dtype=float)
+
+    # Motion
+    def forward(self, distance):
+        h = np.radians(self.heading)
+        self._move(self.position + distance * np.array([np.cos(h), np.sin(h)]))
+
+    def back(self, distance):
+        self.forward(-distance)
+
+    def right(self, angle):
+        self.heading -= angle
+
+    def left(self, angle):
+        self.heading += angle
+
+    def setheading(self, angle):
+        self.heading = float(angle)
+
+    def goto(self, x, y=None):
+        if y is None:
+            x, y = x
+        self._move((float(x), float(y)))
+
+    def home(self):
+        self.goto(0, 0)
+        self.heading = 0.0
+
+    def circle(self, radius, extent=None, steps=None):
+        extent = 360 if extent is None else extent
+        sign = 1 if radius > 0 else -1
+        h = np.radians(self.heading)
+        center = self.position + radius * np.array([-np.sin(h), np.cos(h)])
+        start = self.heading - 90 * sign
+        sweep = sign * extent
+        end = center + abs(radius) * np.array([np.cos(np.radians(start + sweep)), np.sin(np.radians(start + sweep))])
+        if self.pen_down:
+            self.log.add(ARC, self.layer, center[0], center[1], abs(radius), start, sweep)
+        else:
+            self.log.add(MOVE, self.layer, *end)
+        self.position = end
+        self.heading += sweep
+
+    # Pen
+    def penup(self):
+        self.pen_down = False
+
+    def pendown(self):
+        self.pen_down = True
+        self.log.add(MOVE, self.layer, *self.position)
+
+    def color(self, *args):
+        if len(args) == 1:
+            self.pen_rgb = self.fill_rgb = _rgb(args[0], self.recorder.colormode)
+        elif len(args) == 2:
+            self.pen_rgb = _rgb(args[0], self.recorder.colormode)
+            self.fill_rgb = _rgb(args[1], self.recorder.colormode)
+        elif len(args) == 3:
+            self.pen_rgb = self.fill_rgb = _rgb(args, self.recorder.colormode)
+        self._sync()
+
+    def pencolor(self, *args):
+        self.pen_rgb = _rgb(args[0] if len(args) == 1 else args, self.recorder.colormode)
+        self._sync()
+
+    def fillcolor(self, *args):
+        self.fill_rgb = _rgb(args[0] if len(args) == 1 else args, self.recorder.colormode)
+        self._sync()
+
+    def width(self, width=None):
+        if width is None:
+            return self.pen_width
+        self.pen_width = float(width)
+        self._sync()
+
+    def begin_fill(self):
+        self._sync()
+        self.log.add(BEGIN_FILL, self.layer)
+        self.log.add(MOVE, self.layer, *self.position)
+
+    def end_fill(self):
+        self.log.add(END_FILL, self.layer)
+
+    def clear(self):
+        self.log.add(CLEAR, self.layer)
+
+    def clone(self):
+        twin = self.recorder.new_turtle()
+        twin.position = self.position.copy()
+        twin.heading = self.heading
+        twin.pen_down = self.pen_down
+        twin.pen_rgb, twin.fill_rgb, twin.pen_width = self.pen_rgb, self.fill_rgb, self.pen_width
+        twin._sync()
+        twin.log.add(MOVE, twin.layer, *twin.position)
+        return twin
+
+    def pos(self):
+        return tuple(self.position)
+
+    def xcor(self):
+        return self.position[0]
+
+    def ycor(self):
+        return self.position[1]
+
+    def _ignore(self, *args, **kwargs):
+        pass
+
+    # Aliases and calls that only matter on screen
+    fd, bk, rt, lt, seth, setpos, setposition = forward, back, right, left, setheading, goto, goto
+    pu = up = penup
+    pd = down = pendown
+    pensize = width
+    speed = shape = hideturtle = ht = showturtle = st = _ignore
+
+
+class Recorder():
+    def __init__(self, max_frames=None, width=800, height=600):
+        self.log = CommandLog()
+        self.log.meta.update({'width': width, 'height': height, 'frames': 0})
+        self.colormode = 1.0
+        self.max_frames = max_frames
+        self.turtles = []
+        self.screen = RecordingScreen(self)
+        self.turtle = self.new_turtle()
+        self.turtle._sync()
+
+    def new_turtle(self):
+        turtle = RecordingTurtle(self, len(self.turtles))
+        self.turtles.append(turtle)
+        return turtle
+
+    def polygon(self, item, config):
+        # Canvas coordinates have y pointing down, store turtle coordinates like everything else
+        coords = np.asarray(config['coords'], dtype=float).reshape(-1, 2) * [1, -1]
+        self.log.add(CLEAR, item)
+        self.log.add(PEN, item, *_rgb(config['outline'] or config['fill']))
+        self.log.add(FILL, item, *_rgb(config['fill']))
+        self.log.add(WIDTH, item, config['width'])
+        self.log.add(POLY, item, len(coords), *coords.ravel())
+
+    def frame(self):
+        self.log.add(FRAME, 0)
+        self.log.meta['frames'] += 1
+        if self.max_frames is not None and self.log.meta['frames'] >= self.max_frames:
+            raise StopRecording()
+
+    def module(self):
+        # A fake `turtle` module whose functions drive the default turtle, for `import turtle` and `from turtle import *`
+        fake = types.ModuleType('turtle')
+        names = []
+        for name in dir(RecordingTurtle):
+            if not name.startswith('_'):
+                setattr(fake, name, getattr(self.turtle, name))
+                names.append(name)
+        for name in ('bgcolor', 'tracer', 'title', 'colormode', 'mainloop', 'done', 'exitonclick', 'update'):
+            setattr(fake, name, getattr(self.screen, name))
+            names.append(name)
+        fake.Screen = lambda: self.screen
+        fake.Turtle = fake.RawTurtle = lambda *args, **kwargs: self.new_turtle()
+        fake.Terminator = StopRecording
+        fake.__all__ = names + ['Screen', 'Turtle', 'RawTurtle', 'Terminator']
+        return fake
+
+
+def record(script, max_frames=None):
+    recorder = Recorder(max_frames)
+    saved = sys.modules.get('turtle')
+    sys.modules['turtle'] = recorder.module()
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except (StopRecording, SystemExit):
+        pass
+    finally:
+        if saved is None:
+            del sys.modules['turtle']
+        else:
+            sys.modules['turtle'] = saved
+    recorder.log.meta['script'] = os.path.basename(script)
+    return recorder.log
+
+
+# ------------------------------------------------------------------
+# Display list: turns the log into lines and polygons in turtle coordinates
+# ------------------------------------------------------------------
+
+def _arc_points(cx, cy, radius, start, sweep):
+    steps = max(2, int(np.ceil(abs(sweep) / ARC_STEP)) + 1)
+    angles = np.radians(start + sweep * np.linspace(0, 1, steps))
+    return np.stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)], axis=1)
+
+
+def display_events(log):
+    # Yields ('draw' | 'fill', layer, shape), ('begin_fill' | 'clear', layer, None), ('frame', index, None)
+    # and ('bg', rgb, None), where shape = (kind, points, pen, fill, width) and kind is 'line' or 'poly'
+    pens = {}
+    path = {}
+    filling = {}
+    frame = 0
+    for op, layer, args in log.commands():
+        if op == PEN:
+            pens.setdefault(layer, {})['pen'] = tuple(args)
+        elif op == FILL:
+            pens.setdefault(layer, {})['fill'] = tuple(args)
+        elif op == WIDTH:
+            pens.setdefault(layer, {})['width'] = float(args[0])
+        elif op == MOVE:
+            path[layer] = [tuple(args)]
+            if layer in filling:
+                filling[layer].append(tuple(args))
+        elif op in (LINE, ARC):
+            state = pens.get(layer, {})
+            if op == LINE:
+                start = path.get(layer, [(0.0, 0.0)])[-1]
+                points = np.array([start, tuple(args)])
+            else:
+                points = _arc_points(*args)
+            path[layer] = [tuple(points[-1])]
+            if layer in filling:
+                filling[layer].extend(map(tuple, points))
+            yield 'draw', layer, ('line', points, state.get('pen'), None, state.get('width', 1.0))
+        elif op == BEGIN_FILL:
+            filling[layer] = []
+            yield 'begin_fill', layer, None
+        elif op == END_FILL:
+            points = filling.pop(layer, [])
+            if len(points) > 2:
+                state = pens.get(layer, {})
+                yield 'fill', layer, ('poly', np.array(points), None, state.get('fill'), 0)
+        elif op == POLY:
+            state = pens.get(layer, {})
+            points = np.asarray(args, dtype=float).reshape(-1, 2)
+            yield 'draw', layer, ('poly', points, state.get('pen'), state.get('fill'), state.get('width', 1.0))
+        elif op == CLEAR:
+            yield 'clear', layer, None
+        elif op == BGCOLOR:
+            yield 'bg', tuple(args), None
+        elif op == FRAME:
+            yield 'frame', frame, None
+            frame += 1
+
+
+def scene(log, frame=None):
+    # Final picture (or the picture at `frame`) as an ordered list of shapes plus the background colour.
+    # Fills go underneath the outline that was drawn while filling, like turtle does.
+    background = (1.0, 1.0, 1.0)
+    items = []
+    fill_slots = {}
+    for event, a, shape in display_events(log):
+        if event == 'bg':
+            background = a
+        elif event == 'clear':
+            items = [item for item in items if item[0] != a]
+        elif event == 'draw':
+            items.append((a, shape))
+        elif event == 'begin_fill':
+            fill_slots[a] = len(items)
+        elif event == 'fill':
+            items.insert(min(fill_slots.pop(a, len(items)), len(items)), (a, shape))
+        elif event == 'frame' and frame is not None and a == frame:
+            break
+    return background, [shape for _, shape in items]
+
+
+# ------------------------------------------------------------------
+# Exporters
+# ------------------------------------------------------------------
+
+def _hex(rgb):
+    return '#%02x%02x%02x' % tuple(int(round(c * 255)) for c in rgb)
+
+
+def export_svg(log, path, frame=None):
+    background, shapes = scene(log, frame)
+    width, height = log.meta['width'], log.meta['height']
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="{-width / 2} {-height / 2} {width} {height}">',
+        f'<rect x="{-width / 2}" y="{-height / 2}" width="{width}" height="{height}" fill="{_hex(background)}"/>',
+        '<g transform="scale(1,-1)" fill="none" stroke-linecap="round" stroke-linejoin="round">',
+    ]
+    for kind, points, pen, fill, width in shapes:
+        coords = ' '.join(f'{x:.2f},{y:.2f}' for x, y in points)
+        stroke = f'stroke="{_hex(pen)}" stroke-width="{width:g}"' if pen is not None and width else 'stroke="none"'
+        if kind == 'line':
+            parts.append(f'<polyline points="{coords}" {stroke}/>')
+        else:
+            parts.append(f'<polygon points="{coords}" fill="{_hex(fill) if fill else "none"}" {stroke}/>')
+    parts.append('</g></svg>')
+    with open(path, 'w') as f:
+        f.write('\n'.join(parts))
+
+
+def export_image(log, path=None, frame=None, supersample=4):
+    # Supersampled PIL drawing, shrunk with Lanczos for anti-aliasing
+    background, shapes = scene(log, frame)
+    width, height = log.meta['width'], log.meta['height']
+    image = Image.new('RGB', (width * supersample, height * supersample), _hex(background))
+    draw = ImageDraw.Draw(image)
+    for kind, points, pen, fill, line_width in shapes:
+        xy = np.empty_like(points)
+        xy[:, 0] = (points[:, 0] + width / 2) * supersample
+        xy[:, 1] = (height / 2 - points[:, 1]) * supersample
+        xy = xy.ravel().tolist()
+        if kind == 'line':
+            draw.line(xy, fill=_hex(pen), width=max(1, int(line_width * supersample)), joint='curve')
+        else:
+            draw.polygon(xy, fill=_hex(fill) if fill else None)
+            if pen is not None and line_width:
+                draw.line(xy + xy[:2], fill=_hex(pen), width=max(1, int(line_width * supersample)))
+    image = image.resize((width, height), Image.LANCZOS)
+    if path:
+        image.save(path)
+    return image
+
+
+# ------------------------------------------------------------------
+# Replay on a Tk canvas
+# ------------------------------------------------------------------
+
+def play(log, batch=200, fps=60):
+    # Creates canvas items straight from the log, updating the window once every `batch` commands
+    import tkinter
+
+    window = tkinter.Tk()
+    window.title(log.meta.get('title') or log.meta.get('script', 'turtle replay'))
+    width, height = log.meta['width'], log.meta['height']
+    canvas = tkinter.Canvas(window, width=width, height=height, highlightthickness=0)
+    canvas.pack()
+
+    def to_canvas(points):
+        xy = np.empty_like(points)
+        xy[:, 0] = points[:, 0] + width / 2
+        xy[:, 1] = height / 2 - points[:, 1]
+        return xy.ravel().tolist()
+
+    pending = 0
+    frame_time = 1 / fps
+    fill_slots = {}
+    try:
+        for event, a, shape in display_events(log):
+            if event == 'bg':
+                canvas.configure(background=_hex(a))
+            elif event == 'clear':
+                canvas.delete(f'L{a}')
+            elif event in ('draw', 'fill'):
+                kind, points, pen, fill, line_width = shape
+                if kind == 'line':
+                    item = canvas.create_line(to_canvas(points), fill=_hex(pen), width=line_width, tags=f'L{a}')
+                else:
+                    item = canvas.create_polygon(to_canvas(points), fill=_hex(fill) if fill else '',
+                                                 outline=_hex(pen) if pen else '', width=line_width, tags=f'L{a}')
+                if event == 'fill':
+                    # Slide the fill under the outline drawn since begin_fill
+                    below = fill_slots.pop(a, None)
+                    if below:
+                        canvas.tag_raise(item, below)
+                    else:
+                        canvas.tag_lower(item)
+                pending += 1
+            elif event == 'begin_fill':
+                existing = canvas.find_all()
+                fill_slots[a] = existing[-1] if existing else None
+            elif event == 'frame':
+                window.update()
+                time.sleep(frame_time)
+                pending = 0
+            if pending >= batch:
+                window.update()
+                pending = 0
+        window.update()
+        window.mainloop()
+    except tkinter.TclError:
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record, replay and export turtle scripts')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rec = commands.add_parser('record', help='run a turtle script and save its command log')
+    rec.add_argument('script')
+    rec.add_argument('output')
+    rec.add_argument('--frames', type=int, default=120, help='stop animations after this many screen updates')
+
+    replay = commands.add_parser('play', help='replay a saved log in a Tk window')
+    replay.add_argument('log')
+    replay.add_argument('--batch', type=int, default=200, help='commands drawn between window updates')
+    replay.add_argument('--fps', type=float, default=60)
+
+    export = commands.add_parser('export', help='write a saved log as .svg or .png')
+    export.add_argument('log')
+    export.add_argument('output')
+    export.add_argument('--frame', type=int, help='animation frame to export, default the last one')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        start = time.perf_counter()
+        log = record(args.script, args.frames)
+        log.save(args.output)
+        print(f'Recorded {len(log)} commands, {log.meta["frames"]} frames, '
+              f'{log.nbytes() / 1024:.0f} KB in memory, {time.perf_counter() - start:.2f}s')
+    elif args.command == 'play':
+        play(CommandLog.load(args.log), args.batch, args.fps)
+    else:
+        log = CommandLog.load(args.log)
+        start = time.perf_counter()
+        if args.output.lower().endswith('.svg'):
+            export_svg(log, args.output, args.frame)
+        else:
+            export_image(log, args.output, args.frame)
+        print(f'Exported {args.output} in {time.perf_counter() - start:.2f}s')